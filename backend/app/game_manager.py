@@ -10,9 +10,13 @@ from datetime import datetime, timedelta
 from .models import Difficulty
 from .utils import evaluate, STATS
 
-from bots.weighted_bot import WeightedBot
-from bots.mcts_bot import MCTSBot
+from bots.weighted_bot import WeightedBot, load_stat_weights
+from bots.mcts_bot import MCTSBot, shutdown_search_pool
 from bots.rl_bot import RLBot
+from bots.opening_book import load_opening_book
+
+# Últimas rodadas (mãos de até 5 cartas) decididas pelo solucionador de finais
+MCTS_ENDGAME_CARDS = 5
 
 
 class GameSession:
@@ -43,16 +47,32 @@ class GameSession:
 class GameManager:
     """Gerencia múltiplas sessões de jogo."""
     
-    def __init__(self, deck_path: str):
+    def __init__(self, deck_path: str, search_workers: int = 1):
         """
         Inicializa o gerenciador.
         
         Args:
             deck_path: Caminho para o arquivo JSON do baralho
+            search_workers: Processos da busca do bot difícil (1 = serial; com
+                mais de 1 o processo mantém um pool, encerrado por close())
         """
         self.deck_path = deck_path
+        self.search_workers = max(1, search_workers)
         self.sessions: Dict[str, GameSession] = {}
         self.full_deck = None
+        
+        # Livro de aberturas (mapeado em memória, se já foi construído)
+        import os
+        book_path = os.path.join(os.path.dirname(__file__), "..", "data", "opening_book.bin")
+        self.opening_book = load_opening_book(book_path)
+        
+        # Pesos ajustados do bot fácil (python manage.py tune-weighted); None usa os padrões
+        weights_path = os.path.join(os.path.dirname(__file__), "..", "data", "weighted_weights.json")
+        self.weighted_weights = load_stat_weights(weights_path)
+    
+    def close(self):
+        """Encerra o pool da busca paralela (se algum bot o abriu)."""
+        shutdown_search_pool()
     
     def load_deck(self):
         """Carrega o baralho completo."""
@@ -241,11 +261,14 @@ class GameManager:
             Instância do bot
         """
         if difficulty == Difficulty.FACIL:
-            return WeightedBot(deck)
+            return WeightedBot(deck, stat_weights=self.weighted_weights)
         elif difficulty == Difficulty.MEDIO:
-            return MCTSBot(deck, simulations=25)
+            return MCTSBot(deck, time_budget_ms=10, endgame_cards=MCTS_ENDGAME_CARDS,
+                           opening_book=self.opening_book)
         elif difficulty == Difficulty.DIFICIL:
-            return MCTSBot(deck, simulations=50)
+            # Busca serial por padrão; paralela na raiz só se configurada
+            return MCTSBot(deck, time_budget_ms=40, workers=self.search_workers,
+                           endgame_cards=MCTS_ENDGAME_CARDS, opening_book=self.opening_book)
         elif difficulty == Difficulty.IMPOSSIVEL:
             # Tenta carregar modelo DQN se existir; em caso de erro, usa MCTSBot como fallback
             import os
@@ -258,10 +281,11 @@ class GameManager:
                 return RLBot(deck, STATS, epsilon=0.0, qfile=qfile_path)
             except Exception:
                 # Falha ao inicializar RLBot (ex: dependências faltando ou arquivo inválido) -> fallback para MCTS
-                return MCTSBot(deck, simulations=100)
+                return MCTSBot(deck, time_budget_ms=80, endgame_cards=MCTS_ENDGAME_CARDS,
+                               opening_book=self.opening_book)
         else:
             # Padrão: fácil
-            return WeightedBot(deck)
+            return WeightedBot(deck, stat_weights=self.weighted_weights)
     
     def _cleanup_expired_sessions(self, timeout_minutes: int = 30):
         """Remove sessões expiradas."""
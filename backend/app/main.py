@@ -34,7 +34,9 @@ app.add_middleware(
 
 # Inicializa o gerenciador de jogos
 DECK_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "carros.json")
-game_manager = GameManager(DECK_PATH)
+# Processos da busca do bot difícil (python manage.py serve --search-workers N; 1 = serial)
+SEARCH_WORKERS = int(os.environ.get("SEARCH_WORKERS", "1"))
+game_manager = GameManager(DECK_PATH, search_workers=SEARCH_WORKERS)
 
 
 @app.on_event("startup")
@@ -48,6 +50,12 @@ async def startup_event():
         raise
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Encerra o pool da busca paralela do bot difícil."""
+    game_manager.close()
+
+
 @app.get("/", tags=["Info"])
 async def root():
     """Endpoint raiz com informações da API."""
@@ -14,6 +14,9 @@ STATS_DISPLAY = {
     "top_speed": "Velocidade Máxima (km/h)"
 }
 
+# Atributos onde o menor valor vence a rodada
+LOWER_IS_BETTER = ["weight", "0-100"]
+
 
 def evaluate(card1, card2, stat):
     """
@@ -52,6 +55,66 @@ def evaluate(card1, card2, stat):
         return 0
 
 
+def stat_key(card, stat):
+    """
+    Converte o valor de um atributo em uma chave comparável diretamente.
+    
+    Duas cartas comparadas por essa chave produzem o mesmo resultado de
+    evaluate(): a maior chave vence e chaves iguais empatam. Útil para
+    buscas que comparam a mesma carta milhares de vezes.
+    
+    Args:
+        card: Carta (dict)
+        stat: Atributo (str)
+    
+    Returns:
+        Chave numérica (float)
+    """
+    value = card.get(stat, 0)
+    
+    if stat in LOWER_IS_BETTER:
+        # Valor zero é inválido e sempre perde
+        if value == 0:
+            return -float('inf')
+        return -value
+    
+    return value
+
+
+def hand_mask(cards):
+    """
+    Converte uma lista de cartas em um bitmask sobre os ids das cartas.
+
+    Args:
+        cards: Lista de cartas (dicts com campo 'id')
+
+    Returns:
+        Bitmask (int) com o bit `id` ligado para cada carta
+    """
+    mask = 0
+    for card in cards:
+        mask |= 1 << card['id']
+    return mask
+
+
+def mask_ids(mask):
+    """
+    Lista os ids de carta presentes em um bitmask (ordem crescente).
+
+    Args:
+        mask: Bitmask produzido por hand_mask()
+
+    Returns:
+        Lista de ids (int)
+    """
+    ids = []
+    while mask:
+        low = mask & -mask
+        ids.append(low.bit_length() - 1)
+        mask ^= low
+    return ids
+
+
 def calculate_card_score(card):
     """
     Calcula um score geral para uma carta baseado em todos os atributos.
@@ -0,0 +1,272 @@
+"""
+Solucionador de finais de jogo.
+
+Com mãos pequenas (como as de 5 cartas do treinamento, ou as últimas rodadas
+de qualquer jogo) a árvore restante é pequena o bastante para ser percorrida
+por completo. Os estados são bitmasks sobre os ids das cartas e os valores
+ficam memorizados entre chamadas.
+
+O valor de um estado é o saldo de rodadas (vitórias - derrotas) que o bot
+ainda obtém até o fim do jogo.
+
+Aproximação: no jogo o defensor conhece o atributo e a mão do atacante, mas
+não a carta jogada. Só best_reply() modela isso (nó de acaso sobre a carta
+atacante). value() e best_move() supõem que o defensor vê a carta atacante
+e responde a ela, o que favorece o defensor. Tratar a defesa sem ver a
+carta exigiria resolver um jogo simultâneo (estratégias mistas) em cada
+rodada, então as decisões são boas nesse modelo, não ótimas no jogo real.
+"""
+
+import itertools
+import math
+import random
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import STATS, stat_key, mask_ids
+
+
+class EndgameSolver:
+    """
+    Minimax/expectimax com poda alfa-beta sobre estados em bitmask.
+
+    - value(): aproximação com a carta atacante visível. O atacante escolhe
+      (carta, atributo) e o defensor responde conhecendo a jogada.
+    - best_reply(): defesa do bot sem ver a carta atacante, com nó de acaso
+      uniforme sobre a mão (ou mãos possíveis) do oponente e continuação
+      avaliada por value().
+    - best_move(): ataque do bot; cada mão possível responde à carta e ao
+      atributo da melhor forma (como em value()).
+    - opponent_hands(): mãos possíveis quando a mão do oponente é incerta.
+
+    Também serve de referência para comparar decisões de outros bots, com a
+    ressalva da aproximação acima.
+    """
+
+    def __init__(self, stats_list=None, max_entries=2000000):
+        """
+        Inicializa o solucionador.
+
+        Args:
+            stats_list: Atributos jogáveis (usa STATS se None)
+            max_entries: Limite de estados memorizados antes de limpar a memória
+        """
+        self.stats_list = list(stats_list) if stats_list is not None else list(STATS)
+        self.max_entries = max_entries
+
+        # id -> tupla de chaves comparáveis (na ordem de stats_list)
+        self._keys = {}
+        self._memo = {}
+
+    def index(self, cards):
+        """
+        Registra as chaves de comparação de cartas ainda não vistas.
+
+        Args:
+            cards: Lista de cartas (dicts)
+        """
+        for card in cards:
+            if card['id'] not in self._keys:
+                self._keys[card['id']] = tuple(stat_key(card, stat) for stat in self.stats_list)
+
+    def value(self, bot_mask, opp_mask, bot_attacks):
+        """
+        Valor de um estado supondo que o defensor vê a carta atacante.
+
+        Args:
+            bot_mask: Bitmask da mão do bot
+            opp_mask: Bitmask da mão do oponente
+            bot_attacks: True se o bot escolhe o atributo na próxima rodada
+
+        Returns:
+            Saldo de rodadas do bot até o fim do jogo (int)
+        """
+        if not bot_mask or not opp_mask:
+            return 0
+
+        state = (bot_mask, opp_mask, bot_attacks)
+        cached = self._memo.get(state)
+        if cached is not None:
+            return cached
+
+        if len(self._memo) >= self.max_entries:
+            self._memo.clear()
+
+        keys = self._keys
+        bot_ids = mask_ids(bot_mask)
+        opp_ids = mask_ids(opp_mask)
+        stat_range = range(len(self.stats_list))
+
+        if bot_attacks:
+            # max sobre (carta, atributo) de min sobre a resposta do oponente
+            best = -math.inf
+            for c in bot_ids:
+                for s in stat_range:
+                    worst = math.inf
+                    for d in opp_ids:
+                        r = self._compare(keys[c][s], keys[d][s])
+                        v = r + self.value(bot_mask ^ (1 << c), opp_mask ^ (1 << d),
+                                           bot_attacks if r == 0 else r > 0)
+                        if v < worst:
+                            worst = v
+                            if worst <= best:
+                                break   # poda: não supera a melhor jogada já vista
+                    if worst > best:
+                        best = worst
+        else:
+            # min sobre (carta, atributo) do oponente de max sobre a resposta do bot
+            best = math.inf
+            for d in opp_ids:
+                for s in stat_range:
+                    top = -math.inf
+                    for c in bot_ids:
+                        r = self._compare(keys[c][s], keys[d][s])
+                        v = r + self.value(bot_mask ^ (1 << c), opp_mask ^ (1 << d),
+                                           bot_attacks if r == 0 else r > 0)
+                        if v > top:
+                            top = v
+                            if top >= best:
+                                break
+                    if top < best:
+                        best = top
+
+        self._memo[state] = best
+        return best
+
+    def best_reply(self, bot_mask, opp_masks, stat):
+        """
+        Melhor carta do bot como defensor, com a carta do oponente oculta.
+
+        A carta do oponente é um nó de acaso uniforme sobre cada mão possível
+        e as mãos possíveis têm o mesmo peso.
+
+        Args:
+            bot_mask: Bitmask da mão do bot
+            opp_masks: Lista de bitmasks de mãos possíveis do oponente
+            stat: Atributo escolhido pelo oponente
+
+        Returns:
+            Tupla (id da carta, valor esperado)
+        """
+        keys = self._keys
+        s = self.stats_list.index(stat)
+        best_card, best_value = None, -math.inf
+
+        for c in mask_ids(bot_mask):
+            total = 0.0
+            for opp_mask in opp_masks:
+                opp_ids = mask_ids(opp_mask)
+                expected = 0.0
+                for d in opp_ids:
+                    r = self._compare(keys[c][s], keys[d][s])
+                    # Empate mantém o oponente como atacante
+                    expected += r + self.value(bot_mask ^ (1 << c), opp_mask ^ (1 << d), r > 0)
+                total += expected / len(opp_ids)
+
+            value = total / len(opp_masks)
+            if value > best_value:
+                best_card, best_value = c, value
+
+        return best_card, best_value
+
+    def best_move(self, bot_mask, opp_masks):
+        """
+        Melhor (carta, atributo) do bot como atacante.
+
+        Para cada mão possível o oponente responde da melhor forma à carta e
+        ao atributo escolhidos (como se visse a carta, ver a aproximação no
+        topo do módulo); as mãos possíveis têm o mesmo peso.
+
+        Args:
+            bot_mask: Bitmask da mão do bot
+            opp_masks: Lista de bitmasks de mãos possíveis do oponente
+
+        Returns:
+            Tupla ((id da carta, atributo), valor esperado)
+        """
+        keys = self._keys
+        best_move, best_value = None, -math.inf
+
+        for c in mask_ids(bot_mask):
+            for s, stat in enumerate(self.stats_list):
+                total = 0.0
+                for opp_mask in opp_masks:
+                    worst = math.inf
+                    for d in mask_ids(opp_mask):
+                        r = self._compare(keys[c][s], keys[d][s])
+                        # Empate mantém o bot como atacante
+                        v = r + self.value(bot_mask ^ (1 << c), opp_mask ^ (1 << d), r >= 0)
+                        worst = min(worst, v)
+                    total += worst
+
+                value = total / len(opp_masks)
+                if value > best_value:
+                    best_move, best_value = (c, stat), value
+
+        return best_move, best_value
+
+    @staticmethod
+    def opponent_hands(pool_mask, size, limit=64, rng=None):
+        """
+        Mãos possíveis do oponente quando só o conjunto de cartas candidatas
+        é conhecido.
+
+        Enumera todas as combinações se couberem no limite; caso contrário
+        sorteia `limit` combinações.
+
+        Args:
+            pool_mask: Bitmask das cartas que o oponente pode ter
+            size: Número de cartas na mão do oponente
+            limit: Máximo de mãos retornadas
+            rng: random.Random opcional para o sorteio
+
+        Returns:
+            Lista de bitmasks
+        """
+        pool = mask_ids(pool_mask)
+        if math.comb(len(pool), size) <= limit:
+            combos = itertools.combinations(pool, size)
+        else:
+            rng = rng or random
+            combos = (rng.sample(pool, size) for _ in range(limit))
+
+        hands = []
+        for combo in combos:
+            mask = 0
+            for card_id in combo:
+                mask |= 1 << card_id
+            hands.append(mask)
+        return hands
+
+    def clear(self):
+        """Descarta os estados memorizados."""
+        self._memo.clear()
+
+    @staticmethod
+    def _compare(key1, key2):
+        """Equivalente a evaluate() sobre chaves pré-calculadas."""
+        if key1 > key2:
+            return 1
+        elif key1 < key2:
+            return -1
+        return 0
+
+
+# Instância compartilhada por todos os bots do processo
+_shared_solver = None
+
+
+def get_shared_solver():
+    """
+    Retorna o solucionador compartilhado do processo (memória entre jogos).
+
+    Returns:
+        EndgameSolver
+    """
+    global _shared_solver
+
+    if _shared_solver is None:
+        _shared_solver = EndgameSolver()
+
+    return _shared_solver
@@ -3,158 +3,592 @@ Bot com estratégia Monte Carlo Tree Search.
 Nível: Médio
 """
 
+import atexit
+import math
 import random
-import copy
+import time
 import sys
 import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.utils import STATS, evaluate
+from app.utils import STATS, evaluate, stat_key, hand_mask, mask_ids
+from bots.rollout import RolloutEngine
+from bots.transposition import TranspositionTable, get_shared_table
+from bots.endgame import get_shared_solver
+
+
+# Pool persistente de processos usado pela busca paralela na raiz
+_search_pool = None
+_search_pool_size = 0
+
+
+def get_search_pool(workers):
+    """
+    Retorna o pool de processos compartilhado pelos MCTSBot paralelos.
+
+    Os processos são criados uma única vez e reaproveitados entre jogadas
+    e jogos, então o custo de inicialização não é pago a cada decisão.
+
+    Args:
+        workers: Número mínimo de processos no pool
+
+    Returns:
+        ProcessPoolExecutor
+    """
+    global _search_pool, _search_pool_size
+
+    if _search_pool is None or _search_pool_size < workers:
+        if _search_pool is not None:
+            _search_pool.shutdown(wait=True)
+        _search_pool = ProcessPoolExecutor(max_workers=workers)
+        _search_pool_size = workers
+
+    return _search_pool
+
+
+def shutdown_search_pool(wait=True):
+    """
+    Encerra o pool de processos da busca paralela (se existir).
+
+    Args:
+        wait: Espera os processos terminarem (False para descartar um pool
+            quebrado; o próximo get_search_pool() cria outro)
+    """
+    global _search_pool, _search_pool_size
+
+    if _search_pool is not None:
+        _search_pool.shutdown(wait=wait, cancel_futures=not wait)
+        _search_pool = None
+        _search_pool_size = 0
+
+
+atexit.register(shutdown_search_pool)
+
+
+def _parallel_search(deck, player_deck, stats_list, fixed_stat, config, seed):
+    """
+    Busca independente executada em um processo do pool.
+
+    Returns:
+        Dicionário jogada -> [visitas, valor] na raiz
+    """
+    random.seed(seed)
+    bot = MCTSBot(deck, seed=seed, transposition=False, **config)
+    bot.stats_list = list(stats_list)
+    bot.engine = RolloutEngine(bot.stats_list, seed=seed)
+    return bot._search_root(player_deck, fixed_stat)
+
+
+class _Node:
+    """
+    Nó da árvore de busca: início de uma rodada.
+
+    Os valores são sempre guardados do ponto de vista do bot. Cada jogador
+    decide com base apenas no que consegue observar: o atacante escolhe
+    (carta, atributo) e o defensor responde conhecendo só o atributo, por
+    isso as respostas ficam indexadas por atributo e não pela carta atacante.
+    """
+
+    __slots__ = ('visits', 'attack', 'response', 'children', 'stored')
+
+    def __init__(self):
+        self.visits = 0
+        self.attack = {}     # (carta, atributo) -> [visitas, valor]
+        self.response = {}   # atributo -> [visitas, {carta: [visitas, valor]}]
+        self.children = {}   # (mão do bot, mão do oponente, bot ataca) -> _Node
+        self.stored = None   # atributo -> estatísticas já guardadas na tabela
 
 
 class MCTSBot:
     """
-    Bot que usa Monte Carlo Tree Search para simular jogadas futuras.
-    Mais inteligente que o WeightedBot, mas ainda computacionalmente leve.
+    Bot que usa Information Set Monte Carlo Tree Search (UCT) para planejar
+    as rodadas seguintes.
+
+    A carta escondida do oponente é determinizada a cada iteração, a árvore
+    cobre jogadas (carta, atributo) ao longo de várias rodadas e é reaproveitada
+    entre rodadas da mesma sessão. A busca é limitada por tempo de relógio
+    (anytime), então a latência fica controlada e o bot joga melhor quando o
+    servidor tem folga.
     """
-    
-    def __init__(self, deck, simulations=50):
+
+    def __init__(self, deck, simulations=None, time_budget_ms=20, exploration=1.4,
+                 rollout_batch=16, seed=None, workers=1, transposition=True,
+                 table_min_visits=100, endgame_cards=None, opening_book=None):
         """
         Inicializa o bot.
-        
+
         Args:
             deck: Lista de cartas disponíveis
-            simulations: Número de simulações por jogada
+            simulations: Limite opcional de iterações por jogada
+            time_budget_ms: Tempo máximo de busca por jogada em milissegundos
+                (None para usar apenas o limite de iterações)
+            exploration: Constante de exploração do UCT
+            rollout_batch: Rollouts vetorizados avaliados por folha da árvore
+            seed: Semente dos rollouts (opcional)
+            workers: Processos da busca paralela na raiz (1 para busca serial)
+            transposition: True para usar a tabela de transposição compartilhada
+                do processo, False para desativar, ou uma TranspositionTable
+            table_min_visits: Visitas guardadas na tabela a partir das quais a
+                situação é respondida sem nova busca (as entradas são separadas
+                por configuração de busca, então cada dificuldade usa as suas)
+            endgame_cards: Tamanho de mão a partir do qual as decisões passam
+                para o solucionador de finais (bots/endgame.py) em vez da busca;
+                None (padrão) sempre usa a busca
+            opening_book: OpeningBook consultado nas primeiras rodadas, quando o
+                solucionador de finais não se aplica (opcional)
         """
+        if simulations is None and time_budget_ms is None:
+            raise ValueError("Informe simulations ou time_budget_ms")
+
         self.deck = deck
         self.simulations = simulations
-    
+        self.time_budget_ms = time_budget_ms
+        self.exploration = exploration
+        self.rollout_batch = rollout_batch
+        self.stats_list = STATS
+        self.seed = seed
+        self.workers = workers
+        self.table_min_visits = table_min_visits
+        self._table_config = (simulations, time_budget_ms, workers, exploration, rollout_batch)
+        self.endgame_cards = endgame_cards
+        self.opening_book = opening_book
+
+        if isinstance(transposition, TranspositionTable):
+            self.table = transposition
+        elif transposition:
+            self.table = get_shared_table()
+        else:
+            self.table = None
+        self.engine = RolloutEngine(self.stats_list, seed=seed)
+        self._seed_rng = random.Random(seed)
+
+        # Chaves comparáveis por carta: id -> {atributo: chave}
+        self._keys = {}
+
+        # Árvore da última busca (reaproveitada na rodada seguinte)
+        self._root = None
+        self._root_state = None
+
     def simulate(self, bot_card, stat, player_deck):
         """
         Simula múltiplas rodadas para avaliar uma jogada.
-        
+
         Args:
             bot_card: Carta que o bot vai jogar
             stat: Atributo escolhido
             player_deck: Deck do jogador
-        
+
         Returns:
             Score médio das simulações (float)
         """
         if not player_deck:
             return 0
-        
+
+        simulations = self.simulations or 50
         score = 0
-        for _ in range(self.simulations):
+        for _ in range(simulations):
             # Escolhe uma carta aleatória do jogador
             opp_card = random.choice(player_deck)
-            
+
             # Avalia o resultado
             result = evaluate(bot_card, opp_card, stat)
             score += result
-        
-        return score / self.simulations
-    
+
+        return score / simulations
+
     def choose_card(self, player_deck, chosen_stat):
         """
         Escolhe a melhor carta para jogar contra um atributo específico.
-        Usa simulações para avaliar cada opção.
-        
+        O oponente já escolheu sua carta, que é desconhecida para o bot.
+
         Args:
             player_deck: Deck do jogador
             chosen_stat: Atributo escolhido para a rodada
-        
+
         Returns:
             Carta escolhida (dict)
         """
         if not self.deck:
             return None
-        
-        # Simula cada carta e escolhe a com melhor score
-        best_card = None
-        best_score = -float('inf')
-        
-        for card in self.deck:
-            score = self.simulate(card, chosen_stat, player_deck)
-            if score > best_score:
-                best_score = score
-                best_card = card
-        
-        return best_card
-    
+
+        if not player_deck:
+            return self.deck[0]
+
+        if self._in_endgame(player_deck, chosen_stat):
+            return self._solve_endgame(player_deck, chosen_stat)
+
+        book_move = self._book_move(player_deck, chosen_stat)
+        if book_move is not None:
+            return book_move[0]
+
+        stats = self._root_stats(player_deck, chosen_stat)
+        best_id = max(stats, key=lambda card_id: stats[card_id][0])
+        return self._card_by_id(best_id)
+
     def choose_move(self, player_deck, stats_list=None):
         """
         Escolhe a melhor carta e atributo para jogar.
-        Simula todas as combinações possíveis.
-        
+
         Args:
             player_deck: Deck do jogador
             stats_list: Lista de atributos disponíveis (usa STATS se None)
-        
+
         Returns:
             Tupla (carta, atributo)
         """
         if not self.deck:
             return None, None
-        
+
         if stats_list is None:
             stats_list = STATS
-        
-        best_score = -float('inf')
-        best_card = None
-        best_stat = None
-        
-        # Testa todas as combinações de carta + atributo
-        for card in self.deck:
-            for stat in stats_list:
-                score = self.simulate(card, stat, player_deck)
-                
-                if score > best_score:
-                    best_score = score
-                    best_card = card
-                    best_stat = stat
-        
-        return best_card, best_stat
-    
+
+        if not player_deck:
+            return self.deck[0], stats_list[0]
+
+        if list(stats_list) != list(self.stats_list):
+            # Atributos diferentes invalidam a árvore e as chaves anteriores
+            self.stats_list = list(stats_list)
+            self._keys = {}
+            self.engine = RolloutEngine(self.stats_list, seed=self.seed)
+            self._root = None
+
+        if self._in_endgame(player_deck, None):
+            return self._solve_endgame(player_deck, None)
+
+        book_move = self._book_move(player_deck, None)
+        if book_move is not None:
+            return book_move
+
+        stats = self._root_stats(player_deck, None)
+        best_id, best_stat = max(stats, key=lambda move: stats[move][0])
+        return self._card_by_id(best_id), best_stat
+
     def simulate_game(self, bot_card, stat, player_deck, depth=3):
         """
-        Simulação mais profunda considerando múltiplas rodadas.
-        Versão avançada (opcional, não usada por padrão).
-        
+        Estima o valor de uma jogada com rollouts aleatórios de várias rodadas.
+
         Args:
             bot_card: Carta do bot
             stat: Atributo escolhido
             player_deck: Deck do jogador
-            depth: Profundidade da simulação
-        
+            depth: Número de rodadas simuladas (incluindo a atual)
+
         Returns:
-            Score estimado (float)
+            Score estimado (float), com desconto de 0.9 por rodada futura
         """
         if depth == 0 or not player_deck:
             return 0
-        
-        total_score = 0
-        
-        for _ in range(self.simulations // depth):
-            # Simula uma rodada
-            opp_card = random.choice(player_deck)
-            round_result = evaluate(bot_card, opp_card, stat)
-            
-            # Simula rodadas futuras recursivamente
-            if depth > 1:
-                remaining_player = [c for c in player_deck if c != opp_card]
-                remaining_bot = [c for c in self.deck if c != bot_card]
-                
-                if remaining_bot and remaining_player:
-                    next_card = random.choice(remaining_bot)
-                    next_stat = random.choice(STATS)
-                    future_score = self.simulate_game(
-                        next_card, next_stat, remaining_player, depth - 1
-                    )
-                    total_score += round_result + 0.9 * future_score
-                else:
-                    total_score += round_result
+
+        self._index_cards(player_deck)
+        bot_ids = [c['id'] for c in self.deck if c['id'] != bot_card['id']]
+        opp_ids = [c['id'] for c in player_deck]
+        simulations = self.simulations or 50
+
+        # Primeira rodada: carta fixa contra cartas sorteadas do jogador
+        scores, opp_played = self.engine.first_round(bot_card['id'], opp_ids, stat, simulations)
+
+        # Rodadas seguintes em lote, excluindo a carta já jogada pelo jogador
+        if depth > 1:
+            scores += 0.9 * self.engine.rollout(
+                bot_ids, opp_ids, simulations, depth=depth - 1,
+                discount=0.9, opp_played=opp_played
+            )
+
+        return float(scores.mean())
+
+    # ------------------------------------------------------------------
+    # Busca
+    # ------------------------------------------------------------------
+
+    def _book_move(self, player_deck, fixed_stat):
+        """
+        Consulta o livro de aberturas (situação dada pelas duas mãos). Só é
+        chamado quando o solucionador de finais não se aplica.
+
+        Returns:
+            Tupla (carta, atributo) ou None se o livro não cobre a situação
+        """
+        if self.opening_book is None or list(self.stats_list) != STATS:
+            return None
+
+        move = self.opening_book.lookup('mcts', self.deck, fixed_stat, player_deck)
+        if move is None:
+            return None
+
+        card = self._card_by_id(move[0])
+        if card is None:
+            return None
+        return card, move[1] if fixed_stat is None else fixed_stat
+
+    def _in_endgame(self, player_deck, fixed_stat):
+        """Verifica se as mãos são pequenas o bastante para o solucionador de finais."""
+        if self.endgame_cards is None:
+            return False
+        if len(self.deck) > self.endgame_cards or len(player_deck) > self.endgame_cards:
+            return False
+
+        solver_stats = get_shared_solver().stats_list
+        if list(self.stats_list) != solver_stats:
+            return False
+        return fixed_stat is None or fixed_stat in solver_stats
+
+    def _solve_endgame(self, player_deck, fixed_stat):
+        """
+        Decide com o solucionador de finais (mão do oponente conhecida).
+
+        Returns:
+            Carta (defesa) ou tupla (carta, atributo) (ataque)
+        """
+        solver = get_shared_solver()
+        solver.index(self.deck)
+        solver.index(player_deck)
+
+        bot_mask = hand_mask(self.deck)
+        opp_masks = [hand_mask(player_deck)]
+
+        if fixed_stat is None:
+            (card_id, stat), _ = solver.best_move(bot_mask, opp_masks)
+            return self._card_by_id(card_id), stat
+
+        card_id, _ = solver.best_reply(bot_mask, opp_masks, fixed_stat)
+        return self._card_by_id(card_id)
+
+    def _root_stats(self, player_deck, fixed_stat):
+        """
+        Obtém as estatísticas [visitas, valor] de cada jogada na raiz.
+
+        Consulta primeiro a tabela de transposição: situações já buscadas o
+        bastante com a mesma configuração de busca são respondidas sem nova
+        busca. Caso contrário busca e acumula o resultado na tabela.
+
+        Com fixed_stat o bot defende e as jogadas são ids de carta; sem ele o
+        bot ataca e as jogadas são tuplas (id da carta, atributo).
+        """
+        key = None
+        if self.table is not None:
+            key = (hand_mask(self.deck), hand_mask(player_deck), fixed_stat,
+                   tuple(self.stats_list), self._table_config)
+            cached = self.table.get(key)
+            if cached and sum(entry[0] for entry in cached.values()) >= self.table_min_visits:
+                return cached
+
+        if self.workers > 1:
+            stats = self._parallel_root_stats(player_deck, fixed_stat)
+            if key is not None:
+                return self.table.store(key, stats)
+            return stats
+
+        stats = self._search_root(player_deck, fixed_stat)
+        if key is None:
+            return stats
+
+        # A raiz reaproveitada acumula buscas anteriores: guarda só o que é novo
+        root = self._root
+        if root.stored is None:
+            root.stored = {}
+        stored = root.stored.get(fixed_stat, {})
+        new = {
+            move: [visits - stored.get(move, (0, 0.0))[0], value - stored.get(move, (0, 0.0))[1]]
+            for move, (visits, value) in stats.items()
+        }
+        root.stored[fixed_stat] = stats
+        return self.table.store(key, new)
+
+    def _search_root(self, player_deck, fixed_stat):
+        """Busca serial a partir da raiz (reaproveitando a árvore anterior)."""
+        root, state = self._prepare(player_deck, bot_attacks=fixed_stat is None)
+        self._search(root, state, fixed_stat)
+
+        if fixed_stat is None:
+            moves = root.attack
+        else:
+            moves = root.response.get(fixed_stat, [0, {}])[1]
+
+        # Cópia: a árvore continua sendo atualizada nas próximas buscas
+        return {move: list(entry) for move, entry in moves.items()}
+
+    def _parallel_root_stats(self, player_deck, fixed_stat):
+        """
+        Paralelização na raiz: cada processo faz uma busca independente com
+        semente própria a partir da mesma raiz e as estatísticas são somadas.
+
+        Se um processo do pool morrer ou a busca falhar nele, o pool é
+        descartado (recriado na próxima jogada) e a jogada é decidida pela
+        busca serial, sem derrubar a requisição.
+        """
+        config = {
+            'simulations': self.simulations,
+            'time_budget_ms': self.time_budget_ms,
+            'exploration': self.exploration,
+            'rollout_batch': self.rollout_batch,
+        }
+
+        try:
+            pool = get_search_pool(self.workers)
+            futures = [
+                pool.submit(
+                    _parallel_search, list(self.deck), list(player_deck),
+                    self.stats_list, fixed_stat, config, self._seed_rng.randrange(2 ** 31)
+                )
+                for _ in range(self.workers)
+            ]
+            results = [future.result() for future in futures]
+        except BrokenProcessPool as e:
+            print(f"[MCTSBot] Pool da busca paralela quebrado ({e}); recriando e buscando em série")
+            shutdown_search_pool(wait=False)
+            return self._search_root(player_deck, fixed_stat)
+        except Exception as e:
+            print(f"[MCTSBot] Erro na busca paralela ({e!r}); buscando em série")
+            return self._search_root(player_deck, fixed_stat)
+
+        merged = {}
+        for result in results:
+            for move, (visits, value) in result.items():
+                entry = merged.setdefault(move, [0, 0.0])
+                entry[0] += visits
+                entry[1] += value
+
+        return merged
+
+    def _prepare(self, player_deck, bot_attacks):
+        """Indexa as cartas e obtém (ou reaproveita) a raiz da árvore."""
+        self._index_cards(player_deck)
+        state = (hand_mask(self.deck), hand_mask(player_deck), bot_attacks)
+
+        if self._root is not None and self._root_state == state:
+            root = self._root
+        elif self._root is not None and state in self._root.children:
+            # Reaproveita a subárvore da rodada anterior
+            root = self._root.children[state]
+        else:
+            root = _Node()
+
+        self._root = root
+        self._root_state = state
+        return root, state
+
+    def _search(self, root, state, fixed_stat):
+        """Executa iterações até esgotar o tempo ou o limite de iterações."""
+        deadline = None
+        if self.time_budget_ms is not None:
+            deadline = time.perf_counter() + self.time_budget_ms / 1000.0
+
+        rounds = min(bin(state[0]).count('1'), bin(state[1]).count('1'))
+        iterations = 0
+
+        while True:
+            self._iterate(root, state, fixed_stat, rounds)
+            iterations += 1
+
+            if self.simulations is not None and iterations >= self.simulations:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+
+        return iterations
+
+    def _iterate(self, root, state, fixed_stat, rounds):
+        """Uma iteração: seleção/expansão na árvore, rollout e retropropagação."""
+        bot_mask, opp_mask, bot_attacks = state
+        keys = self._keys
+        node = root
+        path = []      # (entrada de estatística, índice da rodada)
+        rewards = []   # resultado de cada rodada do ponto de vista do bot
+
+        while node is not None and bot_mask and opp_mask:
+            node.visits += 1
+            sign = 1 if bot_attacks else -1
+            att_mask, def_mask = (bot_mask, opp_mask) if bot_attacks else (opp_mask, bot_mask)
+
+            if fixed_stat is not None:
+                # Determinização: a carta já escolhida pelo oponente é sorteada
+                stat = fixed_stat
+                att_card = random.choice(mask_ids(att_mask))
+                fixed_stat = None
             else:
-                total_score += round_result
-        
-        return total_score / (self.simulations // depth)
+                moves = [(c, s) for c in mask_ids(att_mask) for s in self.stats_list]
+                (att_card, stat), entry = self._select(node.attack, moves, sign, node.visits)
+                path.append((entry, len(rewards)))
+
+            reply = node.response.get(stat)
+            if reply is None:
+                reply = node.response[stat] = [0, {}]
+            reply[0] += 1
+            def_card, entry = self._select(reply[1], mask_ids(def_mask), -sign, reply[0])
+            path.append((entry, len(rewards)))
+
+            bot_card, opp_card = (att_card, def_card) if bot_attacks else (def_card, att_card)
+            result = self._compare(keys[bot_card][stat], keys[opp_card][stat])
+            rewards.append(result)
+
+            bot_mask ^= 1 << bot_card
+            opp_mask ^= 1 << opp_card
+            if result != 0:
+                bot_attacks = result > 0
+
+            child_state = (bot_mask, opp_mask, bot_attacks)
+            child = node.children.get(child_state)
+            if child is None:
+                # Expansão: cria o nó e segue para o rollout
+                node.children[child_state] = _Node()
+                node = None
+            else:
+                node = child
+
+        # Valor da folha: média de rollouts vetorizados
+        returns = [0.0] * (len(rewards) + 1)
+        if bot_mask and opp_mask:
+            returns[-1] = float(self.engine.rollout(
+                mask_ids(bot_mask), mask_ids(opp_mask), self.rollout_batch
+            ).mean())
+
+        # Retropropaga o retorno a partir de cada rodada (normalizado)
+        for i in range(len(rewards) - 1, -1, -1):
+            returns[i] = returns[i + 1] + rewards[i]
+
+        for entry, index in path:
+            entry[0] += 1
+            entry[1] += returns[index] / rounds
+
+    def _select(self, stats, moves, sign, parent_visits):
+        """Seleção UCT; jogadas nunca tentadas têm prioridade."""
+        untried = [m for m in moves if m not in stats]
+        if untried:
+            move = random.choice(untried)
+            entry = stats[move] = [0, 0.0]
+            return move, entry
+
+        log_n = math.log(max(parent_visits, 1))
+        c = self.exploration
+        best_move = max(
+            moves,
+            key=lambda m: sign * stats[m][1] / stats[m][0] + c * math.sqrt(log_n / stats[m][0])
+        )
+        return best_move, stats[best_move]
+
+    @staticmethod
+    def _compare(key1, key2):
+        """Equivalente a evaluate() sobre chaves pré-calculadas."""
+        if key1 > key2:
+            return 1
+        elif key1 < key2:
+            return -1
+        return 0
+
+    def _index_cards(self, player_deck):
+        """Pré-calcula as chaves de comparação das cartas ainda não vistas."""
+        stats = set(STATS).union(self.stats_list)
+        cards = list(self.deck) + list(player_deck)
+        for card in cards:
+            if card['id'] not in self._keys:
+                self._keys[card['id']] = {stat: stat_key(card, stat) for stat in stats}
+        self.engine.index(cards)
+
+    def _card_by_id(self, card_id):
+        """Retorna a carta do deck do bot com o id informado."""
+        for card in self.deck:
+            if card['id'] == card_id:
+                return card
+        return None
@@ -0,0 +1,506 @@
+"""
+Livro de aberturas pré-calculado para as primeiras rodadas.
+
+O livro guarda a jogada calculada offline (python manage.py build-book)
+para situações do início do jogo, identificadas pelas duas mãos: a do bot
+e a do oponente (que o bot conhece). As situações partem de distribuições
+completas de um baralho, como no jogo web (13 cartas para o bot, 12 para o
+jogador), e cobrem as decisões das primeiras `rounds` rodadas; por padrão
+só as de defesa, as únicas do bot no jogo web, em uma amostra das
+distribuições (ver build_opening_book). O arquivo
+binário é mapeado em memória ao iniciar, então cada consulta custa apenas
+uma busca binária.
+
+Formato do arquivo (little-endian):
+    cabeçalho:  b'STBK', versão (uint16), número de seções (uint16)
+    seções:     nome (16 bytes), cartas iniciais do bot (uint16), cartas
+                iniciais do oponente (uint16), reservado (4 bytes), baralho
+                (bitmask dos ids, uint64), deslocamento (uint64), número de
+                entradas (uint64)
+    dados:      por seção, chaves uint64 ordenadas seguidas de valores uint16
+
+Chave:  (((mão do bot << n) | mão do oponente) << 3) | código do atributo,
+        com as mãos como bitmasks sobre as n cartas do baralho da seção
+        (na ordem dos ids, n até 30)
+Valor:  (id da carta << 3) | código do atributo
+O código 0 indica "sem atributo" (o bot ataca e escolhe o atributo); os
+demais são a posição em STATS + 1. Ids de carta vão até 60.
+"""
+
+from collections import deque
+import heapq
+import itertools
+import math
+import random
+import shutil
+import struct
+import tempfile
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import STATS, evaluate
+
+MAGIC = b'STBK'
+VERSION = 2
+MAX_CARD_ID = 60
+MAX_DECK_CARDS = 30
+
+# Distribuições sorteadas por padrão (o baralho inteiro leva dias de CPU)
+DEFAULT_DEALS = 20000
+# Distribuições por tarefa enviada aos processos
+DEALS_PER_JOB = 16
+
+_HEADER = struct.Struct('<4sHH')
+_SECTION = struct.Struct('<16sHH4xQQQ')
+
+
+def _stat_code(stat):
+    return 0 if stat is None else STATS.index(stat) + 1
+
+
+def _stat_from_code(code):
+    return None if code == 0 else STATS[code - 1]
+
+
+def deck_positions(deck_mask):
+    """Posição de cada id de carta no baralho de uma seção (id -> bit)."""
+    ids = [card_id for card_id in range(MAX_CARD_ID + 1) if deck_mask >> card_id & 1]
+    return {card_id: position for position, card_id in enumerate(ids)}
+
+
+def position_key(positions, cards, opponent_cards, stat=None):
+    """
+    Chave de uma situação no livro.
+
+    Args:
+        positions: Posições das cartas no baralho da seção (deck_positions)
+        cards, opponent_cards: Mãos do bot e do oponente
+        stat: Atributo escolhido pelo oponente (None se o bot ataca)
+
+    Raises:
+        KeyError: Se alguma carta não pertence ao baralho da seção
+    """
+    bot = 0
+    for card in cards:
+        bot |= 1 << positions[card['id']]
+    opponent = 0
+    for card in opponent_cards:
+        opponent |= 1 << positions[card['id']]
+    return (((bot << len(positions)) | opponent) << 3) | _stat_code(stat)
+
+
+class OpeningBook:
+    """Leitor do livro de aberturas (arquivo mapeado em memória)."""
+
+    def __init__(self, path):
+        """
+        Abre e mapeia o arquivo do livro.
+
+        Args:
+            path: Caminho do arquivo binário
+
+        Raises:
+            ValueError: Se o arquivo não for um livro válido (ou for de versão antiga)
+        """
+        self.path = path
+        self._data = np.memmap(path, dtype=np.uint8, mode='r')
+
+        magic, version, n_sections = _HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Arquivo de livro de aberturas inválido: {path}")
+
+        self.sections = {}
+        position = _HEADER.size
+        for _ in range(n_sections):
+            name, hand_size, opponent_size, deck_mask, offset, count = _SECTION.unpack_from(self._data, position)
+            position += _SECTION.size
+
+            keys = np.ndarray((count,), dtype='<u8', buffer=self._data, offset=offset)
+            values = np.ndarray((count,), dtype='<u2', buffer=self._data, offset=offset + 8 * count)
+            self.sections[name.rstrip(b'\0').decode('ascii')] = (
+                (hand_size, opponent_size), deck_positions(deck_mask), keys, values
+            )
+
+    def hand_sizes(self, section):
+        """Tamanhos das mãos iniciais (bot, oponente) de uma seção (None se ausente)."""
+        entry = self.sections.get(section)
+        return entry[0] if entry else None
+
+    def lookup(self, section, cards, stat=None, opponent_cards=()):
+        """
+        Consulta a jogada do livro para uma situação.
+
+        Args:
+            section: Nome da seção (tipo de bot, ex: 'mcts')
+            cards: Cartas na mão do bot
+            stat: Atributo escolhido pelo oponente (None se o bot ataca)
+            opponent_cards: Cartas na mão do oponente
+
+        Returns:
+            Tupla (id da carta, atributo) ou None se a situação não está no livro
+        """
+        entry = self.sections.get(section)
+        if entry is None:
+            return None
+
+        _, positions, keys, values = entry
+        try:
+            key = position_key(positions, cards, opponent_cards, stat)
+        except KeyError:
+            return None
+
+        index = int(np.searchsorted(keys, np.uint64(key)))
+        if index >= len(keys) or int(keys[index]) != key:
+            return None
+
+        value = int(values[index])
+        return value >> 3, _stat_from_code(value & 7)
+
+
+def _sorted_chunk(keys, values):
+    """Ordena um bloco de entradas pela chave e descarta chaves repetidas."""
+    keys = np.asarray(keys, dtype='<u8')
+    values = np.asarray(values, dtype='<u2')
+    order = np.argsort(keys, kind='stable')
+    keys, values = keys[order], values[order]
+    keep = np.ones(len(keys), dtype=bool)
+    keep[1:] = keys[1:] != keys[:-1]
+    return keys[keep], values[keep]
+
+
+def _merged_entries(chunks, block=1 << 20):
+    """
+    Intercala blocos ordenados de entradas, em blocos de até `block`
+    entradas (sem carregar tudo na memória). Chaves repetidas entre blocos
+    ficam com a primeira ocorrência.
+    """
+    if len(chunks) == 1:
+        keys, values = chunks[0]
+        for start in range(0, len(keys), block):
+            yield np.asarray(keys[start:start + block]), np.asarray(values[start:start + block])
+        return
+
+    def entries(index, keys, values):
+        for start in range(0, len(keys), block):
+            for key, value in zip(keys[start:start + block].tolist(), values[start:start + block].tolist()):
+                yield key, index, value
+
+    merged = heapq.merge(*(entries(i, keys, values) for i, (keys, values) in enumerate(chunks)))
+    out_keys, out_values = [], []
+    last = None
+    for key, _, value in merged:
+        if key == last:
+            continue
+        last = key
+        out_keys.append(key)
+        out_values.append(value)
+        if len(out_keys) >= block:
+            yield np.array(out_keys, dtype='<u8'), np.array(out_values, dtype='<u2')
+            out_keys, out_values = [], []
+    if out_keys:
+        yield np.array(out_keys, dtype='<u8'), np.array(out_values, dtype='<u2')
+
+
+def write_opening_book(path, sections):
+    """
+    Grava um livro de aberturas.
+
+    As entradas chegam em blocos ordenados e são intercaladas direto em
+    arquivos temporários, então o livro inteiro nunca fica na memória.
+
+    Args:
+        path: Caminho do arquivo de saída
+        sections: Dicionário nome -> (cartas do bot, cartas do oponente,
+            bitmask do baralho, blocos [(chaves, valores)] ordenados pela chave)
+
+    Returns:
+        Número total de entradas gravadas
+    """
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(dir=parent or None) as spill:
+        table = []
+        blobs = []
+        total = 0
+        offset = _HEADER.size + _SECTION.size * len(sections)
+        for index, (name, (hand_size, opponent_size, deck_mask, chunks)) in enumerate(sections.items()):
+            keys_path = os.path.join(spill, f'{index}.keys')
+            values_path = os.path.join(spill, f'{index}.values')
+            count = 0
+            with open(keys_path, 'wb') as keys_file, open(values_path, 'wb') as values_file:
+                for keys, values in _merged_entries(chunks):
+                    keys_file.write(keys.astype('<u8').tobytes())
+                    values_file.write(values.astype('<u2').tobytes())
+                    count += len(keys)
+
+            table.append(_SECTION.pack(name.encode('ascii'), hand_size, opponent_size, deck_mask,
+                                       offset, count))
+            blobs += [keys_path, values_path]
+            offset += 10 * count
+            total += count
+
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, len(sections)))
+            for entry in table:
+                f.write(entry)
+            for blob in blobs:
+                with open(blob, 'rb') as source:
+                    shutil.copyfileobj(source, f)
+
+    return total
+
+
+# Estado dos processos que calculam o livro (definido por _init_book_worker)
+_book_worker = {}
+
+
+def _init_book_worker(cards, rounds, budget_ms, defend_only, positions):
+    _book_worker.update(
+        cards={card['id']: card for card in cards}, rounds=rounds, budget_ms=budget_ms,
+        defend_only=defend_only, positions=positions
+    )
+
+
+def _book_entries_for_deals(deals):
+    """
+    Calcula as entradas do livro para um lote de distribuições (executado em
+    processo do pool).
+
+    A partir das duas mãos iniciais, registra a jogada do MCTSBot em cada
+    situação das primeiras `rounds` rodadas: na defesa a carta para cada
+    atributo e, fora do modo defend_only, no ataque (carta, atributo). As
+    situações seguintes cobrem todas as respostas do oponente às jogadas
+    registradas. No modo defend_only o bot defende em todas as rodadas, como
+    no jogo web, em que o jogador sempre escolhe o atributo.
+
+    Args:
+        deals: Lista de pares (ids da mão do bot, ids da mão do oponente)
+
+    Returns:
+        Tupla (chaves, valores) como arrays NumPy
+    """
+    from bots.mcts_bot import MCTSBot
+
+    cards = _book_worker['cards']
+    positions = _book_worker['positions']
+    budget_ms = _book_worker['budget_ms']
+    defend_only = _book_worker['defend_only']
+
+    def without(ids, card):
+        return tuple(card_id for card_id in ids if card_id != card['id'])
+
+    entries = {}
+    for hand, opponent in deals:
+        # (ids do bot, ids do oponente, bot ataca); None = início (ataque e defesa)
+        frontier = {(tuple(hand), tuple(opponent), False if defend_only else None)}
+
+        for _ in range(_book_worker['rounds']):
+            following = set()
+            for bot_ids, opp_ids, bot_attacks in frontier:
+                if not bot_ids or not opp_ids:
+                    continue
+                bot_cards = [cards[card_id] for card_id in bot_ids]
+                opp_cards = [cards[card_id] for card_id in opp_ids]
+
+                if bot_attacks is not False:
+                    bot = MCTSBot(list(bot_cards), time_budget_ms=budget_ms, transposition=False)
+                    card, stat = bot.choose_move(opp_cards, STATS)
+                    entries[position_key(positions, bot_cards, opp_cards)] = (card['id'] << 3) | _stat_code(stat)
+                    for opp_card in opp_cards:
+                        result = evaluate(card, opp_card, stat)
+                        following.add((without(bot_ids, card), without(opp_ids, opp_card), result >= 0))
+
+                if bot_attacks is not True:
+                    for stat in STATS:
+                        bot = MCTSBot(list(bot_cards), time_budget_ms=budget_ms, transposition=False)
+                        card = bot.choose_card(opp_cards, stat)
+                        entries[position_key(positions, bot_cards, opp_cards, stat)] = (
+                            (card['id'] << 3) | _stat_code(stat)
+                        )
+                        for opp_card in opp_cards:
+                            result = evaluate(card, opp_card, stat)
+                            attacks = False if defend_only else result > 0
+                            following.add((without(bot_ids, card), without(opp_ids, opp_card), attacks))
+
+            frontier = following
+
+    return (np.fromiter(entries.keys(), dtype='<u8', count=len(entries)),
+            np.fromiter(entries.values(), dtype='<u2', count=len(entries)))
+
+
+def _deals(cards, hand_size, limit, seed):
+    """
+    Distribuições (ids do bot, ids do oponente): todas as C(n, hand_size) se
+    `limit` for None ou cobrir todas; senão `limit` sorteadas sem repetição.
+    """
+    ids = [card['id'] for card in cards]
+    total = math.comb(len(ids), hand_size)
+
+    if limit is None or limit >= total:
+        hands = itertools.combinations(ids, hand_size)
+    else:
+        def sampled():
+            rng = random.Random(seed)
+            seen = set()
+            while len(seen) < limit:
+                hand = tuple(sorted(rng.sample(ids, hand_size)))
+                if hand not in seen:
+                    seen.add(hand)
+                    yield hand
+        hands = sampled()
+
+    for hand in hands:
+        chosen = set(hand)
+        yield hand, tuple(card_id for card_id in ids if card_id not in chosen)
+
+
+def _run_batches(deals, initargs, workers):
+    """
+    Calcula as distribuições em lotes de DEALS_PER_JOB, em série ou em um
+    pool com poucas tarefas na fila por vez (as distribuições são geradas
+    sob demanda).
+
+    Yields:
+        Tupla (distribuições do lote, (chaves, valores))
+    """
+    batches = iter(lambda: list(itertools.islice(deals, DEALS_PER_JOB)), [])
+
+    if workers <= 1:
+        _init_book_worker(*initargs)
+        for batch in batches:
+            yield len(batch), _book_entries_for_deals(batch)
+        return
+
+    from multiprocessing import Pool
+    with Pool(workers, initializer=_init_book_worker, initargs=initargs) as pool:
+        running = deque()
+        for batch in batches:
+            running.append((len(batch), pool.apply_async(_book_entries_for_deals, (batch,))))
+            if len(running) >= workers * 4:
+                count, result = running.popleft()
+                yield count, result.get()
+        while running:
+            count, result = running.popleft()
+            yield count, result.get()
+
+
+def build_opening_book(path, cards, hand_size=13, rounds=1, budget_ms=40, workers=1,
+                       limit=DEFAULT_DEALS, seed=0, defend_only=True, chunk_entries=1 << 20,
+                       progress=None):
+    """
+    Calcula e grava o livro do MCTSBot para distribuições do baralho.
+
+    Cada distribuição dá `hand_size` cartas ao bot e o resto ao oponente,
+    como no jogo web. Há C(len(cards), hand_size) distribuições (5.200.300
+    para 13 de 25 cartas, dias de CPU com a busca de 40 ms), então o padrão
+    sorteia `limit` delas: o livro acerta a abertura de cerca de
+    limit / C(n, hand_size) dos jogos. limit=None calcula todas.
+
+    Só o MCTSBot tem seção ('mcts'): o WeightedBot e o RLBot decidem em
+    microssegundos e não ganham nada com o livro.
+
+    As entradas vão para disco em blocos de até `chunk_entries` e são
+    intercaladas na gravação, então a memória não cresce com o livro.
+
+    Args:
+        path: Caminho do arquivo de saída
+        cards: Baralho completo
+        hand_size: Número de cartas na mão inicial do bot
+        rounds: Rodadas cobertas a partir do início
+        budget_ms: Tempo de busca por decisão
+        workers: Processos usados no cálculo
+        limit: Distribuições sorteadas (None = todas)
+        seed: Semente do sorteio das distribuições
+        defend_only: Só decisões de defesa, com o bot defendendo em todas as
+            rodadas (jogo web); False cobre também o ataque
+        chunk_entries: Entradas por bloco gravado em disco
+        progress: Função chamada com (distribuições processadas, total)
+
+    Returns:
+        Número de entradas do livro
+    """
+    if any(card['id'] > MAX_CARD_ID for card in cards):
+        raise ValueError(f"O livro de aberturas suporta ids de carta até {MAX_CARD_ID}")
+    if len(cards) > MAX_DECK_CARDS:
+        raise ValueError(f"O livro de aberturas suporta baralhos de até {MAX_DECK_CARDS} cartas")
+
+    deck_mask = 0
+    for card in cards:
+        deck_mask |= 1 << card['id']
+    positions = deck_positions(deck_mask)
+
+    total = math.comb(len(cards), hand_size)
+    if limit is not None:
+        total = min(total, limit)
+    deals = _deals(cards, hand_size, limit, seed)
+    initargs = (cards, rounds, budget_ms, defend_only, positions)
+
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(dir=parent or None) as spill:
+        chunks = []
+        pending_keys, pending_values = [], []
+
+        def spill_pending():
+            keys, values = _sorted_chunk(np.concatenate(pending_keys), np.concatenate(pending_values))
+            pending_keys.clear()
+            pending_values.clear()
+            if len(keys) == 0:
+                return
+            base = os.path.join(spill, str(len(chunks)))
+            np.save(base + '.keys.npy', keys)
+            np.save(base + '.values.npy', values)
+            chunks.append((np.load(base + '.keys.npy', mmap_mode='r'),
+                           np.load(base + '.values.npy', mmap_mode='r')))
+
+        done = 0
+        pending = 0
+        for count, (keys, values) in _run_batches(deals, initargs, workers):
+            pending_keys.append(keys)
+            pending_values.append(values)
+            pending += len(keys)
+            if pending >= chunk_entries:
+                spill_pending()
+                pending = 0
+            done += count
+            if progress:
+                progress(done, total)
+
+        if pending_keys:
+            spill_pending()
+
+        return write_opening_book(path, {
+            'mcts': (hand_size, len(cards) - hand_size, deck_mask, chunks)
+        })
+
+
+# Livros já abertos no processo (caminho -> OpeningBook)
+_loaded_books = {}
+
+
+def load_opening_book(path):
+    """
+    Abre (uma única vez por processo) o livro de aberturas.
+
+    Args:
+        path: Caminho do arquivo binário
+
+    Returns:
+        OpeningBook ou None se o arquivo não existir ou for inválido
+    """
+    path = os.path.abspath(path)
+    if path not in _loaded_books:
+        if not os.path.exists(path):
+            return None
+        try:
+            _loaded_books[path] = OpeningBook(path)
+        except ValueError as e:
+            print(f"[OpeningBook] {e}; recrie com python manage.py build-book")
+            return None
+    return _loaded_books[path]
@@ -0,0 +1,851 @@
+"""
+Replay buffer do RLBot (DQN).
+
+As transições ficam em arrays contíguos pré-alocados, em anel: a memória
+usada é fixa e conhecida na criação, e amostrar um batch é uma indexação
+vetorizada seguida de views torch.from_numpy (sem cópia para CPU).
+
+O armazenamento é separado da amostragem:
+- ReplayBuffer: amostragem uniforme sobre um "storage"
+- PrioritizedReplayBuffer: amostragem proporcional à prioridade (sum-tree)
+- ArrayStorage: estados completos em arrays NumPy
+- CompactStorage: apenas ids das cartas, atributo, ação, recompensa e fim;
+  os estados são reconstruídos em lote na amostragem
+- MemmapStorage: os mesmos registros compactos em shards no disco
+  (mapeados em memória), reabríveis entre execuções
+
+Um storage implementa capacity, __len__, append(...) -> índice e
+read(indices, out), e pode ser trocado sem alterar o buffer.
+
+state_dict()/load_state_dict() copiam o conteúdo (para checkpoints de
+treinamento); o MemmapStorage guarda só a posição do anel, porque os
+registros já estão no disco.
+
+Com n_step > 1 o buffer guarda retornos de n passos: a recompensa gravada
+é r_t + γ r_{t+1} + ... + γ^(n-1) r_{t+n-1} e o próximo estado é o de
+t+n. Quando o jogo acaba antes, a soma para no fim e a transição fica com
+done=1, então o bootstrap do learn() usa sempre γ^n.
+"""
+
+import json
+import os
+from collections import deque
+import numpy as np
+import torch
+
+
+class _RingStorage:
+    """Controle de posição/tamanho do anel compartilhado pelos storages."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._position = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _next_index(self):
+        """Posição da próxima escrita no anel."""
+        index = self._position
+        self._position = (self._position + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        return index
+
+    def _next_indices(self, count):
+        """Posições das próximas `count` escritas no anel."""
+        indices = (self._position + np.arange(count)) % self.capacity
+        self._position = (self._position + count) % self.capacity
+        self._size = min(self._size + count, self.capacity)
+        return indices
+
+    def state_dict(self):
+        """Cópia do conteúdo (para checkpoints)."""
+        return {'capacity': self.capacity, 'position': self._position, 'size': self._size}
+
+    def load_state_dict(self, state):
+        """Restaura o conteúdo de state_dict()."""
+        if state['capacity'] != self.capacity:
+            raise ValueError(f"Checkpoint do replay tem capacidade {state['capacity']}, "
+                             f"o buffer atual tem {self.capacity}")
+        self._position = state['position']
+        self._size = state['size']
+
+
+class ArrayStorage(_RingStorage):
+    """Transições completas (estado e próximo estado) em arrays pré-alocados."""
+
+    def __init__(self, capacity, state_size):
+        """
+        Aloca os arrays.
+
+        Args:
+            capacity: Número máximo de transições (as mais antigas são sobrescritas)
+            state_size: Tamanho do vetor de estado
+        """
+        super().__init__(capacity)
+        self.state_size = state_size
+
+        self.states = np.zeros((capacity, state_size), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros((capacity, state_size), dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=np.float32)
+
+    def append(self, state, action, reward, next_state, done):
+        """
+        Grava uma transição.
+
+        Args:
+            state, next_state: Vetores de estado (tensor ou array)
+            action: Índice da carta jogada
+            reward: Recompensa
+            done: Fim de jogo (bool/float)
+
+        Returns:
+            Índice da transição no storage
+        """
+        index = self._next_index()
+        self.states[index] = _as_array(state)
+        self.actions[index] = action
+        self.rewards[index] = reward
+        self.next_states[index] = _as_array(next_state)
+        self.dones[index] = done
+        return index
+
+    def append_batch(self, states, actions, rewards, next_states, dones):
+        """
+        Grava várias transições de uma vez (arrays com a mesma primeira dimensão).
+
+        Returns:
+            Array de índices das transições
+        """
+        indices = self._next_indices(len(actions))
+        self.states[indices] = states
+        self.actions[indices] = actions
+        self.rewards[indices] = rewards
+        self.next_states[indices] = next_states
+        self.dones[indices] = dones
+        return indices
+
+    def state_dict(self):
+        state = super().state_dict()
+        for name in ('states', 'actions', 'rewards', 'next_states', 'dones'):
+            state[name] = getattr(self, name)[:self._size].copy()
+        return state
+
+    def load_state_dict(self, state):
+        super().load_state_dict(state)
+        for name in ('states', 'actions', 'rewards', 'next_states', 'dones'):
+            getattr(self, name)[:self._size] = state[name]
+
+    def read(self, indices, out):
+        """
+        Copia as transições indicadas para os arrays de saída.
+
+        Args:
+            indices: Array de índices
+            out: Tupla (states, actions, rewards, next_states, dones) pré-alocada
+        """
+        states, actions, rewards, next_states, dones = out
+        np.take(self.states, indices, axis=0, out=states)
+        np.take(self.actions, indices, out=actions)
+        np.take(self.rewards, indices, out=rewards)
+        np.take(self.next_states, indices, axis=0, out=next_states)
+        np.take(self.dones, indices, out=dones)
+
+
+def compact_dtype(hand_width):
+    """
+    Registro de largura fixa de uma transição compacta.
+
+    Args:
+        hand_width: Máximo de cartas por mão guardadas
+
+    Returns:
+        np.dtype estruturado (56 bytes para hand_width=12)
+    """
+    return np.dtype([
+        ('hand', np.int16, (hand_width,)),
+        ('next_hand', np.int16, (hand_width,)),
+        ('stat', np.int8),
+        ('next_stat', np.int8),
+        ('action', np.int8),
+        ('done', np.uint8),
+        ('reward', np.float32),
+    ])
+
+
+class CompactStorage(_RingStorage):
+    """
+    Transições codificadas por ids de carta.
+
+    Cada transição é um registro compact_dtype: as mãos antes/depois como
+    ids int16 (-1 = sem carta), os índices de atributo (int8), a ação, a
+    recompensa e o fim: 56 bytes contra ~740 bytes de dois estados float32
+    completos. Os estados são montados na leitura pelo `featurize`, que
+    recebe (ids (B, W), atributos (B,), saída (B, state_size)).
+    """
+
+    def __init__(self, capacity, hand_width, featurize):
+        """
+        Aloca os registros.
+
+        Args:
+            capacity: Número máximo de transições
+            hand_width: Máximo de cartas por mão guardadas (ACTION_SIZE)
+            featurize: Função que monta estados a partir de ids e atributos
+        """
+        super().__init__(capacity)
+        self.hand_width = hand_width
+        self.featurize = featurize
+        self.dtype = compact_dtype(hand_width)
+        self._allocate()
+
+    def _allocate(self):
+        self.records = np.zeros(self.capacity, dtype=self.dtype)
+
+    def _slot(self, index):
+        """Array e posição onde o registro `index` é gravado."""
+        return self.records, index
+
+    def _gather(self, indices):
+        """Registros dos índices indicados (array estruturado)."""
+        return self.records[indices]
+
+    def _scatter(self, indices, records):
+        """Grava registros nos índices indicados."""
+        self.records[indices] = records
+
+    def nbytes(self):
+        """Memória ocupada pelas transições."""
+        return self.capacity * self.dtype.itemsize
+
+    def append(self, state, action, reward, next_state, done):
+        raise TypeError("CompactStorage guarda ids de carta; use ReplayBuffer.add_cards()")
+
+    def append_cards(self, hand_ids, stat, action, reward, next_hand_ids, next_stat, done):
+        """
+        Grava uma transição.
+
+        Args:
+            hand_ids, next_hand_ids: Ids das cartas na mão (até hand_width)
+            stat, next_stat: Índices de atributo (-1 = nenhum)
+            action: Índice da carta jogada
+            reward: Recompensa
+            done: Fim de jogo
+
+        Returns:
+            Índice da transição no storage
+        """
+        index = self._next_index()
+        array, position = self._slot(index)
+        array[position] = (
+            self._padded(hand_ids), self._padded(next_hand_ids),
+            stat, next_stat, action, done, reward
+        )
+        return index
+
+    def append_cards_batch(self, hands, stats, actions, rewards, next_hands, next_stats, dones):
+        """
+        Grava várias transições de uma vez.
+
+        Args:
+            hands, next_hands: Arrays (N, W) de ids (-1 = sem carta), W <= hand_width
+            stats, next_stats, actions, rewards, dones: Arrays (N,)
+
+        Returns:
+            Array de índices das transições
+        """
+        count = len(actions)
+        records = np.zeros(count, dtype=self.dtype)
+        records['hand'] = -1
+        records['next_hand'] = -1
+        records['hand'][:, :hands.shape[1]] = hands
+        records['next_hand'][:, :next_hands.shape[1]] = next_hands
+        records['stat'] = stats
+        records['next_stat'] = next_stats
+        records['action'] = actions
+        records['reward'] = rewards
+        records['done'] = dones
+
+        indices = self._next_indices(count)
+        self._scatter(indices, records)
+        return indices
+
+    def state_dict(self):
+        state = super().state_dict()
+        state['records'] = self._gather(np.arange(self._size))
+        return state
+
+    def load_state_dict(self, state):
+        super().load_state_dict(state)
+        self._scatter(np.arange(self._size), state['records'])
+
+    def _padded(self, ids):
+        ids = list(ids[:self.hand_width])
+        return ids + [-1] * (self.hand_width - len(ids))
+
+    def read(self, indices, out):
+        states, actions, rewards, next_states, dones = out
+        records = self._gather(indices)
+
+        self.featurize(records['hand'], records['stat'], states)
+        self.featurize(records['next_hand'], records['next_stat'], next_states)
+        actions[:] = records['action']
+        rewards[:] = records['reward']
+        dones[:] = records['done']
+
+
+class MemmapStorage(CompactStorage):
+    """
+    Registros compactos em disco, em arquivos mapeados em memória.
+
+    Os registros ficam em shards de tamanho fixo (shard_00000.bin, ...) e o
+    estado do anel (tamanho, posição) em meta.json. Um diretório existente é
+    reaberto com o conteúdo anterior, então o replay sobrevive entre
+    execuções e pode passar do tamanho da RAM. Transições gravadas depois do
+    último flush() não entram no meta.json e são ignoradas ao reabrir.
+    """
+
+    META_FILE = 'meta.json'
+    VERSION = 1
+
+    def __init__(self, directory, capacity, hand_width, featurize, shard_size=1 << 20):
+        """
+        Abre ou cria o replay em disco.
+
+        Args:
+            directory: Diretório dos shards
+            capacity: Número máximo de transições (ignorado ao reabrir)
+            hand_width: Máximo de cartas por mão guardadas
+            featurize: Função que monta estados a partir de ids e atributos
+            shard_size: Registros por arquivo (ignorado ao reabrir)
+
+        Raises:
+            ValueError: Se o diretório tiver um replay de formato diferente
+        """
+        self.directory = directory
+        self.shard_size = shard_size
+        self._shards = {}
+
+        meta = self._read_meta()
+        if meta is not None:
+            if meta.get('version') != self.VERSION or meta.get('hand_width') != hand_width:
+                raise ValueError(f"Replay em {directory} tem formato incompatível")
+            capacity = meta['capacity']
+            self.shard_size = meta['shard_size']
+
+        super().__init__(capacity, hand_width, featurize)
+
+        if meta is not None:
+            self._size = meta['size']
+            self._position = meta['position']
+            print(f"[Replay] {self._size:,} transições reabertas de {directory}")
+
+    def _allocate(self):
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _read_meta(self):
+        path = os.path.join(self.directory, self.META_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _shard(self, number):
+        """Abre (ou cria) o shard `number`."""
+        shard = self._shards.get(number)
+        if shard is None:
+            path = os.path.join(self.directory, f'shard_{number:05d}.bin')
+            length = min(self.shard_size, self.capacity - number * self.shard_size)
+            mode = 'r+' if os.path.exists(path) else 'w+'
+            shard = self._shards[number] = np.memmap(path, dtype=self.dtype, mode=mode, shape=(length,))
+        return shard
+
+    def _slot(self, index):
+        return self._shard(index // self.shard_size), index % self.shard_size
+
+    def _gather(self, indices):
+        indices = np.asarray(indices)
+        shards = indices // self.shard_size
+        offsets = indices % self.shard_size
+
+        records = np.empty(len(indices), dtype=self.dtype)
+        for number in np.unique(shards):
+            mask = shards == number
+            records[mask] = self._shard(int(number))[offsets[mask]]
+        return records
+
+    def _scatter(self, indices, records):
+        shards = indices // self.shard_size
+        offsets = indices % self.shard_size
+        for number in np.unique(shards):
+            mask = shards == number
+            self._shard(int(number))[offsets[mask]] = records[mask]
+
+    def nbytes(self):
+        """Memória residente fixa (os registros ficam em disco)."""
+        return 0
+
+    def state_dict(self):
+        """Grava os registros em disco e guarda só a posição do anel."""
+        self.flush()
+        state = _RingStorage.state_dict(self)
+        state['directory'] = os.path.abspath(self.directory)
+        return state
+
+    def load_state_dict(self, state):
+        """
+        Volta o anel à posição do checkpoint. Transições gravadas depois dele
+        ficam fora do conteúdo válido e são sobrescritas.
+        """
+        _RingStorage.load_state_dict(self, state)
+
+    def flush(self):
+        """Grava os shards e o estado do anel em disco."""
+        for shard in self._shards.values():
+            shard.flush()
+
+        meta = {
+            'version': self.VERSION,
+            'hand_width': self.hand_width,
+            'dtype': self.dtype.descr,
+            'capacity': self.capacity,
+            'shard_size': self.shard_size,
+            'size': self._size,
+            'position': self._position,
+        }
+        path = os.path.join(self.directory, self.META_FILE)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def close(self):
+        """Grava tudo e fecha os arquivos."""
+        self.flush()
+        self._shards.clear()
+
+
+def n_step_returns(rewards, dones, n_step, gamma):
+    """
+    Retornos de n passos de transições gravadas em ordem, jogo a jogo.
+
+    Args:
+        rewards, dones: Arrays (N,); cada jogo termina com done=1
+        n_step: Passos somados
+        gamma: Fator de desconto
+
+    Returns:
+        Tupla (retornos (N,) float32, índice da última transição somada (N,))
+    """
+    count = len(rewards)
+    positions = np.arange(count)
+    ends = np.flatnonzero(dones)
+    # fim do jogo de cada transição (o resto sem done conta até o fim do lote)
+    game_end = np.append(ends, count - 1)[np.searchsorted(ends, positions)]
+    last = np.minimum(positions + n_step - 1, game_end)
+
+    returns = np.zeros(count, dtype=np.float64)
+    for k in range(n_step):
+        index = positions + k
+        valid = index <= last
+        returns[valid] += gamma ** k * rewards[index[valid]]
+    return returns.astype(np.float32), last
+
+
+def _as_array(state):
+    """Tensor (qualquer device) ou array -> array NumPy."""
+    if isinstance(state, torch.Tensor):
+        return state.detach().cpu().numpy()
+    return state
+
+
+class ReplayBuffer:
+    """
+    Replay buffer com amostragem uniforme.
+
+    Os batches retornados por sample() são views de arrays internos
+    reaproveitados: valem até a próxima chamada de sample().
+    """
+
+    def __init__(self, capacity, state_size, device=None, storage=None, seed=None,
+                 n_step=1, gamma=0.99):
+        """
+        Inicializa o buffer.
+
+        Args:
+            capacity: Número máximo de transições
+            state_size: Tamanho do vetor de estado
+            device: Device dos tensores retornados (padrão: cpu)
+            storage: Storage alternativo (padrão: ArrayStorage(capacity, state_size))
+            seed: Semente da amostragem (opcional)
+            n_step: Passos somados em cada recompensa gravada (1 = transição simples)
+            gamma: Fator de desconto dos retornos de n passos
+        """
+        if n_step < 1:
+            raise ValueError(f"n_step deve ser >= 1 (recebido {n_step})")
+        self.storage = storage if storage is not None else ArrayStorage(capacity, state_size)
+        self.capacity = self.storage.capacity
+        self.state_size = state_size
+        self.device = device or torch.device("cpu")
+        self.rng = np.random.default_rng(seed)
+        self.n_step = n_step
+        self.gamma = gamma
+
+        # transições ainda sem os n passos seguintes (add/add_cards)
+        self._pending = deque()
+
+        # batch_size -> arrays de saída
+        self._batches = {}
+
+    def __len__(self):
+        return len(self.storage)
+
+    def add(self, state, action, reward, next_state, done):
+        """
+        Armazena uma transição.
+
+        Returns:
+            Índice da transição (com n_step > 1, da última gravada ou None
+            enquanto faltam passos)
+        """
+        return self._push(self.storage.append, (state,), int(action), float(reward),
+                          (next_state,), float(done))
+
+    def add_cards(self, hand_ids, stat, action, reward, next_hand_ids, next_stat, done):
+        """
+        Armazena uma transição por ids de carta (storages compactos).
+
+        Returns:
+            Índice da transição (como em add())
+        """
+        return self._push(self.storage.append_cards, (hand_ids, stat), int(action), float(reward),
+                          (next_hand_ids, next_stat), bool(done))
+
+    def _push(self, append, head, action, reward, tail, done):
+        """
+        Grava a transição (n_step=1) ou a acumula até ter os n passos
+        seguintes ou o fim do jogo.
+        """
+        if self.n_step == 1:
+            index = append(*head, action, reward, *tail, done)
+            self._stored(index)
+            return index
+
+        self._pending.append((append, head, action, reward))
+        index = None
+        while self._pending and (done or len(self._pending) >= self.n_step):
+            first_append, first_head, first_action, _ = self._pending[0]
+            ret = sum(self.gamma ** k * item[3] for k, item in enumerate(self._pending))
+            index = first_append(*first_head, first_action, ret, *tail, done)
+            self._stored(index)
+            self._pending.popleft()
+        return index
+
+    def _n_step_batch(self, rewards, dones):
+        """Retornos e índices do fim da janela de cada transição de um lote."""
+        dones = np.asarray(dones)
+        if len(dones) and not dones[-1]:
+            raise ValueError("Com n_step > 1 os lotes precisam conter jogos completos (último done=1)")
+        return n_step_returns(np.asarray(rewards, dtype=np.float32), dones, self.n_step, self.gamma)
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        """
+        Armazena várias transições de uma vez (com n_step > 1, jogos
+        completos em ordem).
+
+        Returns:
+            Array de índices
+        """
+        if self.n_step > 1:
+            rewards, last = self._n_step_batch(rewards, dones)
+            next_states, dones = next_states[last], np.asarray(dones)[last]
+        indices = self.storage.append_batch(states, actions, rewards, next_states, dones)
+        self._stored(indices)
+        return indices
+
+    def add_cards_batch(self, hands, stats, actions, rewards, next_hands, next_stats, dones):
+        """
+        Armazena várias transições por ids de carta (storages compactos).
+
+        Returns:
+            Array de índices
+        """
+        if self.n_step > 1:
+            rewards, last = self._n_step_batch(rewards, dones)
+            next_hands, next_stats, dones = next_hands[last], np.asarray(next_stats)[last], np.asarray(dones)[last]
+        indices = self.storage.append_cards_batch(hands, stats, actions, rewards,
+                                                  next_hands, next_stats, dones)
+        self._stored(indices)
+        return indices
+
+    def _stored(self, index):
+        """Chamado após cada gravação (um índice ou array de índices)."""
+
+    def sample_indices(self, batch_size):
+        """Sorteia `batch_size` índices de transições armazenadas."""
+        return self.rng.integers(len(self.storage), size=batch_size)
+
+    def get_batch(self, indices):
+        """
+        Lê as transições indicadas como tensores.
+
+        Returns:
+            Tupla (states (B, S), actions (B, 1) long, rewards (B, 1),
+            next_states (B, S), dones (B, 1))
+        """
+        batch_size = len(indices)
+        out = self._batches.get(batch_size)
+        if out is None:
+            out = self._batches[batch_size] = (
+                np.zeros((batch_size, self.state_size), dtype=np.float32),
+                np.zeros(batch_size, dtype=np.int64),
+                np.zeros(batch_size, dtype=np.float32),
+                np.zeros((batch_size, self.state_size), dtype=np.float32),
+                np.zeros(batch_size, dtype=np.float32),
+            )
+
+        self.storage.read(indices, out)
+        states, actions, rewards, next_states, dones = (
+            torch.from_numpy(array).to(self.device) for array in out
+        )
+        return (
+            states,
+            actions.unsqueeze(1),
+            rewards.unsqueeze(1),
+            next_states,
+            dones.unsqueeze(1),
+        )
+
+    def flush(self):
+        """Grava em disco o conteúdo de storages persistentes."""
+        flush = getattr(self.storage, 'flush', None)
+        if flush is not None:
+            flush()
+
+    def state_dict(self):
+        """
+        Cópia do conteúdo e do gerador de amostragem (para checkpoints).
+        Transições pendentes de n passos (jogo em andamento) não entram.
+        """
+        return {'storage': self.storage.state_dict(), 'rng': self.rng.bit_generator.state}
+
+    def load_state_dict(self, state):
+        """Restaura o conteúdo de state_dict()."""
+        self.storage.load_state_dict(state['storage'])
+        self.rng.bit_generator.state = state['rng']
+
+    def sample(self, batch_size):
+        """
+        Amostra um batch uniforme.
+
+        Returns:
+            Mesma tupla de get_batch()
+        """
+        return self.get_batch(self.sample_indices(batch_size))
+
+
+class SumTree:
+    """
+    Árvore binária de somas sobre as prioridades (com árvore de mínimos em
+    paralelo). Atualização e amostragem em O(log n), vetorizadas sobre o
+    batch de índices.
+    """
+
+    def __init__(self, capacity):
+        """
+        Args:
+            capacity: Número de folhas utilizáveis
+        """
+        self.capacity = capacity
+        self._leaves = 1 << max(0, (capacity - 1).bit_length())
+        self._depth = self._leaves.bit_length() - 1
+        self._sum = np.zeros(2 * self._leaves, dtype=np.float64)
+        self._min = np.full(2 * self._leaves, np.inf, dtype=np.float64)
+
+    def total(self):
+        """Soma de todas as prioridades."""
+        return self._sum[1]
+
+    def min(self):
+        """Menor prioridade armazenada (inf se vazia)."""
+        return self._min[1]
+
+    def get(self, indices):
+        """Prioridades das folhas indicadas."""
+        return self._sum[self._leaves + np.asarray(indices)]
+
+    def update(self, indices, priorities):
+        """
+        Define as prioridades das folhas indicadas e atualiza os ancestrais.
+
+        Args:
+            indices: Array de índices de folha
+            priorities: Array de prioridades (>= 0)
+        """
+        nodes = self._leaves + np.asarray(indices, dtype=np.int64)
+        self._sum[nodes] = priorities
+        self._min[nodes] = priorities
+
+        for _ in range(self._depth):
+            nodes = np.unique(nodes >> 1)
+            left = nodes << 1
+            self._sum[nodes] = self._sum[left] + self._sum[left + 1]
+            self._min[nodes] = np.minimum(self._min[left], self._min[left + 1])
+
+    def find(self, values):
+        """
+        Folhas cuja soma acumulada contém cada valor.
+
+        Args:
+            values: Array de valores em [0, total())
+
+        Returns:
+            Array de índices de folha
+        """
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+
+        for _ in range(self._depth):
+            left = nodes << 1
+            left_sum = self._sum[left]
+            go_right = values >= left_sum
+            values -= np.where(go_right, left_sum, 0.0)
+            nodes = left + go_right
+
+        return nodes - self._leaves
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    Prioritized experience replay (proporcional).
+
+    A probabilidade de amostrar a transição i é p_i^α / Σ p^α, com p_i o
+    último erro TD absoluto da transição. Transições novas entram com a
+    maior prioridade já vista. O viés da amostragem é corrigido com pesos
+    de importance sampling (N·P(i))^-β normalizados pelo maior peso.
+
+    α e β variam linearmente do valor inicial ao final em `anneal_steps`
+    amostragens; a mudança de α vale para as prioridades gravadas a partir
+    daquele momento.
+    """
+
+    def __init__(self, capacity, state_size, device=None, storage=None, seed=None,
+                 n_step=1, gamma=0.99, alpha=0.6, beta=0.4, alpha_final=None, beta_final=1.0,
+                 anneal_steps=100000, epsilon=1e-5):
+        """
+        Inicializa o buffer.
+
+        Args:
+            capacity, state_size, device, storage, seed, n_step, gamma: Como em ReplayBuffer
+            alpha: Expoente das prioridades (0 = uniforme)
+            beta: Expoente inicial da correção de importance sampling
+            alpha_final: α ao fim do annealing (padrão: α constante)
+            beta_final: β ao fim do annealing
+            anneal_steps: Amostragens até atingir os valores finais
+            epsilon: Soma às prioridades para que nenhuma transição fique com 0
+        """
+        super().__init__(capacity, state_size, device=device, storage=storage, seed=seed,
+                         n_step=n_step, gamma=gamma)
+
+        self.alpha_start = alpha
+        self.alpha_final = alpha if alpha_final is None else alpha_final
+        self.beta_start = beta
+        self.beta_final = beta_final
+        self.anneal_steps = max(1, anneal_steps)
+        self.epsilon = epsilon
+
+        self.tree = SumTree(self.capacity)
+        self.max_priority = 1.0
+        self._samples = 0
+
+        # Storage reaberto do disco: as prioridades não são persistidas
+        if len(self.storage):
+            self.tree.update(np.arange(len(self.storage)), np.ones(len(self.storage)))
+
+    def state_dict(self):
+        state = super().state_dict()
+        state['priorities'] = self.tree.get(np.arange(len(self.storage))).copy()
+        state['max_priority'] = self.max_priority
+        state['samples'] = self._samples
+        return state
+
+    def load_state_dict(self, state):
+        super().load_state_dict(state)
+        self.tree = SumTree(self.capacity)
+        if len(self.storage):
+            self.tree.update(np.arange(len(self.storage)), state['priorities'])
+        self.max_priority = state['max_priority']
+        self._samples = state['samples']
+
+    @property
+    def alpha(self):
+        fraction = min(1.0, self._samples / self.anneal_steps)
+        return self.alpha_start + fraction * (self.alpha_final - self.alpha_start)
+
+    @property
+    def beta(self):
+        fraction = min(1.0, self._samples / self.anneal_steps)
+        return self.beta_start + fraction * (self.beta_final - self.beta_start)
+
+    def _stored(self, index):
+        indices = np.atleast_1d(index)
+        self.tree.update(indices, np.full(len(indices), self.max_priority ** self.alpha))
+
+    def sample_indices(self, batch_size):
+        """Amostragem estratificada proporcional às prioridades."""
+        indices, _ = self.sample_weighted(batch_size)
+        return indices
+
+    def sample_weighted(self, batch_size):
+        """
+        Sorteia índices proporcionalmente às prioridades.
+
+        Returns:
+            Tupla (índices, pesos de importance sampling como tensor (B, 1))
+        """
+        total = self.tree.total()
+        segment = total / batch_size
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+        values = np.minimum(values, np.nextafter(total, 0))
+
+        indices = self.tree.find(values)
+        # Proteção contra arredondamento: folhas fora do conteúdo atual
+        indices = np.minimum(indices, len(self.storage) - 1)
+
+        size = len(self.storage)
+        beta = self.beta
+        probabilities = self.tree.get(indices) / total
+        weights = (size * np.maximum(probabilities, 1e-12)) ** -beta
+        max_weight = (size * self.tree.min() / total) ** -beta
+        weights = (weights / max_weight).astype(np.float32)
+
+        self._samples += 1
+        return indices, torch.from_numpy(weights).to(self.device).unsqueeze(1)
+
+    def sample(self, batch_size):
+        """
+        Amostra um batch prioritizado.
+
+        Returns:
+            Tupla (batch como em get_batch(), índices, pesos (B, 1))
+        """
+        indices, weights = self.sample_weighted(batch_size)
+        return self.get_batch(indices), indices, weights
+
+    def update_priorities(self, indices, td_errors):
+        """
+        Atualiza as prioridades após um passo de aprendizado.
+
+        Args:
+            indices: Índices retornados pela amostragem
+            td_errors: Erros TD (array ou tensor) das transições
+        """
+        if isinstance(td_errors, torch.Tensor):
+            td_errors = td_errors.detach().cpu().numpy()
+        priorities = np.abs(np.asarray(td_errors, dtype=np.float64).reshape(-1)) + self.epsilon
+
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(indices, priorities ** self.alpha)
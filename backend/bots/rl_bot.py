@@ -4,8 +4,12 @@ import torch.optim as optim
 import torch.nn.functional as F
 import numpy as np
 import random
-from collections import deque
+import copy
 import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bots.replay import ReplayBuffer, PrioritizedReplayBuffer, CompactStorage, MemmapStorage
 
 # Ajuste conforme seu jogo: 12 cartas por jogador, 7 atributos por carta
 STATS_COUNT = 7      # número de atributos por carta (ex: HP, torque, 0-100, top_speed, ...)
@@ -18,17 +22,39 @@ class QNetwork(nn.Module):
     """
     Rede neural que recebe o vetor de estado e retorna Q-values para cada ação.
     state_size deve ser STATE_INPUT_SIZE (fixo).
+
+    Com dueling=True a saída fc3 passa a ser a vantagem A(s, a) e uma cabeça
+    `value` estima V(s): Q = V + A - média(A). Sem dueling o state_dict é o
+    mesmo de sempre (fc1, fc2, fc3), compatível com os modelos já salvos.
     """
-    def __init__(self, state_size=STATE_INPUT_SIZE, action_size=ACTION_SIZE):
+    def __init__(self, state_size=STATE_INPUT_SIZE, action_size=ACTION_SIZE, dueling=False):
         super(QNetwork, self).__init__()
+        self.dueling = dueling
         self.fc1 = nn.Linear(state_size, 128)
         self.fc2 = nn.Linear(128, 128)
         self.fc3 = nn.Linear(128, action_size)
+        if dueling:
+            self.value = nn.Linear(128, 1)
 
     def forward(self, state):
         x = F.relu(self.fc1(state))
         x = F.relu(self.fc2(x))
-        return self.fc3(x)
+        if not self.dueling:
+            return self.fc3(x)
+        advantage = self.fc3(x)
+        return self.value(x) + advantage - advantage.mean(dim=-1, keepdim=True)
+
+    @staticmethod
+    def is_dueling(state_dict):
+        """Indica se um state_dict é de uma rede dueling."""
+        return 'value.weight' in state_dict
+
+    @classmethod
+    def from_state_dict(cls, state_dict):
+        """Cria a rede com a arquitetura do state_dict e carrega os pesos."""
+        network = cls(state_size=STATE_INPUT_SIZE, action_size=ACTION_SIZE, dueling=cls.is_dueling(state_dict))
+        network.load_state_dict(state_dict)
+        return network
 
 
 class RLBot:
@@ -36,8 +62,21 @@ class RLBot:
     Bot DQN para Super Trunfo com estado fixo baseado em ACTION_SIZE cartas.
     - Sempre constrói um vetor de tamanho fixo STATE_INPUT_SIZE (91 no seu caso)
     - step() armazena transições; learn() atualiza redes
+    - prioritized=True usa prioritized experience replay (per_alpha/per_beta
+      são os expoentes do PER; alpha continua sendo a taxa de aprendizado)
+    - compact_replay=True guarda as transições por ids de carta (use remember());
+      os estados são reconstruídos em lote na amostragem
+    - replay_dir guarda o replay compacto em disco (memmap), reaberto entre execuções
+    - double_dqn=True escolhe a próxima ação com a rede local e a avalia com a
+      target; dueling=True usa a cabeça dueling (ver QNetwork); n_step > 1
+      guarda retornos de n passos no replay (bootstrap com gamma^n);
+      huber=True troca o MSE pela loss de Huber
     """
-    def __init__(self, deck, stats_list, qfile=None, epsilon=1.0, alpha=0.0005, gamma=0.99):
+    def __init__(self, deck, stats_list, qfile=None, epsilon=1.0, alpha=0.0005, gamma=0.99,
+                 prioritized=False, per_alpha=0.6, per_beta=0.4, per_alpha_final=None,
+                 per_beta_final=1.0, per_anneal_steps=100000, replay_capacity=20000,
+                 compact_replay=False, replay_dir=None, replay_shard_size=1 << 20, batch_size=64,
+                 tau=1e-3, double_dqn=False, dueling=False, n_step=1, huber=False):
         self.deck = deck or []
         self.stats_list = stats_list
         self.epsilon = epsilon
@@ -51,10 +90,18 @@ class RLBot:
             # não faz crash, apenas alerta; mas a rede foi definida para STATS_COUNT
             print(f"[RLBot] Atenção: stats_list length ({len(self.stats_list)}) != STATS_COUNT ({STATS_COUNT}).")
 
+        # features por carta: linha 0 é o padding (zeros); id da carta -> linha
+        self._stat_index = {stat: i for i, stat in enumerate(self.stats_list) if i < STATS_COUNT}
+        self._card_rows = {}
+        self._features = np.zeros((1, STATS_COUNT), dtype=np.float32)
+        self._id_rows = np.zeros(1, dtype=np.intp)   # id -> linha (para ids em lote)
+        self._init_buffers()
+
         # redes
-        self.qnetwork_local = QNetwork(state_size=STATE_INPUT_SIZE, action_size=self.action_size).to(self.device)
-        self.qnetwork_target = QNetwork(state_size=STATE_INPUT_SIZE, action_size=self.action_size).to(self.device)
-        self.optimizer = optim.Adam(self.qnetwork_local.parameters(), lr=self.alpha)
+        self.double_dqn = double_dqn
+        self.n_step = n_step
+        self.huber = huber
+        self._build_networks(dueling)
 
         # carrega pesos se existir
         if qfile and os.path.exists(qfile):
@@ -64,11 +111,43 @@ class RLBot:
         self.qnetwork_target.load_state_dict(self.qnetwork_local.state_dict())
 
         # replay buffer
-        self.memory = deque(maxlen=20000)
-        self.batch_size = 64
+        self.prioritized = prioritized
+        self.compact_replay = compact_replay or replay_dir is not None
+        storage = None
+        if replay_dir is not None:
+            storage = MemmapStorage(replay_dir, replay_capacity, ACTION_SIZE, self._states_from_ids,
+                                    shard_size=replay_shard_size)
+        elif compact_replay:
+            storage = CompactStorage(replay_capacity, ACTION_SIZE, self._states_from_ids)
+
+        if prioritized:
+            self.memory = PrioritizedReplayBuffer(
+                replay_capacity, STATE_INPUT_SIZE, device=self.device, storage=storage,
+                n_step=n_step, gamma=gamma, alpha=per_alpha, beta=per_beta, alpha_final=per_alpha_final,
+                beta_final=per_beta_final, anneal_steps=per_anneal_steps
+            )
+        else:
+            self.memory = ReplayBuffer(replay_capacity, STATE_INPUT_SIZE, device=self.device, storage=storage,
+                                       n_step=n_step, gamma=gamma)
+        self.batch_size = batch_size
+        self.tau = tau  # fração da rede local copiada para a target a cada update
         self.update_every = 4  # passos entre updates
         self._step_count = 0
 
+    def _build_networks(self, dueling):
+        """Cria redes local/target (e o otimizador) com ou sem cabeça dueling."""
+        self.dueling = dueling
+        self.qnetwork_local = QNetwork(STATE_INPUT_SIZE, self.action_size, dueling=dueling).to(self.device)
+        self.qnetwork_target = QNetwork(STATE_INPUT_SIZE, self.action_size, dueling=dueling).to(self.device)
+        self.optimizer = optim.Adam(self.qnetwork_local.parameters(), lr=self.alpha)
+
+    def _match_architecture(self, state_dict):
+        """Recria as redes se os pesos a carregar forem de outra arquitetura (dueling ou não)."""
+        dueling = QNetwork.is_dueling(state_dict)
+        if dueling != self.dueling:
+            print(f"[RLBot] Pesos {'com' if dueling else 'sem'} cabeça dueling: recriando as redes")
+            self._build_networks(dueling)
+
     def _get_card_features(self, card):
         """
         Converte carta -> vetor de features (ordem definida por self.stats_list).
@@ -95,6 +174,80 @@ class RLBot:
             features = features[:STATS_COUNT]
         return features
 
+    def _init_buffers(self):
+        """Buffers reaproveitados na montagem do estado (views da mesma memória)."""
+        self._row_buffer = np.zeros(ACTION_SIZE, dtype=np.intp)
+        self._state_buffer = np.zeros(STATE_INPUT_SIZE, dtype=np.float32)
+        self._state_cards = self._state_buffer[:STATE_SIZE].reshape(ACTION_SIZE, STATS_COUNT)
+        self._state_tensor = torch.from_numpy(self._state_buffer)
+        self._move_buffers = {}
+
+    def __setstate__(self, state):
+        # cópias (deepcopy/pickle) não preservam o compartilhamento de memória das views
+        self.__dict__.update(state)
+        self._init_buffers()
+
+    def index_cards(self, cards):
+        """
+        Acrescenta à matriz de features as cartas ainda não vistas.
+        Cada carta é convertida uma única vez (identificada pelo id).
+
+        Os trainers registram o baralho inteiro no início, para que um replay
+        compacto reaberto do disco encontre as features de todas as cartas.
+        """
+        new = [card for card in cards if card['id'] not in self._card_rows]
+        if not new:
+            return
+
+        rows = []
+        for card in new:
+            if card['id'] in self._card_rows:
+                continue
+            self._card_rows[card['id']] = len(self._features) + len(rows)
+            rows.append(self._get_card_features(card))
+
+        self._features = np.vstack([self._features, np.asarray(rows, dtype=np.float32)])
+
+        # tabela densa id -> linha, usada ao montar estados a partir de ids
+        max_id = max(self._card_rows)
+        if max_id >= len(self._id_rows):
+            grown = np.zeros(max_id + 1, dtype=np.intp)
+            grown[:len(self._id_rows)] = self._id_rows
+            self._id_rows = grown
+        for card in new:
+            self._id_rows[card['id']] = self._card_rows[card['id']]
+
+    def _card_indices(self, deck, out):
+        """Preenche `out` com as linhas das primeiras ACTION_SIZE cartas (0 = padding)."""
+        card_rows = self._card_rows
+        limited_deck = deck[:ACTION_SIZE]
+
+        try:
+            rows = [card_rows[card['id']] for card in limited_deck]
+        except KeyError:
+            self.index_cards(limited_deck)
+            rows = [card_rows[card['id']] for card in limited_deck]
+
+        out[:len(rows)] = rows
+        out[len(rows):] = 0
+        return out
+
+    def _fill_state(self, deck, stat):
+        """
+        Monta o estado no buffer interno (sem alocar) e retorna a view em tensor.
+        O conteúdo é sobrescrito na próxima chamada.
+        """
+        rows = self._card_indices(deck, self._row_buffer)
+        np.take(self._features, rows, axis=0, out=self._state_cards)
+
+        # one-hot para o stat (STATS_COUNT)
+        self._state_buffer[STATE_SIZE:] = 0.0
+        idx = self._stat_index.get(stat)
+        if idx is not None:
+            self._state_buffer[STATE_SIZE + idx] = 1.0
+
+        return self._state_tensor
+
     def get_state_vector(self, deck=None, stat=None):
         """
         Constrói o vetor de estado fixo com exatamente:
@@ -102,38 +255,60 @@ class RLBot:
         - limita o deck às primeiras ACTION_SIZE cartas
         - completa com zeros caso haja menos cartas
         - retorna tensor float32 no device com shape (STATE_INPUT_SIZE,)
+
+        As features de cada carta vêm da matriz pré-calculada; o estado é um
+        único gather no buffer interno, copiado para um tensor novo (seguro
+        para guardar no replay buffer).
         """
         if deck is None:
             deck = self.deck or []
 
-        # limita a ACTION_SIZE cartas (pega as primeiras)
-        limited_deck = deck[:ACTION_SIZE]
+        self._fill_state(deck, stat)
+        return torch.from_numpy(self._state_buffer.copy()).to(self.device)
 
-        card_vectors = []
-        for card in limited_deck:
-            card_vectors.extend(self._get_card_features(card))
+    def _states_from_ids(self, hand_ids, stats, out):
+        """
+        Monta estados a partir de ids de carta (usado pelo replay compacto).
 
-        # completa com zeros até ACTION_SIZE * STATS_COUNT
-        expected_card_len = ACTION_SIZE * STATS_COUNT
-        if len(card_vectors) < expected_card_len:
-            card_vectors.extend([0.0] * (expected_card_len - len(card_vectors)))
-        elif len(card_vectors) > expected_card_len:
-            # corte por segurança (não deveria acontecer porque limitamos o deck)
-            card_vectors = card_vectors[:expected_card_len]
+        Args:
+            hand_ids: Array (B, ACTION_SIZE) de ids (-1 = sem carta)
+            stats: Array (B,) de índices de atributo (-1 = nenhum)
+            out: Array float32 (B, STATE_INPUT_SIZE) de saída
+        """
+        batch = len(hand_ids)
+        rows = np.where(hand_ids >= 0, self._id_rows[np.maximum(hand_ids, 0)], 0)
+        out[:, :STATE_SIZE] = self._features[rows].reshape(batch, STATE_SIZE)
 
-        # one-hot para o stat (STATS_COUNT)
-        stat_vector = [0.0] * STATS_COUNT
-        if stat and stat in self.stats_list:
-            idx = self.stats_list.index(stat)
-            stat_vector[idx] = 1.0
+        out[:, STATE_SIZE:] = 0.0
+        has_stat = np.nonzero(stats >= 0)[0]
+        out[has_stat, STATE_SIZE + stats[has_stat]] = 1.0
+        return out
 
-        state_vector = np.array(card_vectors + stat_vector, dtype=np.float32)
+    def get_state_batch(self, decks, stats):
+        """
+        Constrói os estados de várias mãos de uma vez.
+
+        Args:
+            decks: Lista de decks (listas de cartas)
+            stats: Lista de atributos (um por deck; None = sem atributo)
+
+        Returns:
+            Tensor float32 no device com shape (len(decks), STATE_INPUT_SIZE)
+        """
+        batch = len(decks)
+        rows = np.zeros((batch, ACTION_SIZE), dtype=np.intp)
+        for b, deck in enumerate(decks):
+            self._card_indices(deck, rows[b])
+
+        states = np.zeros((batch, STATE_INPUT_SIZE), dtype=np.float32)
+        states[:, :STATE_SIZE] = self._features[rows].reshape(batch, STATE_SIZE)
 
-        # segurança — garante tamanho esperado
-        assert state_vector.shape[0] == STATE_INPUT_SIZE, \
-            f"Estado tem tamanho {state_vector.shape[0]} mas esperado {STATE_INPUT_SIZE}"
+        for b, stat in enumerate(stats):
+            idx = self._stat_index.get(stat)
+            if idx is not None:
+                states[b, STATE_SIZE + idx] = 1.0
 
-        return torch.from_numpy(state_vector).to(self.device)
+        return torch.from_numpy(states).to(self.device)
 
     def choose_action(self, stat):
         """
@@ -143,31 +318,54 @@ class RLBot:
         if not self.deck:
             return None, -1
 
-        state = self.get_state_vector(self.deck, stat).unsqueeze(0)  # shape (1, STATE_INPUT_SIZE)
-
         # exploração
         if random.random() < self.epsilon:
             idx = random.randrange(min(len(self.deck), ACTION_SIZE))
             return self.deck[idx], idx
 
         # explotação
-        self.qnetwork_local.eval()
-        with torch.no_grad():
-            qvals = self.qnetwork_local(state).cpu().numpy().flatten()
-        self.qnetwork_local.train()
+        state = self._fill_state(self.deck, stat).unsqueeze(0)  # shape (1, STATE_INPUT_SIZE)
+        qvals = self._q_values(state)[0]
 
-        # máscara para ações inválidas (cartas que não existem na mão)
-        valid = min(len(self.deck), ACTION_SIZE)
-        masked = qvals.copy()
-        for i in range(valid, ACTION_SIZE):
-            masked[i] = -float("inf")
+        action_index = self._greedy_action(qvals)
+        return self.deck[action_index], action_index
 
-        action_index = int(np.argmax(masked))
-        # se action_index >= len(deck) (por segurança), escolhe último válido
-        if action_index >= len(self.deck):
-            action_index = len(self.deck) - 1
+    def _q_values(self, states):
+        """
+        Forward da rede local em modo de inferência (sem autograd e sem
+        alternar eval()/train(); a rede não tem camadas que dependem do modo).
 
-        return self.deck[action_index], action_index
+        Returns:
+            Array NumPy (B, ACTION_SIZE)
+        """
+        with torch.inference_mode():
+            return self.qnetwork_local(states.to(self.device)).cpu().numpy()
+
+    def _greedy_action(self, qvals):
+        """Melhor ação entre as cartas que existem na mão (empate: a primeira)."""
+        valid = min(len(self.deck), ACTION_SIZE)
+        return int(np.argmax(qvals[:valid]))
+
+    def _move_states(self, deck, stats_list):
+        """
+        Estados da mão para todos os atributos de uma vez, shape
+        (len(stats_list), STATE_INPUT_SIZE). Os one-hots ficam fixos em um
+        buffer por lista de atributos; só as features das cartas são copiadas.
+        """
+        key = tuple(stats_list)
+        entry = self._move_buffers.get(key)
+        if entry is None:
+            states = np.zeros((len(stats_list), STATE_INPUT_SIZE), dtype=np.float32)
+            for i, stat in enumerate(stats_list):
+                idx = self._stat_index.get(stat)
+                if idx is not None:
+                    states[i, STATE_SIZE + idx] = 1.0
+            entry = self._move_buffers[key] = (states, torch.from_numpy(states))
+
+        states, tensor = entry
+        rows = self._card_indices(deck, self._row_buffer)
+        states[:, :STATE_SIZE] = self._features[rows].reshape(STATE_SIZE)
+        return tensor
 
     def choose_card(self, player_deck, chosen_stat):
         card, _ = self.choose_action(chosen_stat)
@@ -187,31 +385,23 @@ class RLBot:
             card, _ = self.choose_action(stat)
             return card, stat
 
-        best_q = -float("inf")
-        best_stat = None
-
-        for stat in stats_list:
-            state = self.get_state_vector(self.deck, stat).unsqueeze(0)
-            with torch.no_grad():
-                qvals = self.qnetwork_local(state).cpu().numpy().flatten()
-
-            # máscara para cartas ausentes
-            valid = min(len(self.deck), ACTION_SIZE)
-            for i in range(valid, ACTION_SIZE):
-                qvals[i] = -float("inf")
+        # um único forward com todos os atributos; o maior Q define o atributo
+        qvals = self._q_values(self._move_states(self.deck, stats_list))
+        valid = min(len(self.deck), ACTION_SIZE)
+        best = int(np.argmax(qvals[:, :valid].max(axis=1)))
+        best_stat = stats_list[best]
 
-            qmax = float(np.max(qvals))
-            if qmax > best_q:
-                best_q = qmax
-                best_stat = stat
+        # carta: mesma política epsilon-greedy de choose_action, reaproveitando os Q-values
+        if random.random() < self.epsilon:
+            idx = random.randrange(valid)
+            return self.deck[idx], best_stat
 
-        card, _ = self.choose_action(best_stat)
-        return card, best_stat
+        return self.deck[self._greedy_action(qvals[best])], best_stat
 
     def step(self, state, action, reward, next_state, done):
         """
         Armazena transição e chama learn periodicamente.
-        state/next_state devem ser tensores (produzidos por get_state_vector).
+        state/next_state: tensores (get_state_vector) ou arrays NumPy.
         action: índice inteiro da carta jogada.
         """
         # garante int
@@ -223,7 +413,99 @@ class RLBot:
             else:
                 action = int(action)
 
-        self.memory.append((state, action, float(reward), next_state, float(done)))
+        self.memory.add(state, action, reward, next_state, done)
+        return self._after_store()
+
+    def remember(self, deck, stat, action, reward, next_deck, done, next_stat=None):
+        """
+        Armazena transição a partir das mãos (antes/depois da jogada) e chama
+        learn periodicamente, como step(). Com compact_replay só os ids das
+        cartas são guardados; caso contrário os estados são montados aqui.
+
+        Args:
+            deck: Mão antes da jogada
+            stat: Atributo da rodada
+            action: Índice da carta jogada
+            reward: Recompensa
+            next_deck: Mão depois da jogada
+            done: Fim de jogo
+            next_stat: Atributo do próximo estado (padrão: o mesmo da rodada)
+        """
+        if next_stat is None:
+            next_stat = stat
+
+        if not self.compact_replay:
+            state = self.get_state_vector(deck, stat)
+            next_state = self.get_state_vector(next_deck, next_stat)
+            return self.step(state, action, reward, next_state, done)
+
+        hand = deck[:ACTION_SIZE]
+        next_hand = next_deck[:ACTION_SIZE]
+        self.index_cards(hand)
+        self.index_cards(next_hand)
+
+        self.memory.add_cards(
+            [card['id'] for card in hand], self._stat_index.get(stat, -1),
+            action, reward,
+            [card['id'] for card in next_hand], self._stat_index.get(next_stat, -1),
+            done
+        )
+        return self._after_store()
+
+    def store_batch(self, hand_ids, stats, actions, rewards, next_hand_ids, dones, next_stats=None):
+        """
+        Armazena várias transições codificadas por ids de carta, sem aprender.
+
+        Args:
+            hand_ids, next_hand_ids: Arrays (N, W) de ids (-1 = sem carta), W <= ACTION_SIZE;
+                as cartas precisam estar registradas com index_cards()
+            stats: Array (N,) de índices de atributo em stats_list (-1 = nenhum)
+            actions, rewards, dones: Arrays (N,)
+            next_stats: Índices de atributo do próximo estado (padrão: stats)
+        """
+        if next_stats is None:
+            next_stats = stats
+
+        if self.compact_replay:
+            self.memory.add_cards_batch(hand_ids, stats, actions, rewards, next_hand_ids, next_stats, dones)
+            return
+
+        count = len(actions)
+        padded = np.full((count, ACTION_SIZE), -1, dtype=np.int64)
+        states = np.zeros((count, STATE_INPUT_SIZE), dtype=np.float32)
+        next_states = np.zeros((count, STATE_INPUT_SIZE), dtype=np.float32)
+
+        padded[:, :hand_ids.shape[1]] = hand_ids
+        self._states_from_ids(padded, np.asarray(stats), states)
+        padded[:] = -1
+        padded[:, :next_hand_ids.shape[1]] = next_hand_ids
+        self._states_from_ids(padded, np.asarray(next_stats), next_states)
+
+        self.memory.add_batch(states, actions, rewards, next_states, dones)
+
+    def remember_batch(self, hand_ids, stats, actions, rewards, next_hand_ids, dones, next_stats=None):
+        """
+        Armazena várias transições (ambientes vetorizados, ver store_batch) e
+        executa os learn() correspondentes a update_every.
+
+        Returns:
+            Loss média dos learn() executados ou None
+        """
+        self.store_batch(hand_ids, stats, actions, rewards, next_hand_ids, dones, next_stats)
+
+        # mesmo número de updates que step()/remember() fariam, um a um
+        count = len(actions)
+        updates = (self._step_count + count) // self.update_every - self._step_count // self.update_every
+        self._step_count += count
+
+        losses = []
+        if len(self.memory) >= self.batch_size:
+            for _ in range(updates):
+                losses.append(self.learn())
+        return float(np.mean(losses)) if losses else None
+
+    def _after_store(self):
+        """Conta o passo e aprende a cada update_every passos."""
         self._step_count += 1
 
         # aprende a cada update_every passos se tiver batch suficiente
@@ -236,30 +518,44 @@ class RLBot:
         if len(self.memory) < self.batch_size:
             return None
 
-        batch = random.sample(self.memory, self.batch_size)
+        if self.prioritized:
+            batch, indices, weights = self.memory.sample(self.batch_size)
+        else:
+            batch, indices, weights = self.memory.sample(self.batch_size), None, None
+        states, actions, rewards, next_states, dones = batch
 
-        states = torch.stack([e[0] for e in batch]).float().to(self.device)            # (B, STATE_INPUT_SIZE)
-        actions = torch.tensor([e[1] for e in batch], dtype=torch.long).unsqueeze(1).to(self.device)  # (B,1)
-        rewards = torch.tensor([e[2] for e in batch], dtype=torch.float32).unsqueeze(1).to(self.device) # (B,1)
-        next_states = torch.stack([e[3] for e in batch]).float().to(self.device)       # (B, STATE_INPUT_SIZE)
-        dones = torch.tensor([e[4] for e in batch], dtype=torch.float32).unsqueeze(1).to(self.device)   # (B,1)
-
-        # Q-target
+        # Q-target (com n_step > 1 as recompensas já são retornos de n passos)
         with torch.no_grad():
-            Q_next = self.qnetwork_target(next_states).max(1)[0].unsqueeze(1)
+            if self.double_dqn:
+                # Double DQN: a rede local escolhe a ação, a target avalia
+                next_actions = self.qnetwork_local(next_states).argmax(1, keepdim=True)
+                Q_next = self.qnetwork_target(next_states).gather(1, next_actions)
+            else:
+                Q_next = self.qnetwork_target(next_states).max(1)[0].unsqueeze(1)
 
-        Q_target = rewards + (self.gamma * Q_next * (1 - dones))
+        Q_target = rewards + (self.gamma ** self.n_step) * Q_next * (1 - dones)
 
         # Q-expected
         Q_expected = self.qnetwork_local(states).gather(1, actions)
 
-        loss = F.mse_loss(Q_expected, Q_target)
+        if self.huber:
+            losses = F.smooth_l1_loss(Q_expected, Q_target, reduction='none')
+        else:
+            losses = F.mse_loss(Q_expected, Q_target, reduction='none')
+
+        if weights is None:
+            loss = losses.mean()
+        else:
+            # pesos de importance sampling corrigem o viés da amostragem prioritizada
+            loss = (weights * losses).mean()
+            self.memory.update_priorities(indices, Q_target - Q_expected)
+
         self.optimizer.zero_grad()
         loss.backward()
         self.optimizer.step()
 
         # soft update
-        self._soft_update(self.qnetwork_local, self.qnetwork_target, tau=1e-3)
+        self._soft_update(self.qnetwork_local, self.qnetwork_target, tau=self.tau)
 
         return loss.item()
 
@@ -277,12 +573,51 @@ class RLBot:
 
     def load_q(self, qfile):
         try:
-            self.qnetwork_local.load_state_dict(torch.load(qfile, map_location=self.device))
+            state_dict = torch.load(qfile, map_location=self.device)
+            self._match_architecture(state_dict)
+            self.qnetwork_local.load_state_dict(state_dict)
             self.qnetwork_target.load_state_dict(self.qnetwork_local.state_dict())
             print(f"[RLBot] Pesos da rede carregados de {qfile}")
         except Exception as e:
             print(f"[RLBot] Erro ao carregar pesos de {qfile}: {e}")
 
+    def policy_snapshot(self):
+        """
+        Cópia leve da política (apenas os pesos da rede local, em CPU), para
+        avaliação em outros processos sem copiar replay, target e otimizador.
+        """
+        return {name: tensor.detach().cpu().clone() for name, tensor in self.qnetwork_local.state_dict().items()}
+
+    def load_policy(self, snapshot):
+        """Carrega na rede local os pesos de policy_snapshot()."""
+        self._match_architecture(snapshot)
+        self.qnetwork_local.load_state_dict(snapshot)
+
+    def training_state(self):
+        """
+        Estado completo de treinamento (redes, otimizador, epsilon, contador
+        de passos e replay), já copiado: pode ser gravado em outra thread
+        enquanto o treinamento continua.
+        """
+        return {
+            'qnetwork_local': copy.deepcopy(self.qnetwork_local.state_dict()),
+            'qnetwork_target': copy.deepcopy(self.qnetwork_target.state_dict()),
+            'optimizer': copy.deepcopy(self.optimizer.state_dict()),
+            'epsilon': self.epsilon,
+            'step_count': self._step_count,
+            'memory': self.memory.state_dict(),
+        }
+
+    def load_training_state(self, state):
+        """Restaura o estado de training_state()."""
+        self._match_architecture(state['qnetwork_local'])
+        self.qnetwork_local.load_state_dict(state['qnetwork_local'])
+        self.qnetwork_target.load_state_dict(state['qnetwork_target'])
+        self.optimizer.load_state_dict(state['optimizer'])
+        self.epsilon = state['epsilon']
+        self._step_count = state['step_count']
+        self.memory.load_state_dict(state['memory'])
+
     def update_epsilon(self, new_epsilon):
         self.epsilon = float(new_epsilon)
 
@@ -0,0 +1,149 @@
+"""
+Motor de rollouts vetorizado para os bots de busca.
+
+Em vez de simular uma continuação aleatória por vez em Python puro, simula
+milhares delas de uma só vez como arrays NumPy sobre índices de carta.
+"""
+
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import STATS, stat_key
+
+
+class RolloutEngine:
+    """
+    Simula continuações aleatórias de um jogo em lote.
+
+    As cartas são indexadas em uma matriz de chaves (carta x atributo) e
+    cada continuação é representada por uma linha de índices. Cartas já
+    jogadas são marcadas por máscaras e ficam fora do sorteio.
+    """
+
+    def __init__(self, stats_list=None, seed=None):
+        """
+        Inicializa o motor.
+
+        Args:
+            stats_list: Atributos sorteados nas rodadas (usa STATS se None)
+            seed: Semente do gerador aleatório (opcional)
+        """
+        self.stats_list = list(stats_list) if stats_list is not None else list(STATS)
+        self.rng = np.random.default_rng(seed)
+
+        # id da carta -> linha da matriz de chaves
+        self._rows = {}
+        self._keys = np.empty((0, len(self.stats_list)), dtype=np.float64)
+
+    def index(self, cards):
+        """
+        Registra cartas ainda não vistas na matriz de chaves.
+
+        Args:
+            cards: Lista de cartas (dicts)
+        """
+        new_rows = []
+        for card in cards:
+            if card['id'] not in self._rows:
+                self._rows[card['id']] = len(self._rows)
+                new_rows.append([stat_key(card, stat) for stat in self.stats_list])
+
+        if new_rows:
+            self._keys = np.vstack([self._keys, np.array(new_rows, dtype=np.float64)])
+
+    def rows(self, card_ids):
+        """Converte ids de carta em índices da matriz de chaves."""
+        return np.array([self._rows[card_id] for card_id in card_ids], dtype=np.intp)
+
+    def first_round(self, bot_id, opp_ids, stat, n):
+        """
+        Joga uma carta fixa do bot contra n cartas sorteadas do oponente.
+
+        Args:
+            bot_id: Id da carta do bot
+            opp_ids: Ids das cartas do oponente
+            stat: Atributo da rodada
+            n: Número de continuações
+
+        Returns:
+            Tupla (resultados (n,), máscara (n, len(opp_ids)) da carta jogada)
+        """
+        opp_rows = self.rows(opp_ids)
+        picks = self.rng.integers(len(opp_rows), size=n)
+        column = self.stats_list.index(stat)
+
+        bot_key = self._keys[self._rows[bot_id], column]
+        opp_keys = self._keys[opp_rows[picks], column]
+        results = (bot_key > opp_keys).astype(np.float64) - (bot_key < opp_keys)
+
+        played = np.zeros((n, len(opp_rows)), dtype=bool)
+        played[np.arange(n), picks] = True
+        return results, played
+
+    def rollout(self, bot_ids, opp_ids, n, depth=None, discount=1.0,
+                bot_played=None, opp_played=None):
+        """
+        Simula n continuações aleatórias a partir das mãos informadas.
+
+        Em cada rodada as duas cartas e o atributo são sorteados de forma
+        uniforme. A rodada i (a partir de 0) vale discount**i.
+
+        Args:
+            bot_ids: Ids das cartas do bot
+            opp_ids: Ids das cartas do oponente
+            n: Número de continuações simuladas
+            depth: Número máximo de rodadas (None para jogar até o fim)
+            discount: Desconto aplicado por rodada
+            bot_played: Máscara (n, len(bot_ids)) de cartas já jogadas (opcional)
+            opp_played: Máscara (n, len(opp_ids)) de cartas já jogadas (opcional)
+
+        Returns:
+            Array (n,) com a soma descontada dos resultados do ponto de vista do bot
+        """
+        bot_rows = self.rows(bot_ids)
+        opp_rows = self.rows(opp_ids)
+
+        bot_order, bot_avail = self._shuffle(bot_rows, n, bot_played)
+        opp_order, opp_avail = self._shuffle(opp_rows, n, opp_played)
+
+        rounds = min(bot_order.shape[1], opp_order.shape[1])
+        if depth is not None:
+            rounds = min(rounds, depth)
+        if rounds == 0:
+            return np.zeros(n)
+
+        bot_cards = bot_order[:, :rounds]
+        opp_cards = opp_order[:, :rounds]
+        stats = self.rng.integers(len(self.stats_list), size=(n, rounds))
+
+        bot_keys = self._keys[bot_cards, stats]
+        opp_keys = self._keys[opp_cards, stats]
+        results = (bot_keys > opp_keys).astype(np.float64) - (bot_keys < opp_keys)
+
+        # Cada linha termina quando uma das mãos acaba
+        valid = np.arange(rounds) < np.minimum(bot_avail, opp_avail)[:, None]
+        weights = discount ** np.arange(rounds)
+
+        return (results * valid) @ weights
+
+    def _shuffle(self, rows, n, played):
+        """
+        Sorteia a ordem das cartas de cada continuação.
+
+        Cartas marcadas como jogadas recebem a maior chave de ordenação e
+        ficam no final de cada linha.
+
+        Returns:
+            Tupla (ordem (n, k) em índices da matriz, cartas disponíveis por linha)
+        """
+        sort_keys = self.rng.random((n, len(rows)))
+        if played is not None:
+            sort_keys[played] = 2.0
+            available = len(rows) - played.sum(axis=1)
+        else:
+            available = np.full(n, len(rows))
+
+        order = np.argsort(sort_keys, axis=1)
+        return rows[order], available
@@ -0,0 +1,130 @@
+"""
+Tabela de transposição para os resultados de busca do MCTSBot.
+
+Guarda, para cada situação (mão do bot, mão do oponente, atributo) e
+configuração de busca, as estatísticas de visitas e valor de cada jogada
+na raiz da busca. A memória
+é limitada e as entradas menos usadas recentemente são descartadas (LRU).
+"""
+
+from collections import OrderedDict
+
+
+class TranspositionTable:
+    """
+    Tabela LRU com contadores de acerto/erro.
+
+    As chaves são tuplas (bitmask da mão do bot, bitmask da mão do oponente,
+    atributo, atributos do jogo, configuração da busca), com atributo None
+    quando o bot é quem escolhe o atributo. A configuração (tempo, iterações,
+    processos...) separa as entradas de bots de dificuldades diferentes.
+    Cada entrada é um dicionário jogada -> [visitas, valor acumulado].
+    """
+
+    def __init__(self, capacity=100000):
+        """
+        Inicializa a tabela.
+
+        Args:
+            capacity: Número máximo de situações guardadas
+        """
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Busca as estatísticas de uma situação.
+
+        Args:
+            key: Tupla (mão do bot, mão do oponente, atributo, ...)
+
+        Returns:
+            Dicionário jogada -> [visitas, valor] ou None se ausente
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def store(self, key, stats):
+        """
+        Acumula estatísticas de uma busca na entrada da situação.
+
+        Args:
+            key: Tupla (mão do bot, mão do oponente, atributo, ...)
+            stats: Dicionário jogada -> [visitas, valor]
+
+        Returns:
+            Entrada acumulada da situação
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = {}
+        else:
+            self._entries.move_to_end(key)
+
+        for move, (visits, value) in stats.items():
+            if move in entry:
+                entry[move][0] += visits
+                entry[move][1] += value
+            else:
+                entry[move] = [visits, value]
+
+        # Descarta as situações usadas há mais tempo
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+        return entry
+
+    def clear(self):
+        """Remove todas as entradas e zera os contadores."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """
+        Resumo de uso da tabela.
+
+        Returns:
+            Dicionário com tamanho, capacidade, acertos, erros e taxa de acerto
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+# Instância compartilhada por todos os bots do processo
+_shared_table = None
+
+
+def get_shared_table(capacity=100000):
+    """
+    Retorna a tabela de transposição compartilhada do processo.
+
+    Args:
+        capacity: Capacidade usada apenas na primeira criação
+
+    Returns:
+        TranspositionTable
+    """
+    global _shared_table
+
+    if _shared_table is None:
+        _shared_table = TranspositionTable(capacity)
+
+    return _shared_table
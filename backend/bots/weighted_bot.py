@@ -3,127 +3,260 @@ Bot com estratégia baseada em pesos heurísticos.
 Nível: Fácil
 """
 
+import heapq
+import json
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.utils import STATS, evaluate
 
+# Pesos padrão: valores maiores = mais importante
+# Peso negativo para atributos onde menor é melhor
+DEFAULT_STAT_WEIGHTS = {
+    "HP": 1.0,
+    "torque": 0.8,
+    "weight": -0.5,      # Menor peso é melhor
+    "0-100": -0.7,       # Menor tempo é melhor
+    "top_speed": 1.2
+}
+
 
 class WeightedBot:
     """
     Bot que escolhe cartas baseado em pesos predefinidos para cada atributo.
     Estratégia simples e previsível.
+
+    As ordenações por atributo e o score geral de cada carta são calculados
+    uma vez por deck e mantidos incrementalmente (heaps com remoção
+    preguiçosa) conforme as cartas saem da mão, então cada decisão custa
+    O(1) amortizado mesmo em mãos com milhares de cartas.
     """
-    
+
     def __init__(self, deck, stat_weights=None):
         """
         Inicializa o bot.
-        
+
         Args:
             deck: Lista de cartas disponíveis
             stat_weights: Dicionário com pesos para cada atributo (opcional)
         """
-        self.deck = deck
-        
-        # Pesos padrão: valores maiores = mais importante
-        # Peso negativo para atributos onde menor é melhor
         if stat_weights is None:
-            self.stat_weights = {
-                "HP": 1.0,
-                "torque": 0.8,
-                "weight": -0.5,      # Menor peso é melhor
-                "0-100": -0.7,       # Menor tempo é melhor
-                "top_speed": 1.2
-            }
-        else:
-            self.stat_weights = stat_weights
-    
+            stat_weights = dict(DEFAULT_STAT_WEIGHTS)
+
+        self._stat_weights = stat_weights
+        self.deck = deck
+
+    @property
+    def deck(self):
+        return self._deck
+
+    @deck.setter
+    def deck(self, cards):
+        self._deck = cards
+        self._sync()
+
+    @property
+    def stat_weights(self):
+        return self._stat_weights
+
+    @stat_weights.setter
+    def stat_weights(self, weights):
+        self._stat_weights = weights
+        self._rebuild()
+
+    def remove_card(self, card):
+        """
+        Remove uma carta da mão em O(1), sem reconstruir as ordenações.
+
+        Args:
+            card: Carta jogada
+        """
+        self._deck.remove(card)
+        self._alive.pop(card['id'], None)
+
     def score_card(self, card):
         """
         Calcula um score geral para uma carta baseado nos pesos.
-        
+
         Args:
             card: Carta a ser avaliada
-        
+
         Returns:
             Score numérico (float)
         """
         score = 0
         for stat, weight in self.stat_weights.items():
             value = card.get(stat, 0)
-            
+
             if value == 0:
                 continue
-            
+
             # Para atributos onde menor é melhor, inverte o valor
             if stat in ["weight", "0-100"]:
                 value = 1 / value
-            
+
             score += value * weight
-        
+
         return score
-    
+
     def choose_card(self, player_deck, chosen_stat):
         """
         Escolhe a melhor carta do deck para jogar contra um atributo específico.
-        
+
         Args:
             player_deck: Deck do jogador (não usado nesta estratégia simples)
             chosen_stat: Atributo escolhido para a rodada
-        
+
         Returns:
             Carta escolhida (dict)
         """
         if not self.deck:
             return None
-        
+
+        self._check_sync()
+
+        heap = self._stat_heaps.get(chosen_stat)
+        if heap is None:
+            # Ordenação do atributo criada na primeira consulta
+            heap = [
+                (-self._stat_value(card, chosen_stat), position, card['id'])
+                for card_id, (card, position) in self._entries.items()
+                if card_id in self._alive
+            ]
+            heapq.heapify(heap)
+            self._stat_heaps[chosen_stat] = heap
+
         # Escolhe a carta com maior valor no atributo escolhido
-        best_card = max(
-            self.deck,
-            key=lambda c: (1 / c.get(chosen_stat, 1) if chosen_stat in ["weight", "0-100"] 
-                          else c.get(chosen_stat, 0))
-        )
-        
-        return best_card
-    
+        return self._top(heap)
+
     def choose_move(self, player_deck, stats_list=None):
         """
         Escolhe a melhor carta e atributo para jogar.
         Usado quando o bot tem a vez de escolher o atributo.
-        
+
         Args:
             player_deck: Deck do jogador
             stats_list: Lista de atributos disponíveis (usa STATS se None)
-        
+
         Returns:
             Tupla (carta, atributo)
         """
         if not self.deck:
             return None, None
-        
+
         if stats_list is None:
             stats_list = STATS
-        
+
+        self._check_sync()
+
         # Escolhe a carta com melhor score geral
-        best_card = max(self.deck, key=self.score_card)
-        
+        best_card = self._top(self._score_heap)
+
         # Para essa carta, escolhe o atributo com melhor valor ponderado
+        if list(stats_list) == STATS:
+            best_stat = self._best_stats[best_card['id']]
+        else:
+            best_stat = self._best_stat(best_card, stats_list)
+
+        return best_card, best_stat
+
+    def _best_stat(self, card, stats_list):
+        """Atributo com melhor valor ponderado para uma carta."""
         stat_scores = {}
         for stat in stats_list:
-            value = best_card.get(stat, 0)
+            value = card.get(stat, 0)
             weight = self.stat_weights.get(stat, 1.0)
-            
+
             if value == 0:
                 stat_scores[stat] = -float('inf')
                 continue
-            
+
             # Normaliza valores onde menor é melhor
             if stat in ["weight", "0-100"]:
                 value = 1 / value
-            
+
             stat_scores[stat] = value * weight
-        
-        best_stat = max(stat_scores, key=stat_scores.get)
-        
-        return best_card, best_stat
+
+        return max(stat_scores, key=stat_scores.get)
+
+    @staticmethod
+    def _stat_value(card, stat):
+        """Valor usado para escolher a carta contra um atributo."""
+        if stat in ["weight", "0-100"]:
+            return 1 / card.get(stat, 1)
+        return card.get(stat, 0)
+
+    def _top(self, heap):
+        """Topo do heap descartando cartas que já saíram da mão."""
+        while heap[0][2] not in self._alive:
+            heapq.heappop(heap)
+        return self._alive[heap[0][2]]
+
+    def _sync(self):
+        """
+        Sincroniza as estruturas com self.deck.
+
+        Se o novo deck só perdeu cartas, as cartas saem das estruturas sem
+        reconstrução; caso contrário (novo jogo) tudo é recalculado.
+        """
+        if not hasattr(self, '_alive'):
+            self._rebuild()
+            return
+
+        ids = {card['id'] for card in self._deck}
+        if ids <= self._alive.keys():
+            for card_id in self._alive.keys() - ids:
+                del self._alive[card_id]
+        else:
+            self._rebuild()
+
+    def _check_sync(self):
+        """Detecta alterações feitas diretamente na lista do deck."""
+        if len(self._deck) != len(self._alive):
+            self._sync()
+
+    def _rebuild(self):
+        """Recalcula scores e ordenações para o deck atual."""
+        if not hasattr(self, '_deck'):
+            return
+
+        # id -> (carta, posição no deck); a posição desempata como max()
+        self._entries = {card['id']: (card, position) for position, card in enumerate(self._deck)}
+        self._alive = {card_id: card for card_id, (card, _) in self._entries.items()}
+
+        self._score_heap = [
+            (-self.score_card(card), position, card['id'])
+            for card, position in self._entries.values()
+        ]
+        heapq.heapify(self._score_heap)
+
+        self._best_stats = {
+            card['id']: self._best_stat(card, STATS)
+            for card, _ in self._entries.values()
+        }
+
+        self._stat_heaps = {}
+
+
+def load_stat_weights(path):
+    """
+    Carrega pesos ajustados (python manage.py tune-weighted).
+
+    Args:
+        path: Caminho do arquivo JSON
+
+    Returns:
+        Dicionário atributo -> peso ou None se o arquivo não existir ou for inválido
+    """
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        weights = data.get('weights', data)
+        return {stat: float(weights[stat]) for stat in STATS}
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        print(f"[WeightedBot] Pesos inválidos em {path}: {e}")
+        return None
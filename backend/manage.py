@@ -12,6 +12,10 @@ Comandos:
     train       - Treina o DQN Bot
     serve       - Inicia o servidor da API
     evaluate    - Avalia o desempenho do modelo treinado
+    build-book  - Pré-calcula o livro de aberturas do MCTS Bot
+    tune-weighted - Ajusta os pesos de ataque do Weighted Bot
+    sweep       - Busca de hiperparâmetros do DQN (trials em paralelo, SQLite)
+    history     - Resume o histórico de um treinamento (com série reduzida)
     clean       - Limpa arquivos temporários e logs antigos
 """
 
@@ -37,6 +41,39 @@ def train_bot(args):
     if args.model:
         cmd.extend(["--model", args.model])
     
+    if args.prioritized:
+        cmd.append("--prioritized")
+    
+    if args.vec_envs:
+        cmd.extend(["--vec-envs", str(args.vec_envs)])
+    
+    if args.actors:
+        cmd.extend(["--actors", str(args.actors)])
+    
+    if args.resume:
+        cmd.extend(["--resume", args.resume])
+    
+    if args.eval_precision:
+        cmd.extend(["--eval-precision", str(args.eval_precision)])
+    
+    if args.eval_mirrored:
+        cmd.append("--eval-mirrored")
+    
+    if args.double_dqn:
+        cmd.append("--double-dqn")
+    
+    if args.dueling:
+        cmd.append("--dueling")
+    
+    if args.n_step > 1:
+        cmd.extend(["--n-step", str(args.n_step)])
+    
+    if args.huber:
+        cmd.append("--huber")
+    
+    if args.facil_weights:
+        cmd.extend(["--facil-weights", args.facil_weights])
+    
     try:
         subprocess.run(cmd, check=True)
         print("\n✅ Treinamento concluído!")
@@ -63,8 +100,11 @@ def serve_api(args):
     if args.reload:
         cmd.append("--reload")
     
+    # Processos da busca do bot difícil (lidos por app/main.py; 1 = serial)
+    env = dict(os.environ, SEARCH_WORKERS=str(args.search_workers))
+    
     try:
-        subprocess.run(cmd, check=True)
+        subprocess.run(cmd, check=True, env=env)
     except subprocess.CalledProcessError as e:
         print(f"\n❌ Erro ao iniciar servidor: {e}")
         sys.exit(1)
@@ -73,6 +113,33 @@ def serve_api(args):
         sys.exit(0)
 
 
+def compare_models(evaluator, dqn_bot, baseline_bot, args):
+    """
+    Compara o modelo com um modelo de referência nas mesmas distribuições
+    espelhadas (números aleatórios comuns) e imprime a diferença pareada.
+    """
+    deals = max(2, args.games // 2)
+    print(f"Referência: {args.baseline}")
+    print(f"Pares espelhados: {deals} distribuições por oponente (mesmas para os dois modelos)")
+    print(f"Processos: {args.workers} | Semente: {args.seed}\n")
+    print("="*60)
+    
+    comparison = evaluator.compare(
+        dqn_bot.policy_snapshot(), baseline_bot.policy_snapshot(), num_deals=deals,
+        seed=args.seed, confidence=args.confidence
+    )
+    for opp_name, metrics in comparison.items():
+        model, baseline = metrics['model'], metrics['baseline']
+        low, high = metrics['interval']
+        verdict = "melhor" if low > 0 else "pior" if high < 0 else "sem diferença significativa"
+        
+        print(f"\n  Resultados vs {opp_name} (pontuação: vitória = 1, empate = 0.5):")
+        print(f"    Modelo:     {model['score']*100:5.1f}% | {model['win_rate']*100:5.1f}% vitórias")
+        print(f"    Referência: {baseline['score']*100:5.1f}% | {baseline['win_rate']*100:5.1f}% vitórias")
+        print(f"    Diferença:  {metrics['difference']*100:+5.1f} pontos "
+              f"({args.confidence*100:.0f}%: {low*100:+.1f} a {high*100:+.1f}) -> {verdict}")
+
+
 def evaluate_model(args):
     """Avalia o desempenho do modelo treinado."""
     print("📊 Avaliando modelo DQN...\n")
@@ -81,24 +148,13 @@ def evaluate_model(args):
     sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
     
     try:
-        import json
         from app.utils import STATS
+        from app.deck_loader import load_deck_from_json
         from bots.rl_bot import RLBot
-        from bots.weighted_bot import WeightedBot
-        from bots.mcts_bot import MCTSBot
-        import copy
-        import random
-        
-        # Carrega cartas
-        with open('data/carros.json', 'r', encoding='utf-8') as f:
-            cards = json.load(f)
+        from rl_training.evaluation import PolicyEvaluator, EVAL_OPPONENTS, load_facil_weights
         
-        # Normaliza valores
-        for card in cards:
-            if isinstance(card.get('0-100'), str):
-                card['0-100'] = float(card['0-100'].replace('s', ''))
-            if isinstance(card.get('top_speed'), str):
-                card['top_speed'] = float(card['top_speed'].replace(' km/h', ''))
+        # Carrega cartas (valores já normalizados)
+        cards = load_deck_from_json('data/carros.json', shuffle_deck=False)
         
         # Carrega modelo
         model_path = args.model or 'data/dqn_model.pth'
@@ -108,89 +164,73 @@ def evaluate_model(args):
             print("   Execute o treinamento primeiro: python manage.py train")
             sys.exit(1)
         
-        dqn_bot = RLBot(deck=[], stats_list=STATS, qfile=model_path, epsilon=0.0)
-        
-        # Função para simular jogo
-        def play_game(bot1, bot2, cards):
-            shuffled = random.sample(cards, len(cards))
-            deck1 = shuffled[:5]
-            deck2 = shuffled[5:10]
-            
-            bot1.deck = copy.deepcopy(deck1)
-            bot2.deck = copy.deepcopy(deck2)
-            
-            bot1_wins = 0
-            bot2_wins = 0
-            rounds = 0
-            current_player = random.choice([1, 2])
-            
-            while bot1.deck and bot2.deck and rounds < 50:
-                rounds += 1
-                
-                if current_player == 1:
-                    card1, stat = bot1.choose_move(bot1.deck, STATS)
-                    card2 = bot2.choose_card(bot2.deck, stat)
-                else:
-                    card2, stat = bot2.choose_move(bot2.deck, STATS)
-                    card1 = bot1.choose_card(bot1.deck, stat)
-                
-                if card1 is None or card2 is None:
-                    break
-                
-                from app.utils import evaluate
-                result = evaluate(card1, card2, stat)
-                
-                if result == 1:
-                    bot1_wins += 1
-                    current_player = 1
-                elif result == -1:
-                    bot2_wins += 1
-                    current_player = 2
-                
-                bot1.deck = [c for c in bot1.deck if c['id'] != card1['id']]
-                bot2.deck = [c for c in bot2.deck if c['id'] != card2['id']]
-            
-            if bot1_wins > bot2_wins:
-                return 1
-            elif bot2_wins > bot1_wins:
-                return -1
-            else:
-                return 0
+        if args.baseline and not os.path.exists(args.baseline):
+            print(f"❌ Modelo de referência não encontrado: {args.baseline}")
+            sys.exit(1)
         
-        # Avalia contra cada oponente
-        opponents = {
-            'Facil_Bot': WeightedBot(deck=[]),
-            'Medio_Bot': MCTSBot(deck=[], simulations=50)
-        }
+        dqn_bot = RLBot(deck=[], stats_list=STATS, qfile=model_path, epsilon=0.0, replay_capacity=1)
+        evaluator = PolicyEvaluator(cards, workers=args.workers, mcts_workers=args.mcts_workers,
+                                    facil_weights=load_facil_weights(args.facil_weights))
         
         print(f"Modelo: {model_path}")
-        print(f"Número de jogos por oponente: {args.games}\n")
+        if args.baseline:
+            baseline_bot = RLBot(deck=[], stats_list=STATS, qfile=args.baseline, epsilon=0.0, replay_capacity=1)
+            try:
+                compare_models(evaluator, dqn_bot, baseline_bot, args)
+            finally:
+                evaluator.close()
+            print("\n" + "="*60)
+            print("✅ Comparação concluída!")
+            return
+        
+        if args.mirrored:
+            print(f"Pares espelhados: {args.games // 2} distribuições, cada uma com as mãos trocadas")
+        if args.precision:
+            print(f"Precisão: ±{args.precision*100:.1f}% ({args.confidence*100:.0f}% de confiança), "
+                  f"máximo de {args.games} jogos por oponente")
+        else:
+            print(f"Número de jogos por oponente: {args.games}")
+        print(f"Processos: {args.workers} | Semente: {args.seed}\n")
         print("="*60)
         
-        for opp_name, opp_bot in opponents.items():
-            wins = 0
-            draws = 0
-            
-            print(f"\nAvaliando contra {opp_name}...")
-            
-            for i in range(args.games):
-                if (i + 1) % 10 == 0:
-                    print(f"  Progresso: {i+1}/{args.games} jogos")
+        try:
+            for opp_name in EVAL_OPPONENTS:
+                print(f"\nAvaliando contra {opp_name}...")
                 
-                result = play_game(dqn_bot, opp_bot, cards)
-                if result == 1:
-                    wins += 1
-                elif result == 0:
-                    draws += 1
-            
-            win_rate = wins / args.games
-            draw_rate = draws / args.games
-            loss_rate = 1 - win_rate - draw_rate
-            
-            print(f"\n  Resultados vs {opp_name}:")
-            print(f"    Vitórias: {wins}/{args.games} ({win_rate*100:.1f}%)")
-            print(f"    Empates:  {draws}/{args.games} ({draw_rate*100:.1f}%)")
-            print(f"    Derrotas: {args.games - wins - draws}/{args.games} ({loss_rate*100:.1f}%)")
+                if args.precision:
+                    metrics = evaluator.evaluate_sequential(
+                        dqn_bot.policy_snapshot(), precision=args.precision, confidence=args.confidence,
+                        max_games=args.games, seed=args.seed, opponents=[opp_name], mirrored=args.mirrored
+                    )[opp_name]
+                else:
+                    metrics = evaluator.evaluate(
+                        dqn_bot.policy_snapshot(), num_games=args.games, seed=args.seed,
+                        opponents=[opp_name], mirrored=args.mirrored
+                    )[opp_name]
+                results = metrics['results']
+                
+                games = len(results)
+                wins = results.count(1)
+                draws = results.count(0)
+                
+                win_rate = wins / games
+                draw_rate = draws / games
+                loss_rate = 1 - win_rate - draw_rate
+                
+                print(f"\n  Resultados vs {opp_name}:")
+                print(f"    Vitórias: {wins}/{games} ({win_rate*100:.1f}%)")
+                print(f"    Empates:  {draws}/{games} ({draw_rate*100:.1f}%)")
+                print(f"    Derrotas: {games - wins - draws}/{games} ({loss_rate*100:.1f}%)")
+                if args.mirrored:
+                    print(f"    Pontuação (vitória = 1, empate = 0.5): {metrics['score']*100:.1f}%")
+                if args.precision:
+                    low, high = metrics['interval']
+                    status = "" if metrics['converged'] else " (limite de jogos atingido)"
+                    measure = "pontuação por par" if args.mirrored else "vitórias"
+                    print(f"    Intervalo de {measure} ({args.confidence*100:.0f}%): "
+                          f"{low*100:.1f}% - {high*100:.1f}%{status}")
+        finally:
+            evaluator.close()
         
         print("\n" + "="*60)
         print("✅ Avaliação concluída!")
@@ -206,6 +246,154 @@ def evaluate_model(args):
         sys.exit(1)
 
 
+def build_book(args):
+    """Pré-calcula o livro de aberturas do MCTS Bot."""
+    print("📖 Construindo livro de aberturas...\n")
+    
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    
+    import math
+    import time
+    from app.deck_loader import load_deck_from_json
+    from bots.opening_book import build_opening_book
+    
+    cards = load_deck_from_json('data/carros.json', shuffle_deck=False)
+    possible = math.comb(len(cards), args.hand_size)
+    limit = args.limit or None
+    total = min(possible, limit) if limit else possible
+    
+    print(f"Cartas no baralho: {len(cards)}")
+    print(f"Distribuições ({args.hand_size} cartas para o bot, {len(cards) - args.hand_size} "
+          f"para o oponente): {total:,} de {possible:,}")
+    print(f"Rodadas cobertas: {args.rounds} | Decisões: {'ataque e defesa' if args.attack else 'defesa (jogo web)'}")
+    print(f"Busca por decisão: {args.budget_ms} ms | Processos: {args.workers}\n")
+    
+    start = time.time()
+    step = max(1, total // 100)
+    
+    def progress(done, total):
+        if done // step > (done - 1) // step or done == total:
+            print(f"  Progresso: {done:,}/{total:,} distribuições ({time.time() - start:.0f}s)")
+    
+    entries = build_opening_book(
+        args.output,
+        cards,
+        hand_size=args.hand_size,
+        rounds=args.rounds,
+        budget_ms=args.budget_ms,
+        workers=args.workers,
+        limit=limit,
+        seed=args.seed,
+        defend_only=not args.attack,
+        progress=progress
+    )
+    
+    print(f"\n✅ Livro salvo em {args.output} ({entries:,} entradas, {os.path.getsize(args.output):,} bytes)")
+
+
+def tune_weighted(args):
+    """Ajusta os pesos do Weighted Bot por simulação em lote."""
+    print("⚖️  Ajustando pesos do Weighted Bot...\n")
+    
+    cmd = [
+        sys.executable,
+        "rl_training/tune_weighted.py",
+        "--generations", str(args.generations),
+        "--population", str(args.population),
+        "--games", str(args.games),
+        "--elite-frac", str(args.elite_frac),
+        "--hand-size", str(args.hand_size),
+        "--workers", str(args.workers),
+        "--output", args.output
+    ]
+    
+    if args.seed is not None:
+        cmd.extend(["--seed", str(args.seed)])
+    
+    try:
+        subprocess.run(cmd, check=True)
+        print("\n✅ Ajuste concluído!")
+    except subprocess.CalledProcessError as e:
+        print(f"\n❌ Erro durante o ajuste: {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n⚠️  Ajuste interrompido pelo usuário")
+        sys.exit(0)
+
+
+def run_sweep(args):
+    """Executa a busca de hiperparâmetros do DQN."""
+    print("🔬 Busca de hiperparâmetros do DQN...\n")
+    
+    cmd = [
+        sys.executable,
+        "rl_training/sweep.py",
+        "--config", args.config,
+        "--workers", str(args.workers),
+        "--db", args.db,
+        "--output-dir", args.output_dir,
+        "--top", str(args.top)
+    ]
+    
+    if args.summary:
+        cmd.append("--summary")
+    
+    try:
+        subprocess.run(cmd, check=True)
+        print("\n✅ Busca concluída!")
+    except subprocess.CalledProcessError as e:
+        print(f"\n❌ Erro durante a busca: {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n⚠️  Busca interrompida pelo usuário (rode de novo para continuar)")
+        sys.exit(0)
+
+
+def show_history(args):
+    """Resume o histórico de treinamento e mostra as séries reduzidas a poucos pontos."""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from rl_training.history import HistoryReader, downsample, summarize
+    
+    path = args.path
+    if path is None:
+        path = 'data/dqn_training_history.ndjson'
+        if not os.path.exists(path):
+            path = 'data/dqn_training_history.json'  # formato antigo
+    if not os.path.exists(path):
+        print(f"❌ Histórico não encontrado: {path}")
+        sys.exit(1)
+    
+    reader = HistoryReader(path)
+    summary = summarize(reader, args.series)
+    if not summary:
+        print(f"Histórico vazio: {path}")
+        return
+    
+    print(f"📈 Histórico: {path}\n")
+    print(f"{'série':>22} {'registros':>9} {'primeiro':>9} {'último':>9} {'mín':>9} {'máx':>9} {'melhor em':>10}")
+    for name, stats in summary.items():
+        print(f"{name:>22} {stats['count']:>9,} {stats['first']:9.4f} {stats['last']:9.4f} "
+              f"{stats['min']:9.4f} {stats['max']:9.4f} {stats['best_episode']:>10,}")
+    
+    if args.points:
+        names = list(summary)
+        data = reader.series('episode', *names)
+        print(f"\nMédias em {args.points} trechos (episódio final do trecho):")
+        columns = {name: downsample(data['episode'], data[name], args.points) for name in names}
+        print(f"{'episódio':>10} " + " ".join(f"{name:>22}" for name in names))
+        for row in range(max(len(buckets) for buckets in columns.values())):
+            cells = []
+            episode = None
+            for name in names:
+                buckets = columns[name]
+                if row < len(buckets):
+                    episode, mean, _, _ = buckets[row]
+                    cells.append(f"{mean:>22.4f}")
+                else:
+                    cells.append(f"{'-':>22}")
+            print(f"{episode:>10,} " + " ".join(cells))
+
+
 def clean_files(args):
     """Limpa arquivos temporários e logs antigos."""
     print("🧹 Limpando arquivos temporários...\n")
@@ -251,17 +439,95 @@ def main():
     train_parser.add_argument('--eval-interval', type=int, default=1000, help='Intervalo de avaliação')
     train_parser.add_argument('--save-interval', type=int, default=5000, help='Intervalo de salvamento')
     train_parser.add_argument('--model', type=str, help='Modelo pré-treinado para continuar')
+    train_parser.add_argument('--prioritized', action='store_true', help='Usa prioritized experience replay')
+    train_parser.add_argument('--vec-envs', type=int, default=0,
+                              help='Jogos simultâneos no ambiente vetorizado (0 = um episódio por vez)')
+    train_parser.add_argument('--actors', type=int, default=0,
+                              help='Processos atores (treinamento actor/learner)')
+    train_parser.add_argument('--resume', type=str, nargs='?', const='latest', default=None,
+                              help='Retoma de um checkpoint completo (sem caminho: o mais recente)')
+    train_parser.add_argument('--eval-precision', type=float, default=None,
+                              help='Avaliação sequencial: para com esta precisão na taxa de vitória')
+    train_parser.add_argument('--eval-mirrored', action='store_true',
+                              help='Avaliação em pares espelhados (mãos trocadas)')
+    train_parser.add_argument('--double-dqn', action='store_true', help='Targets Double DQN')
+    train_parser.add_argument('--dueling', action='store_true', help='Rede dueling (valor + vantagem)')
+    train_parser.add_argument('--n-step', type=int, default=1, help='Passos somados nos retornos do replay')
+    train_parser.add_argument('--huber', action='store_true', help='Loss de Huber em vez de MSE')
+    train_parser.add_argument('--facil-weights', type=str, default=None,
+                              help='Pesos do Facil_Bot (tune-weighted); padrão: pesos originais')
     
     # Comando: serve
     serve_parser = subparsers.add_parser('serve', help='Inicia o servidor da API')
     serve_parser.add_argument('--host', type=str, default='0.0.0.0', help='Host do servidor')
     serve_parser.add_argument('--port', type=int, default=8000, help='Porta do servidor')
     serve_parser.add_argument('--reload', action='store_true', help='Auto-reload em desenvolvimento')
+    serve_parser.add_argument('--search-workers', type=int, default=1,
+                              help='Processos da busca paralela do bot difícil (1 = serial, sem pool)')
     
     # Comando: evaluate
     eval_parser = subparsers.add_parser('evaluate', help='Avalia o modelo treinado')
     eval_parser.add_argument('--model', type=str, help='Caminho do modelo (padrão: data/dqn_model.pth)')
     eval_parser.add_argument('--games', type=int, default=100, help='Número de jogos por oponente')
+    eval_parser.add_argument('--mcts-workers', type=int, default=1,
+                             help='Processos da busca paralela do Medio_Bot (1 = serial; só com --workers 1)')
+    eval_parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                             help='Processos que jogam as partidas em paralelo')
+    eval_parser.add_argument('--seed', type=int, default=0, help='Semente das partidas (resultado reproduzível)')
+    eval_parser.add_argument('--precision', type=float, default=None,
+                             help='Para quando a taxa de vitória tiver esta precisão (ex: 0.05 = ±5%%); '
+                                  '--games vira o máximo')
+    eval_parser.add_argument('--confidence', type=float, default=0.95, help='Nível de confiança do intervalo')
+    eval_parser.add_argument('--mirrored', action='store_true',
+                             help='Joga cada distribuição duas vezes, com as mãos trocadas (menos variância)')
+    eval_parser.add_argument('--baseline', type=str, default=None,
+                             help='Modelo de referência: compara nas mesmas distribuições espelhadas')
+    eval_parser.add_argument('--facil-weights', type=str, default=None,
+                             help='Pesos do Facil_Bot (tune-weighted); padrão: pesos originais')
+    
+    # Comando: build-book
+    book_parser = subparsers.add_parser('build-book', help='Pré-calcula o livro de aberturas')
+    book_parser.add_argument('--hand-size', type=int, default=13,
+                             help='Cartas na mão inicial do bot (o oponente recebe o resto; jogo web: 13)')
+    book_parser.add_argument('--rounds', type=int, default=1, help='Rodadas cobertas a partir do início')
+    book_parser.add_argument('--budget-ms', type=float, default=40, help='Tempo de busca por decisão (ms)')
+    book_parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processos em paralelo')
+    book_parser.add_argument('--limit', type=int, default=20000,
+                             help='Distribuições sorteadas (0 = todas, ~5,2 milhões com 13 de 25 cartas: dias de CPU)')
+    book_parser.add_argument('--seed', type=int, default=0, help='Semente do sorteio das distribuições')
+    book_parser.add_argument('--attack', action='store_true',
+                             help='Cobre também o ataque (o bot do jogo web só defende)')
+    book_parser.add_argument('--output', type=str, default='data/opening_book.bin', help='Arquivo de saída')
+    
+    # Comando: tune-weighted
+    tune_parser = subparsers.add_parser('tune-weighted', help='Ajusta os pesos de ataque do Weighted Bot')
+    tune_parser.add_argument('--generations', type=int, default=30, help='Número de gerações')
+    tune_parser.add_argument('--population', type=int, default=64, help='Candidatos por geração')
+    tune_parser.add_argument('--elite-frac', type=float, default=0.2, help='Fração de elite')
+    tune_parser.add_argument('--games', type=int, default=1000, help='Jogos por candidato contra cada oponente')
+    tune_parser.add_argument('--hand-size', type=int, default=5, help='Cartas por mão')
+    tune_parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processos em paralelo')
+    tune_parser.add_argument('--seed', type=int, help='Semente da busca')
+    tune_parser.add_argument('--output', type=str, default='data/weighted_weights.json', help='Arquivo de saída')
+    
+    # Comando: sweep
+    sweep_parser = subparsers.add_parser('sweep', help='Busca de hiperparâmetros do DQN')
+    sweep_parser.add_argument('--config', type=str, default='data/sweep_space.json', help='Espaço de busca (JSON)')
+    sweep_parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                              help='Trials em paralelo (um núcleo por trial)')
+    sweep_parser.add_argument('--db', type=str, default='data/sweeps.db', help='Arquivo SQLite dos resultados')
+    sweep_parser.add_argument('--output-dir', type=str, default='data/sweeps', help='Diretório dos trials')
+    sweep_parser.add_argument('--summary', action='store_true', help='Só mostra os resultados gravados')
+    sweep_parser.add_argument('--top', type=int, default=10, help='Trials listados no resumo')
+    
+    # Comando: history
+    history_parser = subparsers.add_parser('history', help='Resume o histórico de treinamento')
+    history_parser.add_argument('--path', type=str, default=None,
+                                help='Arquivo do histórico (padrão: data/dqn_training_history.ndjson)')
+    history_parser.add_argument('--series', type=str, nargs='+', default=None,
+                                help='Séries mostradas (ex: win_rate.Medio_Bot avg_reward; padrão: todas)')
+    history_parser.add_argument('--points', type=int, default=10,
+                                help='Trechos da série reduzida (0 = só o resumo)')
     
     # Comando: clean
     clean_parser = subparsers.add_parser('clean', help='Limpa arquivos temporários')
@@ -280,6 +546,14 @@ def main():
         serve_api(args)
     elif args.command == 'evaluate':
         evaluate_model(args)
+    elif args.command == 'build-book':
+        build_book(args)
+    elif args.command == 'tune-weighted':
+        tune_weighted(args)
+    elif args.command == 'sweep':
+        run_sweep(args)
+    elif args.command == 'history':
+        show_history(args)
     elif args.command == 'clean':
         clean_files(args)
 
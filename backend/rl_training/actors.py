@@ -0,0 +1,112 @@
+"""
+Atores para treinamento distribuído (actor/learner)
+===================================================
+
+Cada ator é um processo com uma cópia do RLBot que só joga: recebe do
+learner ordens de trabalho (oponentes de um lote de episódios e epsilon),
+joga o lote no ambiente vetorizado (rl_training/vec_env.py) e devolve as
+transições por uma fila. Antes de cada lote o ator copia os pesos mais
+recentes publicados pelo learner em uma rede em memória compartilhada.
+
+O learner (DQNTrainer.train com actors > 0, ou a liga de self-play em
+train_self_play.py) controla o cronograma de epsilon/oponentes, guarda as
+transições no replay e treina sem parar. As ordens também podem trazer
+políticas congeladas da liga, registradas no ambiente como oponentes.
+"""
+
+import sys
+import os
+import torch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils import STATS
+from bots.rl_bot import RLBot, QNetwork
+from rl_training.vec_env import VecTrainingEnv, FrozenPolicy
+
+
+class SharedWeights:
+    """Pesos da rede publicados pelo learner e lidos pelos atores."""
+
+    def __init__(self, ctx, network):
+        """
+        Args:
+            ctx: Contexto de torch.multiprocessing
+            network: Rede inicial (os pesos são copiados)
+        """
+        self.network = QNetwork.from_state_dict(network.state_dict())
+        self.network.share_memory()
+        self.version = ctx.Value('i', 0)
+        self.lock = ctx.Lock()
+
+    def publish(self, network):
+        """Copia os pesos da rede do learner (chamado pelo learner)."""
+        with self.lock:
+            self.network.load_state_dict(network.state_dict())
+            self.version.value += 1
+
+    def pull(self, network, seen_version):
+        """
+        Copia os pesos publicados se houver versão nova (chamado pelos atores).
+
+        Returns:
+            Versão dos pesos em `network`
+        """
+        if self.version.value == seen_version:
+            return seen_version
+        with self.lock:
+            network.load_state_dict(self.network.state_dict())
+            return self.version.value
+
+
+def run_actor(actor_id, cards, rewards, weights, jobs, results, n_envs, hand_size, seed,
+              league_rewards=None, facil_weights=None):
+    """
+    Laço de um processo ator.
+
+    Args:
+        actor_id: Índice do ator
+        cards: Baralho completo
+        rewards: Tabela de recompensas por oponente (ver train_dqn.REWARDS)
+        weights: SharedWeights do learner
+        jobs: Fila de ordens (lista de oponentes, epsilon, membros novos da liga
+            [(nome, pesos)], nomes dos membros que saíram da liga); None encerra
+            o ator
+        results: Fila de saída: (actor_id, transições, recompensas dos episódios,
+            resultados dos episódios)
+        n_envs: Jogos simultâneos do ambiente vetorizado
+        hand_size: Cartas por mão
+        seed: Semente do ator
+        league_rewards: Recompensas contra os membros da liga
+        facil_weights: Pesos do Facil_Bot (load_stat_weights; None usa os padrões)
+    """
+    # Um processo por núcleo: evita que cada ator abra vários threads do torch
+    torch.set_num_threads(1)
+
+    bot = RLBot(deck=[], stats_list=STATS, replay_capacity=1, dueling=weights.network.dueling)
+    bot.device = torch.device("cpu")
+    bot.qnetwork_local.to(bot.device)
+
+    transitions = []
+    env = VecTrainingEnv(bot, cards, rewards, n_envs=n_envs, hand_size=hand_size, seed=seed,
+                         store=lambda *batch: transitions.append(batch), facil_weights=facil_weights)
+    version = -1
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+
+        opponents, epsilon, members, removed = job
+        for name, snapshot in members:
+            network = QNetwork.from_state_dict(snapshot)
+            env.add_opponent(name, FrozenPolicy(env.tables, bot, network), league_rewards)
+        for name in removed:
+            env.remove_opponent(name)
+
+        version = weights.pull(bot.qnetwork_local, version)
+        bot.epsilon = epsilon
+
+        transitions.clear()
+        episode_rewards, outcomes, _ = env.run_episodes(opponents)
+        results.put((actor_id, transitions[0], episode_rewards, outcomes))
@@ -0,0 +1,184 @@
+"""
+Checkpoints de treinamento
+==========================
+
+Gravação atômica e assíncrona dos checkpoints dos treinadores:
+
+- atomic_save / atomic_write_json: grava em arquivo temporário no mesmo
+  diretório, faz fsync e renomeia por cima do destino. Um processo
+  interrompido no meio da escrita nunca deixa um arquivo truncado.
+- AsyncWriter: thread única que executa as gravações em ordem. O laço de
+  treinamento só copia o estado (rápido) e segue jogando.
+- CheckpointManager: checkpoints completos numerados
+  (<prefixo>_<episódio>.pt) com retenção dos `keep` mais recentes.
+
+Os checkpoints completos são dicionários Python gravados com torch.save;
+o conteúdo é definido por cada treinador.
+"""
+
+import json
+import os
+import queue
+import re
+import threading
+import torch
+
+
+def _atomic_replace(path, write):
+    """Grava via `write(arquivo)` em um temporário e renomeia para `path`."""
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+
+    tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    try:
+        with open(tmp_path, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def atomic_save(obj, path):
+    """torch.save atômico."""
+    _atomic_replace(path, lambda f: torch.save(obj, f))
+
+
+def atomic_write_json(obj, path):
+    """Gravação atômica de JSON (UTF-8, indentado)."""
+    _atomic_replace(path, lambda f: f.write(json.dumps(obj, indent=2).encode('utf-8')))
+
+
+class AsyncWriter:
+    """Executa gravações em uma thread de fundo, na ordem de envio."""
+
+    def __init__(self, max_pending=4):
+        """
+        Args:
+            max_pending: Gravações na fila antes de submit() bloquear
+        """
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name='checkpoint-writer', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                function, args = job
+                function(*args)
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError(f"Falha ao gravar checkpoint: {error}") from error
+
+    def submit(self, function, *args):
+        """Agenda `function(*args)` (os argumentos não devem mudar depois)."""
+        self._raise_error()
+        self._queue.put((function, args))
+
+    def wait(self):
+        """Espera as gravações pendentes terminarem."""
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """Espera as gravações pendentes e encerra a thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_error()
+
+
+class CheckpointManager:
+    """Checkpoints completos numerados, com retenção dos mais recentes."""
+
+    def __init__(self, directory, prefix='checkpoint', keep=3, writer=None):
+        """
+        Args:
+            directory: Diretório dos checkpoints
+            prefix: Prefixo dos arquivos
+            keep: Quantos checkpoints manter (os mais antigos são apagados)
+            writer: AsyncWriter compartilhado (padrão: um próprio)
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.keep = keep
+        self.writer = writer or AsyncWriter()
+        self._pattern = re.compile(rf'^{re.escape(prefix)}_(\d+)\.pt$')
+
+    def paths(self):
+        """Checkpoints existentes, do mais antigo ao mais recente."""
+        if not os.path.isdir(self.directory):
+            return []
+        found = []
+        for name in os.listdir(self.directory):
+            match = self._pattern.match(name)
+            if match:
+                found.append((int(match.group(1)), os.path.join(self.directory, name)))
+        return [path for _, path in sorted(found)]
+
+    def latest(self):
+        """Caminho do checkpoint mais recente ou None."""
+        paths = self.paths()
+        return paths[-1] if paths else None
+
+    def save(self, state, step):
+        """
+        Agenda a gravação de um checkpoint (retorna sem esperar a escrita).
+
+        Args:
+            state: Estado já copiado (não pode ser alterado pelo treinamento)
+            step: Número do checkpoint (episódio)
+
+        Returns:
+            Caminho do checkpoint
+        """
+        path = os.path.join(self.directory, f"{self.prefix}_{step:09d}.pt")
+        self.writer.submit(self._write, state, path)
+        return path
+
+    def _write(self, state, path):
+        atomic_save(state, path)
+        for old_path in self.paths()[:-self.keep]:
+            os.remove(old_path)
+
+    def resolve(self, path):
+        """'latest' -> checkpoint mais recente; outros valores são caminhos."""
+        if path == 'latest':
+            path = self.latest()
+            if path is None:
+                raise FileNotFoundError(f"Nenhum checkpoint em {self.directory}")
+        return path
+
+    def load(self, path='latest'):
+        """
+        Carrega um checkpoint.
+
+        Args:
+            path: Caminho do arquivo ou 'latest'
+
+        Returns:
+            Tupla (caminho, estado)
+        """
+        path = self.resolve(path)
+        return path, torch.load(path, map_location='cpu', weights_only=False)
+
+    def wait(self):
+        """Espera as gravações pendentes."""
+        self.writer.wait()
+
+    def close(self):
+        """Espera as gravações pendentes e encerra a thread de gravação."""
+        self.writer.close()
@@ -0,0 +1,484 @@
+"""
+Avaliação de políticas do RLBot
+===============================
+
+Joga as partidas de avaliação do RLBot (epsilon = 0) contra os oponentes
+fixos, em um pool de processos. Cada processo mantém um RLBot leve e
+recebe apenas os pesos da rede (RLBot.policy_snapshot()).
+
+Cada partida tem semente própria derivada da semente da avaliação: as
+mãos, quem começa e os sorteios dos bots dependem só dela, então o
+resultado de uma avaliação com semente fixa não depende do número de
+processos nem da ordem em que as partidas terminam. Por isso o Medio_Bot
+da avaliação busca um número fixo de iterações (sem limite de tempo) e
+sem a tabela de transposição compartilhada.
+
+A avaliação sequencial (evaluate_sequential) joga em lotes e para contra
+cada oponente assim que o intervalo de confiança (Wilson) da taxa de
+vitória fica mais estreito que a precisão pedida.
+
+Na avaliação espelhada cada distribuição de cartas é jogada duas vezes,
+com as mãos trocadas (quem começa acompanha a mão), e a unidade de medida
+é o par: a sorte da distribuição se cancela dentro do par. Comparações
+entre modelos (compare) usam as mesmas sementes para os dois (números
+aleatórios comuns) e relatam a diferença pareada por distribuição.
+"""
+
+import copy
+import math
+import random
+from statistics import NormalDist
+import sys
+import os
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils import STATS, evaluate
+from bots.rl_bot import RLBot
+from bots.weighted_bot import WeightedBot, load_stat_weights
+from bots.mcts_bot import MCTSBot
+
+EVAL_OPPONENTS = ['Facil_Bot', 'Medio_Bot']
+
+# Mãos de até este tamanho o Medio_Bot decide pelo solucionador de finais
+# (bots/endgame.py) e não pela busca: nos jogos de 5 cartas do treinamento e
+# da avaliação, o Medio_Bot é o solucionador
+MEDIO_ENDGAME_CARDS = 5
+
+
+def load_facil_weights(path):
+    """
+    Carrega os pesos do Facil_Bot pedidos na linha de comando.
+
+    Args:
+        path: Arquivo de python manage.py tune-weighted ou None
+
+    Returns:
+        Dicionário atributo -> peso, ou None (pesos padrão) se path for None
+    """
+    if path is None:
+        return None
+    weights = load_stat_weights(path)
+    if weights is None:
+        raise ValueError(f"Pesos do Facil_Bot ausentes ou inválidos: {path}")
+    return weights
+
+
+def make_opponent(name, seed=None, mcts_workers=1, facil_weights=None):
+    """
+    Cria um oponente de avaliação.
+
+    Args:
+        name: 'Facil_Bot' ou 'Medio_Bot' (MCTSBot com o solucionador de
+            finais até MEDIO_ENDGAME_CARDS cartas)
+        seed: Semente dos sorteios do bot (Medio_Bot)
+        mcts_workers: Processos da busca paralela do Medio_Bot
+        facil_weights: Pesos do Facil_Bot (load_stat_weights; None usa os padrões)
+    """
+    if name == "Facil_Bot":
+        return WeightedBot(deck=[], stat_weights=facil_weights)
+    elif name == "Medio_Bot":
+        return MCTSBot(deck=[], simulations=50, time_budget_ms=None, seed=seed,
+                       workers=mcts_workers, transposition=False, endgame_cards=MEDIO_ENDGAME_CARDS)
+    raise ValueError(f"Oponente desconhecido: {name}")
+
+
+def play_game(bot1, bot2, deck1, deck2, first_player, max_rounds=50):
+    """
+    Joga uma partida completa entre dois bots.
+
+    Args:
+        bot1, bot2: Bots (cada um escolhe vendo a mão do adversário)
+        deck1, deck2: Mãos iniciais
+        first_player: 1 ou 2, quem ataca primeiro
+        max_rounds: Limite de rodadas
+
+    Returns:
+        1 se bot1 vence, -1 se bot2 vence, 0 em caso de empate
+    """
+    bot1.deck = copy.deepcopy(deck1)
+    bot2.deck = copy.deepcopy(deck2)
+
+    bot1_wins = 0
+    bot2_wins = 0
+    rounds_played = 0
+    current_player = first_player
+
+    while bot1.deck and bot2.deck and rounds_played < max_rounds:
+        rounds_played += 1
+
+        if current_player == 1:
+            card1, stat = bot1.choose_move(bot2.deck, STATS)
+            card2 = bot2.choose_card(bot1.deck, stat)
+        else:
+            card2, stat = bot2.choose_move(bot1.deck, STATS)
+            card1 = bot1.choose_card(bot2.deck, stat)
+
+        if card1 is None or card2 is None:
+            break
+
+        result = evaluate(card1, card2, stat)
+
+        if result == 1:
+            bot1_wins += 1
+            current_player = 1
+        elif result == -1:
+            bot2_wins += 1
+            current_player = 2
+
+        bot1.deck = [c for c in bot1.deck if c['id'] != card1['id']]
+        bot2.deck = [c for c in bot2.deck if c['id'] != card2['id']]
+
+    if bot1_wins > bot2_wins:
+        return 1
+    elif bot2_wins > bot1_wins:
+        return -1
+    return 0
+
+
+def play_seeded_game(bot, opponent_name, cards, seed, hand_size=5, mcts_workers=1, mirrored=False,
+                     facil_weights=None):
+    """
+    Joga uma partida de avaliação totalmente determinada pela semente.
+
+    Args:
+        mirrored: Joga a mesma distribuição com as mãos trocadas (quem
+            começa é o jogador que recebe a mão que começaria)
+
+    Returns:
+        Resultado do ponto de vista do RLBot (1, 0 ou -1)
+    """
+    rng = random.Random(seed)
+    shuffled = rng.sample(cards, len(cards))
+    first_player = rng.choice([1, 2])
+
+    hand1, hand2 = shuffled[:hand_size], shuffled[hand_size:2 * hand_size]
+    if mirrored:
+        hand1, hand2 = hand2, hand1
+        first_player = 3 - first_player
+
+    # Sorteios internos dos bots (random/NumPy globais)
+    random.seed(seed)
+    np.random.seed(seed % 2**32)
+
+    opponent = make_opponent(opponent_name, seed=seed, mcts_workers=mcts_workers,
+                             facil_weights=facil_weights)
+    return play_game(bot, opponent, hand1, hand2, first_player)
+
+
+def game_seeds(seed, num_games):
+    """Sementes das partidas de uma avaliação (as mesmas para todos os oponentes)."""
+    return np.random.default_rng(seed).integers(2**31, size=num_games).tolist()
+
+
+def wilson_interval(successes, games, confidence=0.95):
+    """
+    Intervalo de confiança de Wilson para uma proporção.
+
+    Args:
+        successes: Número de sucessos (vitórias)
+        games: Número de partidas
+        confidence: Nível de confiança
+
+    Returns:
+        Tupla (limite inferior, limite superior)
+    """
+    if games == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = successes / games
+    denominator = 1 + z * z / games
+    center = (p + z * z / (2 * games)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def mean_interval(values, confidence=0.95):
+    """
+    Média e intervalo de confiança (aproximação normal) de amostras
+    independentes, como pontuações por par espelhado ou diferenças pareadas.
+
+    Returns:
+        Tupla (média, (limite inferior, limite superior))
+    """
+    values = np.asarray(values, dtype=np.float64)
+    mean = float(values.mean()) if len(values) else 0.0
+    if len(values) < 2:
+        return mean, (-math.inf, math.inf)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    margin = z * float(values.std(ddof=1)) / math.sqrt(len(values))
+    return mean, (mean - margin, mean + margin)
+
+
+def score_interval(scores, confidence=0.95):
+    """
+    Média e intervalo de confiança de pontuações em [0, 1], como as
+    pontuações por par espelhado.
+
+    Como no intervalo de Agresti-Coull, soma uma pseudo-observação 0 e uma 1
+    antes da aproximação normal: sequências sem variância (todos os pares
+    vencidos, por exemplo) não produzem intervalos de largura zero e o
+    intervalo fica limitado a [0, 1].
+
+    Returns:
+        Tupla (média, (limite inferior, limite superior))
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    mean = float(scores.mean()) if len(scores) else 0.0
+    if len(scores) == 0:
+        return mean, (0.0, 1.0)
+    _, (low, high) = mean_interval(np.concatenate([scores, [0.0, 1.0]]), confidence)
+    return mean, (max(0.0, low), min(1.0, high))
+
+
+def pair_scores(results):
+    """
+    Pontuação média (vitória = 1, empate = 0.5) de cada par espelhado.
+
+    Args:
+        results: Resultados na ordem (distribuição 1, espelho 1, distribuição 2, ...)
+    """
+    points = (np.asarray(results, dtype=np.float64) + 1) / 2
+    return points.reshape(-1, 2).mean(axis=1)
+
+
+# RLBot de avaliação de cada processo do pool
+_worker = {}
+
+
+def _init_worker(cards, stats_list, mcts_workers):
+    # Um processo por núcleo: evita que cada processo abra vários threads do torch
+    torch.set_num_threads(1)
+    _load_worker(cards, stats_list, mcts_workers)
+
+
+def _load_worker(cards, stats_list, mcts_workers):
+    bot = RLBot(deck=[], stats_list=stats_list, epsilon=0.0, replay_capacity=1)
+    bot.index_cards(cards)
+    _worker.update(bot=bot, cards=cards, mcts_workers=mcts_workers)
+
+
+def _play_chunk(args):
+    """Joga um bloco de partidas (semente, espelhada) com os pesos recebidos (executado no pool)."""
+    snapshot, opponent_name, games, facil_weights = args
+    bot = _worker['bot']
+    bot.load_policy(snapshot)
+    return [play_seeded_game(bot, opponent_name, _worker['cards'], seed,
+                             mcts_workers=_worker['mcts_workers'], mirrored=mirrored,
+                             facil_weights=facil_weights)
+            for seed, mirrored in games]
+
+
+class PolicyEvaluator:
+    """Avalia snapshots da política do RLBot em paralelo."""
+
+    def __init__(self, cards, workers=1, stats_list=STATS, mcts_workers=1, facil_weights=None):
+        """
+        Args:
+            cards: Baralho completo
+            workers: Processos do pool (1 = partidas no próprio processo)
+            stats_list: Atributos do RLBot
+            mcts_workers: Processos da busca do Medio_Bot (só sem pool; processos
+                do pool não podem abrir outro pool)
+            facil_weights: Pesos do Facil_Bot (load_stat_weights; None usa os padrões)
+        """
+        self.cards = cards
+        self.facil_weights = facil_weights
+        self.workers = workers
+        self.stats_list = stats_list
+        self.mcts_workers = mcts_workers if workers <= 1 else 1
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            ctx = mp.get_context('spawn')
+            self._pool = ctx.Pool(self.workers, initializer=_init_worker,
+                                  initargs=(self.cards, self.stats_list, self.mcts_workers))
+        return self._pool
+
+    def close(self):
+        """Encerra o pool de processos."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def play(self, snapshot, opponent_name, num_games, seed):
+        """
+        Joga as partidas de avaliação contra um oponente.
+
+        Returns:
+            Lista com o resultado de cada partida (1, 0 ou -1), na ordem das sementes
+        """
+        return self.play_seeds(snapshot, opponent_name, game_seeds(seed, num_games))
+
+    def play_seeds(self, snapshot, opponent_name, seeds, mirrored=False):
+        """
+        Joga uma partida por semente; resultados na ordem das sementes.
+
+        Com mirrored=True joga duas partidas por semente (normal e espelhada),
+        na ordem (semente 1, espelho 1, semente 2, ...).
+        """
+        if mirrored:
+            seeds = [(seed, flip) for seed in seeds for flip in (False, True)]
+        else:
+            seeds = [(seed, False) for seed in seeds]
+
+        if self.workers <= 1:
+            if 'bot' not in _worker:
+                _load_worker(self.cards, self.stats_list, self.mcts_workers)
+            # As partidas semeiam random/NumPy globais: preserva os sorteios do chamador
+            random_state, numpy_state = random.getstate(), np.random.get_state()
+            try:
+                return _play_chunk((snapshot, opponent_name, seeds, self.facil_weights))
+            finally:
+                random.setstate(random_state)
+                np.random.set_state(numpy_state)
+
+        bounds = np.linspace(0, len(seeds), min(self.workers * 4, len(seeds)) + 1).astype(int)
+        jobs = [(snapshot, opponent_name, seeds[start:end], self.facil_weights) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+        return [result for chunk in self._get_pool().map(_play_chunk, jobs) for result in chunk]
+
+    def evaluate(self, snapshot, num_games=100, seed=0, opponents=EVAL_OPPONENTS, mirrored=False):
+        """
+        Avalia a política contra cada oponente.
+
+        Args:
+            snapshot: Pesos da rede (RLBot.policy_snapshot())
+            num_games: Partidas por oponente (com mirrored, num_games // 2 pares)
+            seed: Semente da avaliação
+            opponents: Nomes dos oponentes
+            mirrored: Joga cada distribuição duas vezes, com as mãos trocadas
+
+        Returns:
+            dict: oponente -> {'win_rate', 'draw_rate', 'results'}; com
+            mirrored também 'score' e 'interval' (pontuação média por par)
+        """
+        evaluation = {}
+        for opponent_name in opponents:
+            if mirrored:
+                seeds = game_seeds(seed, max(1, num_games // 2))
+                results = self.play_seeds(snapshot, opponent_name, seeds, mirrored=True)
+            else:
+                results = self.play(snapshot, opponent_name, num_games, seed)
+            evaluation[opponent_name] = self._summary(results, mirrored)
+        return evaluation
+
+    @staticmethod
+    def _summary(results, mirrored, confidence=0.95):
+        summary = {
+            'win_rate': results.count(1) / len(results),
+            'draw_rate': results.count(0) / len(results),
+            'results': results,
+            'games': len(results),
+        }
+        if mirrored:
+            summary['score'], summary['interval'] = score_interval(pair_scores(results), confidence)
+        else:
+            summary['interval'] = wilson_interval(results.count(1), len(results), confidence)
+        return summary
+
+    def compare(self, snapshot, baseline, num_deals=100, seed=0, opponents=EVAL_OPPONENTS,
+                confidence=0.95):
+        """
+        Compara duas políticas nas mesmas distribuições espelhadas (números
+        aleatórios comuns) com estatística pareada por distribuição.
+
+        Args:
+            snapshot: Pesos do modelo avaliado
+            baseline: Pesos do modelo de referência
+            num_deals: Distribuições por oponente (2 partidas cada, por modelo)
+            seed: Semente da avaliação
+            opponents: Nomes dos oponentes
+            confidence: Nível de confiança dos intervalos
+
+        Returns:
+            dict: oponente -> {'model', 'baseline' (resumos como em evaluate),
+            'difference', 'interval' (diferença de pontuação modelo - referência),
+            'deals'}
+        """
+        seeds = game_seeds(seed, num_deals)
+        comparison = {}
+        for opponent_name in opponents:
+            model_results = self.play_seeds(snapshot, opponent_name, seeds, mirrored=True)
+            baseline_results = self.play_seeds(baseline, opponent_name, seeds, mirrored=True)
+
+            differences = pair_scores(model_results) - pair_scores(baseline_results)
+            difference, interval = mean_interval(differences, confidence)
+            comparison[opponent_name] = {
+                'model': self._summary(model_results, True, confidence),
+                'baseline': self._summary(baseline_results, True, confidence),
+                'difference': difference,
+                'interval': interval,
+                'deals': num_deals,
+            }
+        return comparison
+
+    def evaluate_sequential(self, snapshot, precision=0.05, confidence=0.95, min_games=20,
+                            max_games=1000, batch=None, seed=0, opponents=EVAL_OPPONENTS,
+                            mirrored=False):
+        """
+        Avalia a política parando contra cada oponente assim que a taxa de
+        vitória estiver determinada com a precisão pedida.
+
+        As partidas são jogadas em lotes e o intervalo de Wilson (com mirrored,
+        score_interval()) é conferido ao fim de cada lote; a sequência de
+        sementes é a mesma de evaluate(), então o resultado é reproduzível.
+
+        Conferir o intervalo a cada lote é um teste repetido: para que a
+        confiança pedida valha para o intervalo em que a avaliação para, o
+        erro (1 - confidence) é dividido igualmente entre as conferências que
+        podem parar a avaliação (Bonferroni, a partir de min_games) e cada uma
+        usa o intervalo mais largo que resulta.
+
+        Args:
+            snapshot: Pesos da rede (RLBot.policy_snapshot())
+            precision: Meia largura máxima do intervalo de confiança
+            confidence: Nível de confiança do intervalo final (já corrigido
+                para as conferências repetidas)
+            min_games: Partidas mínimas por oponente
+            max_games: Partidas máximas por oponente
+            batch: Partidas por lote (padrão: 20 ou 4 por processo)
+            seed: Semente da avaliação
+            opponents: Nomes dos oponentes
+            mirrored: Joga pares espelhados; a precisão passa a valer para a
+                pontuação média por par (vitória = 1, empate = 0.5)
+
+        Returns:
+            dict: oponente -> {'win_rate', 'draw_rate', 'results', 'games',
+            'interval' (inferior, superior), 'converged', 'looks'} (com
+            mirrored, 'score')
+        """
+        batch = batch or max(20, self.workers * 4)
+        per_seed = 2 if mirrored else 1
+        seeds = game_seeds(seed, max(1, max_games // per_seed))
+
+        # Bonferroni sobre as conferências que podem parar a avaliação (uma por
+        # lote, a partir do lote que completa min_games)
+        seeds_per_look = max(1, batch // per_seed)
+        total_looks = math.ceil(len(seeds) / seeds_per_look)
+        first_look = min(total_looks, math.ceil(min_games / (seeds_per_look * per_seed)))
+        looks = max(1, total_looks - first_look + 1)
+        look_confidence = 1 - (1 - confidence) / looks
+
+        evaluation = {}
+        for opponent_name in opponents:
+            results = []
+            played = 0
+            while played < len(seeds):
+                size = min(seeds_per_look, len(seeds) - played)
+                results += self.play_seeds(snapshot, opponent_name, seeds[played:played + size], mirrored)
+                played += size
+
+                summary = self._summary(results, mirrored, look_confidence)
+                low, high = summary['interval']
+                if len(results) >= min_games and (high - low) / 2 <= precision:
+                    break
+
+            summary['converged'] = (high - low) / 2 <= precision
+            summary['looks'] = looks
+            evaluation[opponent_name] = summary
+        return evaluation
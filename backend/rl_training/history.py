@@ -0,0 +1,177 @@
+"""
+Histórico de treinamento
+========================
+
+O histórico é um arquivo NDJSON só de acréscimo: cada avaliação grava uma
+linha com um registro plano, por exemplo
+
+    {"episode": 1000, "time": 1718000000.0, "avg_reward": 3.1, "epsilon": 0.98,
+     "win_rate.Facil_Bot": 0.41, "draw_rate.Facil_Bot": 0.02, ...}
+
+Gravar custa o tamanho de uma linha, independente da duração do
+treinamento. O checkpoint guarda o tamanho do arquivo (offset) no momento
+em que foi salvo; ao retomar, o arquivo é cortado nesse ponto e as linhas
+gravadas depois do checkpoint são descartadas junto com o resto do estado.
+
+HistoryReader lê só as séries pedidas (uma passada pelo arquivo, sem
+montar o histórico inteiro) e também entende o formato antigo
+(dqn_training_history.json, listas indentadas).
+"""
+
+import json
+import math
+import os
+
+
+class HistoryWriter:
+    """Acrescenta registros ao histórico NDJSON."""
+
+    def __init__(self, path, resume_offset=None, append=False):
+        """
+        Args:
+            path: Arquivo NDJSON
+            resume_offset: Tamanho do arquivo no checkpoint retomado (corta o resto)
+            append: Continua o arquivo existente sem cortar (padrão: começa do zero)
+        """
+        self.path = path
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+
+        if resume_offset is not None or append:
+            self.file = open(path, 'ab')
+            if resume_offset is not None and resume_offset <= self.file.tell():
+                self.file.truncate(resume_offset)
+                self.file.seek(resume_offset)
+        else:
+            self.file = open(path, 'wb')
+
+    def append(self, record):
+        """Grava um registro (dict plano) como uma linha."""
+        self.file.write(json.dumps(record, separators=(',', ':')).encode('utf-8') + b'\n')
+        self.file.flush()
+
+    def sync(self):
+        """
+        Garante os registros no disco.
+
+        Returns:
+            Offset atual (guardado no checkpoint)
+        """
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+
+
+def _legacy_records(path):
+    """Registros do formato antigo ({'episodes': [...], 'win_rates': {oponente: [...]}})."""
+    with open(path, 'r', encoding='utf-8') as f:
+        history = json.load(f)
+
+    columns = {
+        'episode': history.get('episodes', []),
+        'avg_reward': history.get('avg_rewards', []),
+        'epsilon': history.get('epsilon_values', []),
+    }
+    for opponent, values in history.get('win_rates', {}).items():
+        columns[f'win_rate.{opponent}'] = values
+
+    for i in range(len(columns['episode'])):
+        yield {name: values[i] for name, values in columns.items() if i < len(values)}
+
+
+class HistoryReader:
+    """Leitura preguiçosa do histórico (NDJSON ou JSON antigo)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.legacy = path.endswith('.json')
+
+    def records(self):
+        """Itera os registros, um de cada vez."""
+        if self.legacy:
+            yield from _legacy_records(self.path)
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def columns(self):
+        """Nomes das séries presentes no histórico, na ordem em que aparecem."""
+        names = {}
+        for record in self.records():
+            names.update(dict.fromkeys(record))
+        return list(names)
+
+    def series(self, *names, every=1):
+        """
+        Carrega apenas as séries pedidas.
+
+        Args:
+            names: Nomes das séries (ex: 'episode', 'win_rate.Medio_Bot')
+            every: Mantém um registro a cada `every` (1 = todos)
+
+        Returns:
+            dict nome -> lista de valores (None onde o registro não tem a série)
+        """
+        result = {name: [] for name in names}
+        for i, record in enumerate(self.records()):
+            if i % every:
+                continue
+            for name in names:
+                result[name].append(record.get(name))
+        return result
+
+
+def downsample(episodes, values, points):
+    """
+    Reduz uma série a `points` baldes consecutivos (média de cada balde).
+
+    Returns:
+        Lista de tuplas (último episódio do balde, média, mínimo, máximo)
+    """
+    pairs = [(episode, value) for episode, value in zip(episodes, values) if value is not None]
+    if not pairs:
+        return []
+    size = max(1, math.ceil(len(pairs) / points))
+    buckets = []
+    for start in range(0, len(pairs), size):
+        chunk = [value for _, value in pairs[start:start + size]]
+        buckets.append((pairs[start:start + size][-1][0], sum(chunk) / len(chunk), min(chunk), max(chunk)))
+    return buckets
+
+
+def summarize(reader, names=None):
+    """
+    Resumo de cada série: registros, primeiro/último valor, melhor valor e episódio.
+
+    Args:
+        reader: HistoryReader
+        names: Séries resumidas (padrão: todas exceto episode/time)
+
+    Returns:
+        dict nome -> {'count', 'first', 'last', 'min', 'max', 'best_episode'}
+    """
+    names = names or [name for name in reader.columns() if name not in ('episode', 'time')]
+    data = reader.series('episode', *names)
+    summary = {}
+    for name in names:
+        pairs = [(episode, value) for episode, value in zip(data['episode'], data[name]) if value is not None]
+        if not pairs:
+            continue
+        values = [value for _, value in pairs]
+        summary[name] = {
+            'count': len(values),
+            'first': values[0],
+            'last': values[-1],
+            'min': min(values),
+            'max': max(values),
+            'best_episode': max(pairs, key=lambda pair: pair[1])[0],
+        }
+    return summary
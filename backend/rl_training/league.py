@@ -0,0 +1,167 @@
+"""
+Liga de self-play
+=================
+
+Pool de oponentes para o self-play: políticas congeladas do próprio agente
+(cópias dos pesos em episódios passados) mais âncoras fixas (Facil_Bot e
+Medio_Bot), com rating Elo para cada membro e para o agente.
+
+O matchmaking usa prioritized fictitious self-play (PFSP): a probabilidade
+de sortear um membro é proporcional a (1 - p) ** power, onde p é a chance
+de vitória do agente contra ele pelo Elo. O agente joga mais contra quem
+ainda o vence, sem esquecer os membros já dominados (peso mínimo).
+
+As âncoras têm ratings fixos, calibrados entre si, e servem de referência
+para a escala do Elo.
+"""
+
+import numpy as np
+
+# Âncoras e seus ratings fixos. O Medio_Bot (solucionador de finais) marca
+# 77% dos pontos contra o Facil_Bot em mãos de 5 cartas (4000 jogos de
+# vec_games.play_games), cerca de 200 pontos de Elo
+ANCHORS = {'Facil_Bot': 1000.0, 'Medio_Bot': 1200.0}
+
+
+def elo_expected(rating, opponent_rating):
+    """Pontuação esperada (vitória = 1, empate = 0.5) de `rating` contra `opponent_rating`."""
+    return 1.0 / (1.0 + 10 ** ((opponent_rating - rating) / 400.0))
+
+
+class League:
+    """Membros da liga, ratings e matchmaking PFSP."""
+
+    def __init__(self, max_size=20, pfsp_power=2.0, k_factor=16.0, initial_rating=1000.0,
+                 min_weight=0.02, anchors=ANCHORS):
+        """
+        Args:
+            max_size: Máximo de políticas congeladas (as mais antigas saem; âncoras ficam)
+            pfsp_power: Expoente do PFSP (0 = sorteio uniforme)
+            k_factor: Fator K das atualizações de Elo
+            initial_rating: Rating inicial do agente
+            min_weight: Peso mínimo de sorteio de cada membro
+            anchors: Oponentes fixos sempre presentes no pool (nome -> rating fixo)
+        """
+        self.max_size = max_size
+        self.pfsp_power = pfsp_power
+        self.k_factor = k_factor
+        self.min_weight = min_weight
+        self.anchors = dict(anchors)
+        self.agent_rating = initial_rating
+        self.agent_games = 0
+        self.members = {}
+        for name, rating in anchors.items():
+            self._add_member(name, None, rating, episode=0, anchor=True)
+
+    def _add_member(self, name, snapshot, rating, episode, anchor=False):
+        self.members[name] = {
+            'snapshot': snapshot,
+            'rating': rating,
+            'episode': episode,
+            'anchor': anchor,
+            'games': 0, 'wins': 0, 'draws': 0, 'losses': 0,
+        }
+
+    def add(self, snapshot, episode):
+        """
+        Congela uma cópia da política do agente como novo membro (com o
+        rating atual do agente).
+
+        Args:
+            snapshot: Pesos da rede (RLBot.policy_snapshot())
+            episode: Episódio do agente no momento da cópia
+
+        Returns:
+            Tupla (nome do membro novo, nomes dos membros removidos)
+        """
+        name = f"Liga_{episode:09d}"
+        self._add_member(name, snapshot, self.agent_rating, episode)
+
+        frozen = [member for member, info in self.members.items() if not info['anchor']]
+        removed = frozen[:max(0, len(frozen) - self.max_size)]
+        for member in removed:
+            del self.members[member]
+        return name, removed
+
+    def snapshots(self):
+        """Lista (nome, pesos) das políticas congeladas atuais."""
+        return [(name, info['snapshot']) for name, info in self.members.items() if not info['anchor']]
+
+    def win_probability(self, name):
+        """Pontuação esperada do agente contra o membro, pelo Elo."""
+        return elo_expected(self.agent_rating, self.members[name]['rating'])
+
+    def weights(self):
+        """Probabilidade de sorteio de cada membro (PFSP), na ordem de self.members."""
+        weights = np.array([
+            max((1.0 - self.win_probability(name)) ** self.pfsp_power, self.min_weight)
+            for name in self.members
+        ])
+        return weights / weights.sum()
+
+    def sample(self, count, rng):
+        """
+        Sorteia os oponentes de `count` episódios.
+
+        Args:
+            count: Número de episódios
+            rng: numpy.random.Generator
+        """
+        names = list(self.members)
+        return [names[i] for i in rng.choice(len(names), size=count, p=self.weights())]
+
+    def record(self, opponents, outcomes):
+        """
+        Atualiza ratings e contagens com resultados de episódios.
+
+        Args:
+            opponents: Nome do oponente de cada episódio
+            outcomes: Resultado de cada episódio do ponto de vista do agente (1, 0, -1)
+        """
+        for name, outcome in zip(opponents, outcomes):
+            info = self.members.get(name)
+            if info is None:  # membro removido enquanto o lote estava em jogo
+                continue
+            score = (float(outcome) + 1.0) / 2.0
+            delta = self.k_factor * (score - elo_expected(self.agent_rating, info['rating']))
+            self.agent_rating += delta
+            if not info['anchor']:
+                info['rating'] -= delta
+            self.agent_games += 1
+
+            info['games'] += 1
+            if outcome > 0:
+                info['wins'] += 1
+            elif outcome < 0:
+                info['losses'] += 1
+            else:
+                info['draws'] += 1
+
+    def table(self):
+        """Linhas de texto com rating, resultados e peso de sorteio de cada membro."""
+        lines = [f"Agente: Elo {self.agent_rating:7.1f} ({self.agent_games:,} jogos)"]
+        for (name, info), weight in zip(self.members.items(), self.weights()):
+            games = max(info['games'], 1)
+            lines.append(
+                f"  {name:>16}: Elo {info['rating']:7.1f} | agente vence {info['wins'] / games * 100:5.1f}% "
+                f"de {info['games']:,} | sorteio {weight * 100:5.1f}%"
+            )
+        return lines
+
+    def state_dict(self):
+        """Estado completo da liga (para checkpoints)."""
+        return {
+            'agent_rating': self.agent_rating,
+            'agent_games': self.agent_games,
+            'members': {name: dict(info) for name, info in self.members.items()},
+        }
+
+    def load_state_dict(self, state):
+        """Restaura o estado de state_dict()."""
+        self.agent_rating = state['agent_rating']
+        self.agent_games = state['agent_games']
+        self.members = {name: dict(info) for name, info in state['members'].items()}
+        # Checkpoints antigos podem ter âncoras com outro rating: vale o fixo atual
+        for name, rating in self.anchors.items():
+            if name in self.members:
+                self.members[name]['rating'] = rating
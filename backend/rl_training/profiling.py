@@ -0,0 +1,183 @@
+"""
+Instrumentação do treinamento
+=============================
+
+- PhaseTimer: cronômetros por fase (tempo exclusivo: o tempo de uma fase
+  aninhada não é contado na fase de fora) e contadores, com relatório de
+  vazão (episódios/s, passos/s, updates/s) e fatia de tempo por fase.
+  Custa duas chamadas de perf_counter por fase.
+- ProfileWindow: cProfile ligado só durante uma janela de episódios, com
+  o resultado gravado em .prof (para snakeviz/pstats) e resumido no log.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import time
+from functools import wraps
+
+
+class _Phase:
+    """Context manager reaproveitado de uma fase (evita alocar por chamada)."""
+
+    __slots__ = ('timer', 'name')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.timer._enter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer._exit(self.name)
+        return False
+
+
+class PhaseTimer:
+    """Tempo exclusivo por fase e contadores desde o último reset()."""
+
+    def __init__(self):
+        self._phases = {}
+        self._stack = []
+        self.reset()
+
+    def reset(self):
+        """Zera tempos e contadores (chamado a cada relatório)."""
+        self.totals = {}
+        self.calls = {}
+        self.counters = {}
+        self.started = time.perf_counter()
+
+    def phase(self, name):
+        """Context manager que cronometra a fase `name`."""
+        phase = self._phases.get(name)
+        if phase is None:
+            phase = self._phases[name] = _Phase(self, name)
+        return phase
+
+    def _enter(self):
+        # [início, tempo gasto em fases aninhadas]
+        self._stack.append([time.perf_counter(), 0.0])
+
+    def _exit(self, name):
+        start, nested = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        self.totals[name] = self.totals.get(name, 0.0) + elapsed - nested
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if self._stack:
+            self._stack[-1][1] += elapsed
+
+    def count(self, name, amount=1):
+        """Soma `amount` ao contador `name`."""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def instrument(self, obj, method_name, phase_name=None, counter=None):
+        """
+        Cronometra todas as chamadas de obj.method_name (substitui o método
+        apenas nessa instância).
+
+        Args:
+            obj: Objeto instrumentado
+            method_name: Nome do método
+            phase_name: Fase onde o tempo é somado (padrão: nome do método)
+            counter: Contador incrementado a cada chamada (opcional)
+        """
+        method = getattr(obj, method_name)
+        phase = self.phase(phase_name or method_name)
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            if counter is not None:
+                self.count(counter)
+            with phase:
+                return method(*args, **kwargs)
+
+        setattr(obj, method_name, timed)
+
+    def report(self):
+        """
+        Métricas desde o último reset().
+
+        Returns:
+            dict com 'elapsed', 'rates' (contadores por segundo), 'phases'
+            (fase -> (segundos, fração do tempo total, chamadas))
+        """
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        timed = sum(self.totals.values())
+        phases = {
+            name: (seconds, seconds / elapsed, self.calls[name])
+            for name, seconds in sorted(self.totals.items(), key=lambda item: -item[1])
+        }
+        phases['outros'] = (max(0.0, elapsed - timed), max(0.0, elapsed - timed) / elapsed, 0)
+        return {
+            'elapsed': elapsed,
+            'rates': {name: value / elapsed for name, value in self.counters.items()},
+            'phases': phases,
+        }
+
+    def format(self):
+        """Relatório em linhas de texto (vazão e fatia de tempo por fase)."""
+        report = self.report()
+        rates = ' | '.join(f"{name}/s: {rate:,.1f}" for name, rate in report['rates'].items())
+        lines = [f"Vazão ({report['elapsed']:.1f}s): {rates}"]
+        for name, (seconds, share, calls) in report['phases'].items():
+            lines.append(f"  {name:>16}: {share*100:5.1f}% ({seconds:.2f}s, {calls:,} chamadas)")
+        return lines
+
+
+class ProfileWindow:
+    """cProfile ativo entre dois episódios do treinamento."""
+
+    def __init__(self, start, episodes, output_dir="../logs", top=25):
+        """
+        Args:
+            start: Episódio em que o profile começa
+            episodes: Tamanho da janela em episódios
+            output_dir: Diretório do arquivo .prof
+            top: Funções listadas no resumo
+        """
+        self.start = start
+        self.end = start + episodes
+        self.output_dir = output_dir
+        self.top = top
+        self.profiler = None
+        self.done = False
+
+    def update(self, episode, log=print):
+        """
+        Liga/desliga o profiler conforme o episódio atual.
+
+        Returns:
+            Caminho do .prof quando a janela termina, senão None
+        """
+        if self.done:
+            return None
+        if self.profiler is None and episode >= self.start:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+            log(f"[Profile] cProfile ligado no episódio {episode:,} (até {self.end:,})")
+        elif self.profiler is not None and episode >= self.end:
+            return self.finish(log)
+        return None
+
+    def finish(self, log=print):
+        """Desliga o profiler, grava o .prof e registra as funções mais caras."""
+        if self.profiler is None or self.done:
+            return None
+        self.profiler.disable()
+        self.done = True
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"profile_{time.strftime('%Y%m%d_%H%M%S')}.prof")
+        self.profiler.dump_stats(path)
+
+        buffer = io.StringIO()
+        pstats.Stats(self.profiler, stream=buffer).sort_stats('cumulative').print_stats(self.top)
+        log(f"[Profile] Janela de {self.end - self.start:,} episódios gravada em {path}")
+        for line in buffer.getvalue().splitlines():
+            if line.strip():
+                log(f"[Profile] {line}")
+        return path
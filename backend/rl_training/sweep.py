@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Busca de hiperparâmetros do DQN
+===============================
+
+Roda trials do DQNTrainer em paralelo (um processo por trial, cada um
+fixado em um núcleo com sched_setaffinity), com sorteio aleatório dentro
+de um espaço de busca, poda pela mediana e resultados em SQLite.
+
+- Cada trial reporta o objetivo (taxa de vitória na avaliação periódica)
+  na tabela `reports`. Depois de `warmup_evals` avaliações, o trial é podado
+  se o seu melhor valor até o episódio atual ficar abaixo da mediana dos
+  melhores valores dos outros trials no mesmo episódio.
+- A tabela `trials` guarda parâmetros (JSON), estado (running, complete,
+  pruned, failed), valor final e melhor valor. Rodar a mesma busca de novo
+  completa os trials que faltam.
+
+Configuração (JSON):
+
+    {
+      "name": "dqn_basico",
+      "trials": 16,
+      "episodes": 20000,
+      "eval_interval": 2000,
+      "eval_games": 100,
+      "vec_envs": 256,
+      "objective": "Medio_Bot",
+      "seed": 0,
+      "pruner": {"warmup_evals": 2, "min_trials": 4},
+      "space": {
+        "lr": {"loguniform": [0.0001, 0.003]},
+        "gamma": {"uniform": [0.9, 0.999]},
+        "batch_size": {"choice": [32, 64, 128]},
+        "update_every": {"int": [1, 8]},
+        "replay_size": {"choice": [10000, 20000, 50000]},
+        "tau": {"loguniform": [0.0005, 0.01]},
+        "rewards.Medio_Bot.final_win": {"uniform": [5, 25]}
+      }
+    }
+
+Parâmetros "rewards.<oponente>.<chave>" alteram a tabela de recompensas;
+os demais são argumentos do DQNTrainer. "objective" é o nome de um
+oponente de avaliação ou "mean" (média entre os oponentes).
+
+Uso:
+    python sweep.py --config data/sweep_space.json [--workers N] [--db data/sweeps.db]
+    python sweep.py --config data/sweep_space.json --summary
+"""
+
+import sys
+import os
+import json
+import math
+import time
+import random
+import sqlite3
+import argparse
+import traceback
+import multiprocessing
+from multiprocessing.connection import wait
+import numpy as np
+import torch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Argumentos do DQNTrainer que podem ser sorteados
+TRAINER_PARAMS = {
+    'lr', 'gamma', 'batch_size', 'tau', 'update_every', 'replay_size',
+    'prioritized', 'per_alpha', 'per_beta', 'vec_envs',
+    'double_dqn', 'dueling', 'n_step', 'huber',
+}
+
+
+def sample_params(space, rng):
+    """
+    Sorteia um ponto do espaço de busca.
+
+    Args:
+        space: Dicionário parâmetro -> {'uniform'|'loguniform'|'int'|'choice': valores}
+        rng: random.Random
+
+    Returns:
+        dict parâmetro -> valor
+    """
+    params = {}
+    for name, spec in space.items():
+        (kind, values), = spec.items()
+        if kind == 'uniform':
+            params[name] = rng.uniform(*values)
+        elif kind == 'loguniform':
+            params[name] = math.exp(rng.uniform(math.log(values[0]), math.log(values[1])))
+        elif kind == 'int':
+            params[name] = rng.randint(*values)
+        elif kind == 'choice':
+            params[name] = rng.choice(values)
+        else:
+            raise ValueError(f"Distribuição desconhecida para {name}: {kind}")
+    return params
+
+
+def trainer_kwargs(params):
+    """Converte parâmetros sorteados em argumentos do DQNTrainer (recompensas aninhadas)."""
+    kwargs = {}
+    rewards = {}
+    for name, value in params.items():
+        if name.startswith('rewards.'):
+            _, opponent, key = name.split('.')
+            rewards.setdefault(opponent, {})[key] = float(value)
+        elif name in TRAINER_PARAMS:
+            kwargs[name] = value
+        else:
+            raise ValueError(f"Parâmetro desconhecido: {name}")
+    if rewards:
+        kwargs['rewards'] = rewards
+    return kwargs
+
+
+class SweepStore:
+    """Resultados das buscas em um arquivo SQLite (um por máquina, várias buscas)."""
+
+    def __init__(self, path):
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS trials (
+                    sweep TEXT NOT NULL,
+                    trial INTEGER NOT NULL,
+                    params TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    value REAL,
+                    best REAL,
+                    episodes INTEGER,
+                    core INTEGER,
+                    started REAL,
+                    finished REAL,
+                    error TEXT,
+                    PRIMARY KEY (sweep, trial)
+                )""")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS reports (
+                    sweep TEXT NOT NULL,
+                    trial INTEGER NOT NULL,
+                    episode INTEGER NOT NULL,
+                    value REAL NOT NULL,
+                    PRIMARY KEY (sweep, trial, episode)
+                )""")
+
+    def close(self):
+        self.conn.close()
+
+    def trials(self, sweep):
+        """Trials da busca como lista de dicts, em ordem de número."""
+        cursor = self.conn.execute("SELECT * FROM trials WHERE sweep = ? ORDER BY trial", (sweep,))
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def create_trial(self, sweep, trial, params, core):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO trials (sweep, trial, params, state, core, started) VALUES (?, ?, ?, ?, ?, ?)",
+                (sweep, trial, json.dumps(params), 'running', core, time.time())
+            )
+            self.conn.execute("DELETE FROM reports WHERE sweep = ? AND trial = ?", (sweep, trial))
+
+    def report(self, sweep, trial, episode, value):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?)", (sweep, trial, episode, value))
+
+    def reports(self, sweep, trial):
+        """Lista (episódio, valor) de um trial."""
+        return self.conn.execute(
+            "SELECT episode, value FROM reports WHERE sweep = ? AND trial = ? ORDER BY episode", (sweep, trial)
+        ).fetchall()
+
+    def best_at(self, sweep, episode, exclude):
+        """Melhor valor até `episode` de cada outro trial que já chegou a esse episódio."""
+        rows = self.conn.execute("""
+            SELECT trial, MAX(value) FROM reports
+            WHERE sweep = ? AND trial != ? AND episode <= ?
+              AND trial IN (SELECT trial FROM reports WHERE sweep = ? AND episode >= ?)
+            GROUP BY trial""", (sweep, exclude, episode, sweep, episode)).fetchall()
+        return [value for _, value in rows]
+
+    def finish(self, sweep, trial, state, error=None):
+        reports = self.reports(sweep, trial)
+        value = reports[-1][1] if reports else None
+        best = max(v for _, v in reports) if reports else None
+        episodes = reports[-1][0] if reports else 0
+        with self.conn:
+            self.conn.execute(
+                "UPDATE trials SET state = ?, value = ?, best = ?, episodes = ?, finished = ?, error = ? "
+                "WHERE sweep = ? AND trial = ?",
+                (state, value, best, episodes, time.time(), error, sweep, trial)
+            )
+
+
+class MedianPruner:
+    """Poda trials cujo melhor valor fica abaixo da mediana dos outros no mesmo episódio."""
+
+    def __init__(self, warmup_evals=2, min_trials=4):
+        """
+        Args:
+            warmup_evals: Avaliações de um trial antes de ele poder ser podado
+            min_trials: Outros trials necessários no mesmo episódio para comparar
+        """
+        self.warmup_evals = warmup_evals
+        self.min_trials = min_trials
+
+    def should_prune(self, store, sweep, trial, episode):
+        reports = store.reports(sweep, trial)
+        if len(reports) < self.warmup_evals:
+            return False
+        others = store.best_at(sweep, episode, exclude=trial)
+        if len(others) < self.min_trials:
+            return False
+        return max(value for _, value in reports) < float(np.median(others))
+
+
+def objective_value(eval_results, objective):
+    """Valor do objetivo a partir dos resultados de DQNTrainer.evaluate_performance()."""
+    if objective == 'mean':
+        return float(np.mean([metrics['win_rate'] for metrics in eval_results.values()]))
+    return float(eval_results[objective]['win_rate'])
+
+
+def run_trial(db_path, sweep, trial, params, config, core, output_dir):
+    """
+    Executa um trial (processo filho).
+
+    Args:
+        db_path: Arquivo SQLite da busca
+        sweep: Nome da busca
+        trial: Número do trial
+        params: Hiperparâmetros sorteados
+        config: Configuração da busca
+        core: Núcleo do processo (None = sem afinidade)
+        output_dir: Diretório de modelo, histórico, checkpoints e log do trial
+    """
+    if core is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {core})
+    torch.set_num_threads(1)
+
+    from rl_training.train_dqn import DQNTrainer, TrainingLogger, load_cards
+
+    seed = config.get('seed', 0) * 1000 + trial
+    random.seed(seed)
+    np.random.seed(seed % 2**32)
+    torch.manual_seed(seed)
+
+    store = SweepStore(db_path)
+    pruner = MedianPruner(**config.get('pruner', {}))
+    objective = config.get('objective', 'Medio_Bot')
+    pruned = []
+
+    def on_evaluation(episode, eval_results):
+        store.report(sweep, trial, episode, objective_value(eval_results, objective))
+        if pruner.should_prune(store, sweep, trial, episode):
+            pruned.append(episode)
+            return True
+        return False
+
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        kwargs = {'vec_envs': config.get('vec_envs', 256), **trainer_kwargs(params)}
+        trainer = DQNTrainer(
+            load_cards('data/carros.json'),
+            logger=TrainingLogger(log_dir=output_dir, echo=False),
+            eval_workers=1,
+            eval_games=config.get('eval_games', 100),
+            checkpoint_dir=os.path.join(output_dir, 'checkpoints'),
+            keep_checkpoints=1,
+            output_dir=output_dir,
+            eval_callback=on_evaluation,
+            **kwargs
+        )
+        episodes = config.get('episodes', 20000)
+        trainer.train(episodes=episodes, eval_interval=config.get('eval_interval', 2000),
+                      save_interval=episodes)
+        store.finish(sweep, trial, 'pruned' if pruned else 'complete')
+    except Exception:
+        store.finish(sweep, trial, 'failed', error=traceback.format_exc())
+        raise
+    finally:
+        store.close()
+
+
+def run_sweep(config, db_path, workers, output_dir):
+    """
+    Roda os trials que faltam da busca, até `workers` ao mesmo tempo.
+
+    Returns:
+        Lista de trials da busca (dicts de SweepStore.trials)
+    """
+    sweep = config['name']
+    store = SweepStore(db_path)
+
+    # Trials interrompidos em uma execução anterior são refeitos
+    done = {row['trial'] for row in store.trials(sweep) if row['state'] != 'running'}
+    todo = [trial for trial in range(config['trials']) if trial not in done]
+
+    if hasattr(os, 'sched_getaffinity'):
+        cores = sorted(os.sched_getaffinity(0))
+    else:
+        cores = list(range(os.cpu_count() or 1))
+    workers = max(1, min(workers, len(todo) or 1))
+    free_cores = cores[:workers] if len(cores) >= workers else [None] * workers
+
+    print(f"[Sweep] Busca '{sweep}': {len(todo)} de {config['trials']} trials a rodar | "
+          f"{workers} processos | núcleos: {', '.join(str(core) for core in free_cores if core is not None) or 'livres'}")
+    print(f"[Sweep] Resultados: {db_path}\n")
+
+    ctx = multiprocessing.get_context('spawn')
+    running = {}
+    try:
+        while todo or running:
+            while todo and free_cores:
+                trial = todo.pop(0)
+                core = free_cores.pop(0)
+                params = sample_params(config['space'], random.Random(f"{config.get('seed', 0)}:{trial}"))
+                store.create_trial(sweep, trial, params, core)
+                process = ctx.Process(
+                    target=run_trial,
+                    args=(db_path, sweep, trial, params, config, core,
+                          os.path.join(output_dir, sweep, f"trial_{trial:03d}")),
+                    daemon=False
+                )
+                process.start()
+                running[process.sentinel] = (process, trial, core)
+                print(f"[Sweep] Trial {trial} iniciado (núcleo {core}): {json.dumps(params)}")
+
+            for sentinel in wait(list(running)):
+                process, trial, core = running.pop(sentinel)
+                process.join()
+                free_cores.append(core)
+
+                row = next(row for row in store.trials(sweep) if row['trial'] == trial)
+                if process.exitcode != 0 and row['state'] == 'running':
+                    store.finish(sweep, trial, 'failed', error=f"exit code {process.exitcode}")
+                    row['state'] = 'failed'
+                value = f"{row['value']:.3f}" if row['value'] is not None else "-"
+                print(f"[Sweep] Trial {trial} {row['state']}: valor {value} "
+                      f"({row['episodes'] or 0:,} episódios)")
+    finally:
+        for process, trial, _ in running.values():
+            process.terminate()
+            process.join()
+            store.finish(sweep, trial, 'failed', error='interrompido')
+
+    trials = store.trials(sweep)
+    store.close()
+    return trials
+
+
+def print_summary(trials, top=10):
+    """Tabela dos melhores trials (pelo melhor valor) e contagem por estado."""
+    states = {}
+    for row in trials:
+        states[row['state']] = states.get(row['state'], 0) + 1
+    print("\n[Sweep] Trials: " + ", ".join(f"{state}: {count}" for state, count in sorted(states.items())))
+
+    ranked = sorted((row for row in trials if row['best'] is not None), key=lambda row: -row['best'])
+    print(f"\n{'trial':>5} {'estado':>9} {'melhor':>7} {'final':>7} {'episódios':>10}  parâmetros")
+    for row in ranked[:top]:
+        params = json.loads(row['params'])
+        text = ", ".join(f"{name}={value:.4g}" if isinstance(value, float) else f"{name}={value}"
+                         for name, value in params.items())
+        print(f"{row['trial']:>5} {row['state']:>9} {row['best']:7.3f} {row['value']:7.3f} "
+              f"{row['episodes']:>10,}  {text}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Busca de hiperparâmetros do DQN')
+    parser.add_argument('--config', type=str, default='data/sweep_space.json', help='Espaço de busca (JSON)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Trials em paralelo')
+    parser.add_argument('--db', type=str, default='data/sweeps.db', help='Arquivo SQLite dos resultados')
+    parser.add_argument('--output-dir', type=str, default='data/sweeps', help='Diretório dos trials')
+    parser.add_argument('--summary', action='store_true', help='Só mostra os resultados já gravados')
+    parser.add_argument('--top', type=int, default=10, help='Trials listados no resumo')
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    config.setdefault('name', os.path.splitext(os.path.basename(args.config))[0])
+
+    if args.summary:
+        store = SweepStore(args.db)
+        trials = store.trials(config['name'])
+        store.close()
+    else:
+        trials = run_sweep(config, args.db, args.workers, args.output_dir)
+    print_summary(trials, args.top)
+
+
+if __name__ == "__main__":
+    main()
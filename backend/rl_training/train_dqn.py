@@ -24,8 +24,10 @@ import os
 import argparse
 import time
 from datetime import datetime
+import queue
 import numpy as np
 import torch
+import torch.multiprocessing as mp
 
 # Adiciona o caminho do backend ao sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -34,13 +36,26 @@ from app.utils import STATS, evaluate
 from bots.rl_bot import RLBot
 from bots.weighted_bot import WeightedBot
 from bots.mcts_bot import MCTSBot
+from rl_training.vec_env import VecTrainingEnv
+from rl_training.actors import SharedWeights, run_actor
+from rl_training.evaluation import PolicyEvaluator, play_game, load_facil_weights, MEDIO_ENDGAME_CARDS
+from rl_training.checkpoint import AsyncWriter, CheckpointManager, atomic_save
+from rl_training.history import HistoryWriter
+from rl_training.profiling import PhaseTimer, ProfileWindow
+
+# Recompensas por oponente: rodada (vitória/derrota/empate) e bônus final
+REWARDS = {
+    'Facil_Bot': {'win': 3.0, 'loss': -2.0, 'draw': -0.5, 'final_win': 10.0, 'final_loss': -5.0},
+    'Medio_Bot': {'win': 5.0, 'loss': -3.0, 'draw': -0.5, 'final_win': 15.0, 'final_loss': -8.0},
+}
 
 
 class TrainingLogger:
     """Sistema de logs estruturado para o treinamento."""
     
-    def __init__(self, log_dir="../logs"):
+    def __init__(self, log_dir="../logs", echo=True):
         self.log_dir = log_dir
+        self.echo = echo  # False: só grava no arquivo (trials da busca de hiperparâmetros)
         os.makedirs(log_dir, exist_ok=True)
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -56,7 +71,8 @@ class TrainingLogger:
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         log_message = f"[{timestamp}] {message}"
         
-        print(log_message)
+        if self.echo:
+            print(log_message)
         
         with open(self.log_file, 'a', encoding='utf-8') as f:
             f.write(log_message + '\n')
@@ -92,91 +108,132 @@ class GameSimulator:
             1 se bot1 vence, -1 se bot2 vence, 0 em caso de empate
         """
         deck1, deck2 = self.split_deck()
-        bot1.deck = copy.deepcopy(deck1)
-        bot2.deck = copy.deepcopy(deck2)
-        
-        bot1_wins = 0
-        bot2_wins = 0
-        rounds_played = 0
-        current_player = random.choice([1, 2])
-        
-        while bot1.deck and bot2.deck and rounds_played < 50:
-            rounds_played += 1
-            
-            if current_player == 1:
-                card1, stat = bot1.choose_move(bot1.deck, STATS)
-                card2 = bot2.choose_card(bot2.deck, stat)
-            else:
-                card2, stat = bot2.choose_move(bot2.deck, STATS)
-                card1 = bot1.choose_card(bot1.deck, stat)
-            
-            if card1 is None or card2 is None:
-                break
-            
-            result = evaluate(card1, card2, stat)
-            
-            if result == 1:
-                bot1_wins += 1
-                current_player = 1
-            elif result == -1:
-                bot2_wins += 1
-                current_player = 2
-            
-            bot1.deck = [c for c in bot1.deck if c['id'] != card1['id']]
-            bot2.deck = [c for c in bot2.deck if c['id'] != card2['id']]
-        
-        if bot1_wins > bot2_wins:
-            return 1
-        elif bot2_wins > bot1_wins:
-            return -1
-        else:
-            return 0
+        return play_game(bot1, bot2, deck1, deck2, random.choice([1, 2]))
 
 
 class DQNTrainer:
     """Treinador principal para o DQN Bot."""
     
-    def __init__(self, cards, model_path=None, logger=None):
+    def __init__(self, cards, model_path=None, logger=None, prioritized=False,
+                 per_alpha=0.6, per_beta=0.4, per_anneal_steps=100000, replay_size=20000,
+                 compact_replay=False, replay_dir=None, vec_envs=0, update_every=4,
+                 eval_workers=1, eval_seed=0, checkpoint_dir="data/checkpoints", keep_checkpoints=3,
+                 eval_games=100, eval_precision=None, eval_mirrored=False, lr=0.0005, gamma=0.99,
+                 batch_size=64, tau=1e-3, double_dqn=False, dueling=False, n_step=1, huber=False,
+                 rewards=None, output_dir="data", eval_callback=None, facil_weights=None):
+        """
+        Args:
+            lr, gamma, batch_size, tau: Hiperparâmetros do RLBot (taxa de
+                aprendizado, desconto, batch e soft update da target)
+            double_dqn, dueling, n_step, huber: Variantes do DQN (ver RLBot)
+            rewards: Substitui entradas de REWARDS (ex: {'Medio_Bot': {'final_win': 20.0}})
+            output_dir: Diretório do modelo e do histórico
+            eval_callback: Chamado após cada avaliação com (episódio, resultados);
+                retorno verdadeiro interrompe o treinamento (poda da busca)
+            facil_weights: Pesos do Facil_Bot no treinamento e na avaliação
+                (load_stat_weights; None usa os padrões)
+        """
         self.cards = cards
+        self.rewards = {name: {**table, **(rewards or {}).get(name, {})} for name, table in REWARDS.items()}
+        self.output_dir = output_dir
+        self.eval_callback = eval_callback
+        self.facil_weights = facil_weights
+        self.stop_requested = False
         self.logger = logger or TrainingLogger()
         self.simulator = GameSimulator(cards)
         
+        # Avaliação com snapshots da política (pesos apenas) em um pool de processos
+        self.evaluator = PolicyEvaluator(cards, workers=eval_workers, facil_weights=facil_weights)
+        self.eval_seed = eval_seed
+        self.eval_games = eval_games
+        self.eval_precision = eval_precision  # None = número fixo de jogos
+        self.eval_mirrored = eval_mirrored  # pares de partidas com as mãos trocadas
+        
+        # Checkpoints completos (retomáveis) gravados em uma thread de fundo
+        self.writer = AsyncWriter()
+        self.checkpoints = CheckpointManager(checkpoint_dir, prefix="dqn", keep=keep_checkpoints,
+                                             writer=self.writer)
+        
         # Inicializa o DQN Bot
         self.dqn_bot = RLBot(
             deck=[],
             stats_list=STATS,
             qfile=model_path,
             epsilon=1.0,      # Começa com exploração máxima
-            alpha=0.0005,     # Taxa de aprendizado
-            gamma=0.99        # Fator de desconto
+            alpha=lr,         # Taxa de aprendizado
+            gamma=gamma,      # Fator de desconto
+            prioritized=prioritized,
+            per_alpha=per_alpha,
+            per_beta=per_beta,
+            per_anneal_steps=per_anneal_steps,
+            replay_capacity=replay_size,
+            compact_replay=compact_replay,
+            replay_dir=replay_dir,
+            batch_size=batch_size,
+            tau=tau,
+            double_dqn=double_dqn,
+            dueling=dueling,
+            n_step=n_step,
+            huber=huber
         )
+        self.dqn_bot.index_cards(cards)
+        self.dqn_bot.update_every = update_every
+        
+        # Cronômetros por fase (relatados a cada avaliação)
+        self.timer = PhaseTimer()
+        self.timer.instrument(self.dqn_bot, 'learn', counter='updates')
+        self.timer.instrument(self.dqn_bot, '_q_values', 'rede (forward)')
+        self.timer.instrument(self.dqn_bot, '_move_states', 'estado')
+        self.timer.instrument(self.dqn_bot, '_fill_state', 'estado')
+        self.profile_window = None
+        
+        # Ambiente vetorizado (episódios em lote) ou episódios um a um
+        self.vec_env = VecTrainingEnv(self.dqn_bot, cards, self.rewards, n_envs=vec_envs,
+                                      facil_weights=facil_weights) if vec_envs > 0 else None
         
         self.logger.log(f"DQN Bot inicializado")
         self.logger.log(f"  Device: {self.dqn_bot.device}")
         self.logger.log(f"  Epsilon inicial: {self.dqn_bot.epsilon}")
         self.logger.log(f"  Alpha (learning rate): {self.dqn_bot.alpha}")
         self.logger.log(f"  Gamma (discount): {self.dqn_bot.gamma}")
-        
-        # Histórico de treinamento
-        self.training_history = {
-            'episodes': [],
-            'avg_rewards': [],
-            'epsilon_values': [],
-            'win_rates': {
-                'Facil_Bot': [],
-                'Medio_Bot': []
-            }
-        }
+        self.logger.log(f"  Batch: {batch_size} | Tau (soft update): {tau}")
+        self.logger.log(f"  Double DQN: {'sim' if double_dqn else 'não'} | "
+                        f"Dueling: {'sim' if self.dqn_bot.dueling else 'não'} | "
+                        f"N-step: {n_step} | Loss: {'Huber' if huber else 'MSE'}")
+        self.logger.log(f"  Update a cada: {update_every} transições")
+        self.logger.log(f"  Facil_Bot: pesos {'ajustados' if facil_weights else 'padrão'} do WeightedBot")
+        self.logger.log(f"  Medio_Bot: solucionador de finais (bots/endgame.py) em mãos de até "
+                        f"{MEDIO_ENDGAME_CARDS} cartas, busca MCTS nas maiores")
+        self.logger.log(f"  Replay: {self.dqn_bot.memory.capacity:,} transições"
+                        f"{' (compacto, por ids de carta)' if self.dqn_bot.compact_replay else ''}")
+        if replay_dir:
+            self.logger.log(f"  Replay em disco: {replay_dir} ({len(self.dqn_bot.memory):,} transições reabertas)")
+        if prioritized:
+            self.logger.log(f"  Replay prioritizado: alpha={per_alpha} | beta={per_beta} -> 1.0 "
+                            f"em {per_anneal_steps:,} amostragens")
+        if self.vec_env is not None:
+            self.logger.log(f"  Ambiente vetorizado: {vec_envs} jogos simultâneos")
+        
+        # Histórico de treinamento (NDJSON só de acréscimo, aberto em train() ou resume())
+        self.history_path = os.path.join(output_dir, "dqn_training_history.ndjson")
+        self.history = None
         
         self.total_episodes = 0
         self.best_win_rate_medio = 0.0
+        
+        # Posição no cronograma do treinamento (alterada ao retomar)
+        self.start_episode = 0
+        self.recent_rewards = []
+        # Episódio do último checkpoint gravado (evita repetir o salvamento final)
+        self.last_saved_episode = None
     
     def get_opponent_bot(self, opponent_name):
         """Retorna uma instância do bot oponente."""
         if opponent_name == "Facil_Bot":
-            return WeightedBot(deck=[])
+            return WeightedBot(deck=[], stat_weights=self.facil_weights)
         elif opponent_name == "Medio_Bot":
-            return MCTSBot(deck=[], simulations=50)
+            # Com as mãos de 5 cartas do treinamento decide pelo solucionador de finais
+            return MCTSBot(deck=[], simulations=50, endgame_cards=MEDIO_ENDGAME_CARDS)
         else:
             raise ValueError(f"Oponente desconhecido: {opponent_name}")
     
@@ -187,13 +244,16 @@ class DQNTrainer:
         Returns:
             episode_reward: Recompensa total do episódio
         """
-        opponent_bot = self.get_opponent_bot(opponent_name)
+        phase = self.timer.phase
+        with phase('decisao_oponente'):
+            opponent_bot = self.get_opponent_bot(opponent_name)
         
         # Divide o deck
         rl_deck, opp_deck = self.simulator.split_deck()
         self.dqn_bot.deck = copy.deepcopy(rl_deck)
         opponent_bot.deck = copy.deepcopy(opp_deck)
         
+        rewards = self.rewards[opponent_name]
         episode_reward = 0
         rounds_played = 0
         current_player = random.choice(['rl', 'opp'])
@@ -206,32 +266,37 @@ class DQNTrainer:
             
             # Estado atual
             if current_player == 'rl':
-                rl_card, stat = self.dqn_bot.choose_move(self.dqn_bot.deck, STATS)
-                opp_card = opponent_bot.choose_card(opponent_bot.deck, stat)
+                with phase('decisao_rl'):
+                    rl_card, stat = self.dqn_bot.choose_move(opponent_bot.deck, STATS)
+                with phase('decisao_oponente'):
+                    opp_card = opponent_bot.choose_card(self.dqn_bot.deck, stat)
             else:
-                opp_card, stat = opponent_bot.choose_move(opponent_bot.deck, STATS)
-                rl_card = self.dqn_bot.choose_card(self.dqn_bot.deck, stat)
+                with phase('decisao_oponente'):
+                    opp_card, stat = opponent_bot.choose_move(self.dqn_bot.deck, STATS)
+                with phase('decisao_rl'):
+                    rl_card = self.dqn_bot.choose_card(opponent_bot.deck, stat)
             
             if rl_card is None or opp_card is None:
                 break
             
             # Avalia o resultado
-            result = evaluate(rl_card, opp_card, stat)
+            with phase('regras'):
+                result = evaluate(rl_card, opp_card, stat)
             
             # Sistema de recompensas
             if result == 1:
-                reward = 3.0 if opponent_name == "Facil_Bot" else 5.0
+                reward = rewards['win']
                 current_player = 'rl'
             elif result == -1:
-                reward = -2.0 if opponent_name == "Facil_Bot" else -3.0
+                reward = rewards['loss']
                 current_player = 'opp'
             else:
-                reward = -0.5
+                reward = rewards['draw']
             
             episode_reward += reward
             
-            # Salva estado antes da ação
-            old_state = self.dqn_bot.get_state_vector(self.dqn_bot.deck, stat)
+            # Mão antes da ação
+            old_deck = self.dqn_bot.deck
             action_index = next(i for i, c in enumerate(self.dqn_bot.deck) if c['id'] == rl_card['id'])
             
             # Remove cartas jogadas
@@ -239,69 +304,139 @@ class DQNTrainer:
             opponent_bot.deck = [c for c in opponent_bot.deck if c['id'] != opp_card['id']]
             
             # Novo estado
-            new_state = self.dqn_bot.get_state_vector(self.dqn_bot.deck, stat)
             done = len(self.dqn_bot.deck) == 0 or len(opponent_bot.deck) == 0
             
-            # Armazena transição
-            transitions.append((old_state, action_index, reward, new_state, done))
+            # Armazena transição (mãos antes/depois; os estados são montados pelo bot)
+            transitions.append((old_deck, stat, action_index, reward, self.dqn_bot.deck, done))
         
         # Bônus/penalidade final
         if episode_reward > 0:
-            final_reward = 10.0 if opponent_name == "Facil_Bot" else 15.0
+            final_reward = rewards['final_win']
         elif episode_reward < 0:
-            final_reward = -5.0 if opponent_name == "Facil_Bot" else -8.0
+            final_reward = rewards['final_loss']
         else:
             final_reward = 0.0
         
         # Adiciona recompensa final à última transição
         if transitions:
             last_transition = list(transitions[-1])
-            last_transition[2] += final_reward
+            last_transition[3] += final_reward
             transitions[-1] = tuple(last_transition)
         
         # Atualiza a rede neural com as transições
-        for transition in transitions:
-            self.dqn_bot.step(*transition)
+        with phase('replay'):
+            for transition in transitions:
+                self.dqn_bot.remember(*transition)
+        self.timer.count('passos', len(transitions))
         
         return episode_reward
     
-    def evaluate_performance(self, num_games=100):
+    def evaluate_performance(self, num_games=None):
         """
-        Avalia o desempenho do DQN Bot contra todos os oponentes.
+        Avalia o desempenho do DQN Bot (sem exploração) contra todos os oponentes.
+        
+        Usa apenas os pesos atuais da rede; com a mesma semente todas as
+        avaliações jogam as mesmas partidas, então são comparáveis entre si.
+        Com eval_precision definido, para contra cada oponente assim que o
+        intervalo de confiança da taxa de vitória fica estreito o bastante
+        (num_games passa a ser o máximo). Com eval_mirrored, cada distribuição
+        é jogada também com as mãos trocadas (num_games // 2 distribuições).
         
         Returns:
             dict: Taxa de vitória contra cada oponente
         """
-        results = {}
+        num_games = num_games or self.eval_games
+        snapshot = self.dqn_bot.policy_snapshot()
+        if self.eval_precision:
+            return self.evaluator.evaluate_sequential(snapshot, precision=self.eval_precision,
+                                                      max_games=num_games, seed=self.eval_seed,
+                                                      mirrored=self.eval_mirrored)
+        return self.evaluator.evaluate(snapshot, num_games=num_games, seed=self.eval_seed,
+                                       mirrored=self.eval_mirrored)
+    
+    def choose_opponent(self, episode, episodes):
+        """
+        Sorteia o oponente de um episódio pela distribuição progressiva.
         
-        # Cria uma cópia do bot com epsilon=0 (sem exploração)
-        eval_bot = copy.deepcopy(self.dqn_bot)
-        eval_bot.epsilon = 0.0
+        Fase inicial: mais contra Facil_Bot; fase final: mais contra Medio_Bot.
+        """
+        if episode < episodes * 0.3:
+            opponent_pool = ["Facil_Bot"] * 70 + ["Medio_Bot"] * 30
+        elif episode < episodes * 0.6:
+            opponent_pool = ["Facil_Bot"] * 50 + ["Medio_Bot"] * 50
+        else:
+            opponent_pool = ["Facil_Bot"] * 30 + ["Medio_Bot"] * 70
+        
+        return random.choice(opponent_pool)
+    
+    def log_evaluation(self, episode, episodes, recent_rewards):
+        """Registra as métricas atuais e avalia o desempenho contra os oponentes."""
+        avg_reward = np.mean(recent_rewards)
+        
+        self.logger.log(f"\n{'='*80}")
+        self.logger.log(f"Episódio {episode:,}/{episodes:,}")
+        self.logger.log(f"  Epsilon: {self.dqn_bot.epsilon:.4f}")
+        self.logger.log(f"  Recompensa média (últimos 100): {avg_reward:.2f}")
+        self.logger.log(f"  Tamanho do buffer: {len(self.dqn_bot.memory):,}")
+        
+        # Avalia desempenho
+        if self.eval_precision:
+            self.logger.log(f"\n  Avaliando desempenho (até ±{self.eval_precision*100:.1f}%, "
+                            f"máximo {self.eval_games} jogos por oponente)...")
+        else:
+            self.logger.log(f"\n  Avaliando desempenho ({self.eval_games} jogos por oponente)...")
+        with self.timer.phase('avaliacao'):
+            eval_results = self.evaluate_performance()
+        
+        record = {
+            'episode': self.total_episodes,
+            'time': time.time(),
+            'avg_reward': float(avg_reward),
+            'epsilon': self.dqn_bot.epsilon,
+        }
         
-        for opponent_name in ['Facil_Bot', 'Medio_Bot']:
-            wins = 0
-            draws = 0
+        for opp_name, metrics in eval_results.items():
+            win_rate = metrics['win_rate']
+            draw_rate = metrics['draw_rate']
             
-            opponent_bot = self.get_opponent_bot(opponent_name)
+            record[f'win_rate.{opp_name}'] = win_rate
+            record[f'draw_rate.{opp_name}'] = draw_rate
+            if 'score' in metrics:
+                record[f'score.{opp_name}'] = metrics['score']
             
-            for _ in range(num_games):
-                result = self.simulator.play_game(eval_bot, opponent_bot)
-                if result == 1:
-                    wins += 1
-                elif result == 0:
-                    draws += 1
+            # Marca novo recorde contra Medio_Bot
+            marker = ""
+            if opp_name == "Medio_Bot" and win_rate > self.best_win_rate_medio:
+                self.best_win_rate_medio = win_rate
+                marker = " 🔥 NOVO RECORDE!"
             
-            win_rate = wins / num_games
-            draw_rate = draws / num_games
+            interval = ""
+            if 'score' in metrics:
+                low, high = metrics['interval']
+                interval = (f" [pontuação {metrics['score']*100:.1f}% "
+                            f"({low*100:.1f}-{high*100:.1f}%), {metrics['games']} jogos espelhados]")
+            elif self.eval_precision:
+                low, high = metrics['interval']
+                interval = f" [{low*100:.1f}-{high*100:.1f}%, {metrics['games']} jogos]"
             
-            results[opponent_name] = {
-                'win_rate': win_rate,
-                'draw_rate': draw_rate
-            }
+            self.logger.log(f"    vs {opp_name:12s}: {win_rate*100:5.1f}% vitórias{interval} | "
+                            f"{draw_rate*100:5.1f}% empates{marker}")
+        
+        self.history.append(record)
+        
+        if self.eval_callback is not None and self.eval_callback(episode, eval_results):
+            self.stop_requested = True
+            self.logger.log(f"\n  Treinamento interrompido pelo callback de avaliação")
         
-        return results
+        # Vazão e tempo por fase desde o último relatório
+        self.logger.log("")
+        for line in self.timer.format():
+            self.logger.log(f"  {line}")
+        self.timer.reset()
+        
+        self.logger.log(f"{'='*80}\n")
     
-    def train(self, episodes=50000, eval_interval=1000, save_interval=5000):
+    def train(self, episodes=50000, eval_interval=1000, save_interval=5000, actors=0, profile=None):
         """
         Executa o treinamento completo do DQN Bot.
         
@@ -309,6 +444,8 @@ class DQNTrainer:
             episodes: Número total de episódios de treinamento
             eval_interval: Intervalo para avaliação de desempenho
             save_interval: Intervalo para salvamento de checkpoints
+            actors: Processos atores (0 = atuar e aprender no mesmo laço)
+            profile: Episódios capturados com cProfile a partir do início (opcional)
         """
         start_time = time.time()
         
@@ -316,102 +453,277 @@ class DQNTrainer:
         self.logger.log(f"  Total de episódios: {episodes:,}")
         self.logger.log(f"  Avaliação a cada: {eval_interval:,} episódios")
         self.logger.log(f"  Salvamento a cada: {save_interval:,} episódios")
+        if actors > 0:
+            self.logger.log(f"  Atores: {actors} processos")
+        if self.start_episode:
+            self.logger.log(f"  Retomando do episódio {self.start_episode:,}")
         self.logger.log("")
         
-        recent_rewards = []
+        if profile:
+            self.profile_window = ProfileWindow(self.start_episode, profile, output_dir=self.logger.log_dir)
+        if self.history is None:
+            self.history = HistoryWriter(self.history_path)
+        self.timer.reset()
+        
+        if actors > 0:
+            episode = self.train_distributed(episodes, eval_interval, save_interval, actors)
+        else:
+            episode = self.train_local(episodes, eval_interval, save_interval)
+        
+        if self.profile_window is not None:
+            self.profile_window.finish(self.logger.log)
+        
+        # Salvamento final (se o periódico ainda não cobriu este episódio)
+        final_episode = episode if self.stop_requested else episodes
+        if final_episode != self.last_saved_episode:
+            self.save_checkpoint(final_episode, episodes)
+        self.evaluator.close()
+        self.checkpoints.wait()
+        self.history.close()
+        
+        elapsed_time = time.time() - start_time
         
-        for episode in range(episodes):
-            self.total_episodes += 1
+        self.logger.log(f"\n{'='*80}")
+        self.logger.log("TREINAMENTO CONCLUÍDO")
+        self.logger.log(f"{'='*80}")
+        self.logger.log(f"Total de episódios: {self.total_episodes:,}")
+        self.logger.log(f"Tempo total: {elapsed_time/60:.1f} minutos")
+        self.logger.log(f"Melhor Win Rate vs Medio_Bot: {self.best_win_rate_medio*100:.1f}%")
+        self.logger.log(f"{'='*80}\n")
+    
+    def train_local(self, episodes, eval_interval, save_interval):
+        """Laço único: joga e aprende no mesmo processo. Retorna o episódio final."""
+        recent_rewards = self.recent_rewards
+        episode = self.start_episode
+        
+        while episode < episodes and not self.stop_requested:
+            if self.profile_window is not None:
+                self.profile_window.update(episode, self.logger.log)
             
             # Decay do epsilon (exploração -> explotação)
             # Decai de 1.0 para 0.05 ao longo do treinamento
             self.dqn_bot.epsilon = max(0.05, 1.0 - (episode / episodes) * 0.95)
             
-            # Distribuição progressiva de oponentes
-            # Fase inicial: mais contra Facil_Bot
-            # Fase final: mais contra Medio_Bot
-            if episode < episodes * 0.3:
-                opponent_pool = ["Facil_Bot"] * 70 + ["Medio_Bot"] * 30
-            elif episode < episodes * 0.6:
-                opponent_pool = ["Facil_Bot"] * 50 + ["Medio_Bot"] * 50
+            if self.vec_env is not None:
+                # Um lote de episódios simultâneos (mesmo epsilon para o lote todo)
+                count = min(self.vec_env.n_envs, episodes - episode)
+                opponents = [self.choose_opponent(episode + i, episodes) for i in range(count)]
+                with self.timer.phase('ambiente'):
+                    batch_rewards, _, _ = self.vec_env.run_episodes(opponents)
+                self.timer.count('passos', count * self.vec_env.hand_size)
+                recent_rewards.extend(batch_rewards.tolist())
             else:
-                opponent_pool = ["Facil_Bot"] * 30 + ["Medio_Bot"] * 70
-            
-            opponent = random.choice(opponent_pool)
+                count = 1
+                reward = self.train_episode(self.choose_opponent(episode, episodes))
+                recent_rewards.append(reward)
             
-            # Treina um episódio
-            reward = self.train_episode(opponent)
-            recent_rewards.append(reward)
+            self.total_episodes += count
+            self.timer.count('episodios', count)
+            previous, episode = episode, episode + count
             
             # Mantém apenas as últimas 100 recompensas
-            if len(recent_rewards) > 100:
-                recent_rewards.pop(0)
+            del recent_rewards[:-100]
             
             # Avaliação periódica
-            if (episode + 1) % eval_interval == 0:
-                avg_reward = np.mean(recent_rewards)
-                
-                self.logger.log(f"\n{'='*80}")
-                self.logger.log(f"Episódio {episode + 1:,}/{episodes:,}")
-                self.logger.log(f"  Epsilon: {self.dqn_bot.epsilon:.4f}")
-                self.logger.log(f"  Recompensa média (últimos 100): {avg_reward:.2f}")
-                self.logger.log(f"  Tamanho do buffer: {len(self.dqn_bot.memory):,}")
+            if episode // eval_interval > previous // eval_interval:
+                self.log_evaluation(episode, episodes, recent_rewards)
+            
+            # Salvamento periódico
+            if episode // save_interval > previous // save_interval:
+                self.save_checkpoint(episode, episodes)
+        
+        return episode
+    
+    def train_distributed(self, episodes, eval_interval, save_interval, actors,
+                          envs_per_actor=64, sync_every=50):
+        """
+        Actor/learner: processos atores jogam lotes de episódios no ambiente
+        vetorizado com os pesos publicados periodicamente; este processo
+        (learner) guarda as transições no replay e treina continuamente.
+        
+        Args:
+            actors: Número de processos atores
+            envs_per_actor: Jogos simultâneos por lote de cada ator
+                (usa o tamanho do ambiente vetorizado do treinador, se houver)
+            sync_every: Updates da rede entre publicações dos pesos
+        
+        Returns:
+            Episódio final
+        """
+        if self.vec_env is not None:
+            envs_per_actor = self.vec_env.n_envs
+        
+        ctx = mp.get_context('spawn')
+        weights = SharedWeights(ctx, self.dqn_bot.qnetwork_local)
+        jobs = ctx.Queue()
+        results = ctx.Queue(maxsize=actors * 4)
+        seed = random.randrange(2**31)
+        
+        workers = [
+            ctx.Process(
+                target=run_actor,
+                args=(i, self.cards, self.rewards, weights, jobs, results, envs_per_actor, 5, seed + i,
+                      None, self.facil_weights),
+                daemon=True
+            )
+            for i in range(actors)
+        ]
+        for worker in workers:
+            worker.start()
+        
+        recent_rewards = self.recent_rewards
+        issued = episode = self.start_episode
+        updates = stored = 0
+        
+        try:
+            while episode < episodes and not self.stop_requested:
+                # Mantém até dois lotes por ator na fila de ordens
+                while issued < episodes and issued - episode < 2 * actors * envs_per_actor:
+                    count = min(envs_per_actor, episodes - issued)
+                    epsilon = max(0.05, 1.0 - (issued / episodes) * 0.95)
+                    opponents = [self.choose_opponent(issued + i, episodes) for i in range(count)]
+                    jobs.put((opponents, epsilon, [], []))
+                    issued += count
                 
-                # Avalia desempenho
-                self.logger.log(f"\n  Avaliando desempenho (100 jogos por oponente)...")
-                eval_results = self.evaluate_performance(num_games=100)
+                # Recebe um lote pronto quando os updates estão em dia com as
+                # transições recebidas (uma a cada update_every, como no laço
+                # local); espera se ainda não há o que treinar. Os atores
+                # bloqueiam na fila cheia se o learner ficar para trás.
+                can_learn = len(self.dqn_bot.memory) >= self.dqn_bot.batch_size
+                batch = None
+                if not can_learn or updates >= stored // self.dqn_bot.update_every:
+                    try:
+                        with self.timer.phase('fila'):
+                            batch = results.get(timeout=60) if not can_learn else results.get_nowait()
+                    except queue.Empty:
+                        if not can_learn:
+                            raise RuntimeError("Nenhum ator enviou episódios em 60s")
                 
-                for opp_name, metrics in eval_results.items():
-                    win_rate = metrics['win_rate']
-                    draw_rate = metrics['draw_rate']
-                    
-                    self.training_history['win_rates'][opp_name].append(win_rate)
+                if batch is not None:
+                    actor_id, transitions, batch_rewards, _ = batch
+                    with self.timer.phase('replay'):
+                        self.dqn_bot.store_batch(*transitions)
+                    stored += len(transitions[2])
+                    self.timer.count('episodios', len(batch_rewards))
+                    self.timer.count('passos', len(transitions[2]))
+                    self.dqn_bot.epsilon = max(0.05, 1.0 - (episode / episodes) * 0.95)
+                    recent_rewards.extend(batch_rewards.tolist())
+                    del recent_rewards[:-100]
                     
-                    # Marca novo recorde contra Medio_Bot
-                    marker = ""
-                    if opp_name == "Medio_Bot" and win_rate > self.best_win_rate_medio:
-                        self.best_win_rate_medio = win_rate
-                        marker = " 🔥 NOVO RECORDE!"
+                    previous = episode
+                    episode += len(batch_rewards)
+                    self.total_episodes += len(batch_rewards)
+                    if self.profile_window is not None:
+                        self.profile_window.update(episode, self.logger.log)
                     
-                    self.logger.log(f"    vs {opp_name:12s}: {win_rate*100:5.1f}% vitórias | {draw_rate*100:5.1f}% empates{marker}")
-                
-                self.training_history['episodes'].append(self.total_episodes)
-                self.training_history['avg_rewards'].append(avg_reward)
-                self.training_history['epsilon_values'].append(self.dqn_bot.epsilon)
+                    if episode // eval_interval > previous // eval_interval:
+                        self.log_evaluation(episode, episodes, recent_rewards)
+                    if episode // save_interval > previous // save_interval:
+                        self.save_checkpoint(episode, episodes)
                 
-                self.logger.log(f"{'='*80}\n")
-            
-            # Salvamento periódico
-            if (episode + 1) % save_interval == 0:
-                self.save_checkpoint()
+                # Treina continuamente e publica os pesos para os atores
+                if len(self.dqn_bot.memory) >= self.dqn_bot.batch_size:
+                    self.dqn_bot.learn()
+                    updates += 1
+                    if updates % sync_every == 0:
+                        weights.publish(self.dqn_bot.qnetwork_local)
+        finally:
+            for _ in workers:
+                jobs.put(None)
+            for worker in workers:
+                worker.join(timeout=10)
+                if worker.is_alive():
+                    worker.terminate()
+        
+        self.logger.log(f"  Updates da rede no learner: {updates:,}")
+        return episode
+    
+    def training_state(self, episode, episodes):
+        """
+        Estado completo do treinamento (copiado), para checkpoints retomáveis.
         
-        # Salvamento final
-        self.save_checkpoint()
+        Args:
+            episode: Episódios concluídos no cronograma atual
+            episodes: Total de episódios do cronograma
+        """
+        return {
+            'version': 2,
+            'bot': self.dqn_bot.training_state(),
+            'episode': episode,
+            'episodes': episodes,
+            'total_episodes': self.total_episodes,
+            'best_win_rate_medio': self.best_win_rate_medio,
+            # Tamanho do histórico NDJSON neste ponto (o arquivo é cortado aqui ao retomar)
+            'history_offset': self.history.sync() if self.history is not None else None,
+            'recent_rewards': list(self.recent_rewards),
+            'rng': {
+                'random': random.getstate(),
+                'numpy': np.random.get_state(),
+                'torch': torch.get_rng_state(),
+                'vec_env': self.vec_env.rng.bit_generator.state if self.vec_env is not None else None,
+            },
+        }
+    
+    def resume(self, path="latest"):
+        """
+        Retoma o treinamento de um checkpoint completo.
         
-        elapsed_time = time.time() - start_time
+        Args:
+            path: Caminho do checkpoint ou 'latest' (mais recente do diretório)
         
-        self.logger.log(f"\n{'='*80}")
-        self.logger.log("TREINAMENTO CONCLUÍDO")
-        self.logger.log(f"{'='*80}")
-        self.logger.log(f"Total de episódios: {self.total_episodes:,}")
-        self.logger.log(f"Tempo total: {elapsed_time/60:.1f} minutos")
-        self.logger.log(f"Melhor Win Rate vs Medio_Bot: {self.best_win_rate_medio*100:.1f}%")
-        self.logger.log(f"{'='*80}\n")
+        Returns:
+            Total de episódios do cronograma salvo
+        """
+        path, state = self.checkpoints.load(path)
+        
+        self.dqn_bot.load_training_state(state['bot'])
+        self.total_episodes = state['total_episodes']
+        self.best_win_rate_medio = state['best_win_rate_medio']
+        # Checkpoints da versão 1 guardavam o histórico inteiro: só continua o arquivo
+        self.history = HistoryWriter(self.history_path, resume_offset=state.get('history_offset'), append=True)
+        self.recent_rewards = state['recent_rewards']
+        self.start_episode = state['episode']
+        
+        rng = state['rng']
+        random.setstate(rng['random'])
+        np.random.set_state(rng['numpy'])
+        torch.set_rng_state(rng['torch'])
+        if self.vec_env is not None and rng['vec_env'] is not None:
+            self.vec_env.rng.bit_generator.state = rng['vec_env']
+        
+        self.logger.log(f"Checkpoint carregado: {path}")
+        self.logger.log(f"  Episódio {state['episode']:,}/{state['episodes']:,} | "
+                        f"Epsilon: {self.dqn_bot.epsilon:.4f} | Replay: {len(self.dqn_bot.memory):,} transições")
+        return state['episodes']
     
-    def save_checkpoint(self):
-        """Salva checkpoint do modelo e histórico de treinamento."""
-        # Salva pesos da rede neural
-        model_path = "data/dqn_model.pth"
-        self.dqn_bot.save_q(model_path)
+    def save_checkpoint(self, episode, episodes):
+        """
+        Salva modelo e checkpoint completo.
         
-        # Salva histórico de treinamento
-        history_path = "data/dqn_training_history.json"
-        with open(history_path, 'w', encoding='utf-8') as f:
-            json.dump(self.training_history, f, indent=2)
+        O estado é copiado aqui e gravado (atomicamente) pela thread de fundo,
+        então o treinamento continua sem esperar o disco. O histórico já é
+        gravado linha a linha a cada avaliação; o checkpoint só guarda o
+        tamanho atual do arquivo.
+        """
+        with self.timer.phase('checkpoint'):
+            checkpoint_path = self._save_checkpoint(episode, episodes)
+        self.last_saved_episode = episode
         
         self.logger.log(f"  ✓ Checkpoint salvo:")
-        self.logger.log(f"    - Modelo: {model_path}")
-        self.logger.log(f"    - Histórico: {history_path}")
+        self.logger.log(f"    - Modelo: {os.path.join(self.output_dir, 'dqn_model.pth')}")
+        self.logger.log(f"    - Histórico: {self.history_path}")
+        self.logger.log(f"    - Completo: {checkpoint_path}")
+    
+    def _save_checkpoint(self, episode, episodes):
+        # Grava o replay em disco (se persistente)
+        self.dqn_bot.memory.flush()
+        
+        # Pesos da rede usados pelo jogo
+        model_path = os.path.join(self.output_dir, "dqn_model.pth")
+        self.writer.submit(atomic_save, self.dqn_bot.policy_snapshot(), model_path)
+        
+        # Checkpoint completo (retomável)
+        return self.checkpoints.save(self.training_state(episode, episodes), episode)
 
 
 def load_cards(filepath):
@@ -436,6 +748,51 @@ def main():
     parser.add_argument('--eval-interval', type=int, default=1000, help='Intervalo de avaliação')
     parser.add_argument('--save-interval', type=int, default=5000, help='Intervalo de salvamento')
     parser.add_argument('--model', type=str, default=None, help='Caminho para modelo pré-treinado')
+    parser.add_argument('--prioritized', action='store_true', help='Usa prioritized experience replay')
+    parser.add_argument('--per-alpha', type=float, default=0.6, help='Expoente das prioridades (PER)')
+    parser.add_argument('--per-beta', type=float, default=0.4, help='Beta inicial do importance sampling (PER)')
+    parser.add_argument('--per-anneal-steps', type=int, default=100000,
+                        help='Amostragens até beta chegar a 1.0 (PER)')
+    parser.add_argument('--replay-size', type=int, default=20000, help='Capacidade do replay buffer')
+    parser.add_argument('--compact-replay', action='store_true',
+                        help='Guarda o replay por ids de carta (~13x menos memória)')
+    parser.add_argument('--replay-dir', type=str, default=None,
+                        help='Diretório do replay em disco (memmap, reaberto entre execuções)')
+    parser.add_argument('--vec-envs', type=int, default=0,
+                        help='Jogos simultâneos no ambiente vetorizado (0 = um episódio por vez)')
+    parser.add_argument('--actors', type=int, default=0,
+                        help='Processos atores (actor/learner); 0 = atua e aprende no mesmo processo')
+    parser.add_argument('--eval-workers', type=int, default=os.cpu_count() or 1,
+                        help='Processos da avaliação periódica')
+    parser.add_argument('--eval-seed', type=int, default=0, help='Semente das partidas de avaliação')
+    parser.add_argument('--eval-games', type=int, default=100,
+                        help='Jogos por oponente na avaliação (máximo, com --eval-precision)')
+    parser.add_argument('--eval-precision', type=float, default=None,
+                        help='Para a avaliação quando a taxa de vitória tiver esta precisão (ex: 0.05 = ±5%%)')
+    parser.add_argument('--eval-mirrored', action='store_true',
+                        help='Avalia em pares espelhados (cada distribuição também com as mãos trocadas)')
+    parser.add_argument('--resume', type=str, nargs='?', const='latest', default=None,
+                        help='Retoma de um checkpoint completo (sem caminho: o mais recente)')
+    parser.add_argument('--checkpoint-dir', type=str, default='data/checkpoints',
+                        help='Diretório dos checkpoints completos')
+    parser.add_argument('--keep-checkpoints', type=int, default=3, help='Checkpoints completos mantidos')
+    parser.add_argument('--profile', type=int, nargs='?', const=500, default=None,
+                        help='Captura um cProfile dos primeiros N episódios (padrão: 500)')
+    parser.add_argument('--update-every', type=int, default=4,
+                        help='Transições entre updates da rede (maior = mais episódios/s)')
+    parser.add_argument('--lr', type=float, default=0.0005, help='Taxa de aprendizado')
+    parser.add_argument('--gamma', type=float, default=0.99, help='Fator de desconto')
+    parser.add_argument('--batch-size', type=int, default=64, help='Transições por update')
+    parser.add_argument('--tau', type=float, default=1e-3, help='Soft update da rede target')
+    parser.add_argument('--double-dqn', action='store_true',
+                        help='Double DQN: a rede local escolhe a próxima ação, a target avalia')
+    parser.add_argument('--dueling', action='store_true', help='Rede dueling (valor + vantagem)')
+    parser.add_argument('--n-step', type=int, default=1, help='Passos somados nos retornos do replay')
+    parser.add_argument('--huber', action='store_true', help='Loss de Huber em vez de MSE')
+    parser.add_argument('--rewards', type=json.loads, default=None,
+                        help='JSON que substitui recompensas (ex: \'{"Medio_Bot": {"final_win": 20}}\')')
+    parser.add_argument('--facil-weights', type=str, default=None,
+                        help='Pesos do Facil_Bot (python manage.py tune-weighted); padrão: pesos originais')
     
     args = parser.parse_args()
     
@@ -446,13 +803,51 @@ def main():
     
     # Inicializa o treinador
     logger = TrainingLogger()
-    trainer = DQNTrainer(cards, model_path=args.model, logger=logger)
+    trainer = DQNTrainer(
+        cards,
+        model_path=args.model,
+        logger=logger,
+        prioritized=args.prioritized,
+        per_alpha=args.per_alpha,
+        per_beta=args.per_beta,
+        per_anneal_steps=args.per_anneal_steps,
+        replay_size=args.replay_size,
+        compact_replay=args.compact_replay,
+        replay_dir=args.replay_dir,
+        vec_envs=args.vec_envs,
+        update_every=args.update_every,
+        eval_workers=args.eval_workers,
+        eval_seed=args.eval_seed,
+        eval_games=args.eval_games,
+        eval_precision=args.eval_precision,
+        eval_mirrored=args.eval_mirrored,
+        checkpoint_dir=args.checkpoint_dir,
+        keep_checkpoints=args.keep_checkpoints,
+        lr=args.lr,
+        gamma=args.gamma,
+        batch_size=args.batch_size,
+        tau=args.tau,
+        double_dqn=args.double_dqn,
+        dueling=args.dueling,
+        n_step=args.n_step,
+        huber=args.huber,
+        rewards=args.rewards,
+        facil_weights=load_facil_weights(args.facil_weights)
+    )
+    
+    episodes = args.episodes
+    if args.resume:
+        saved_episodes = trainer.resume(args.resume)
+        if saved_episodes != episodes:
+            logger.log(f"  Atenção: cronograma salvo tinha {saved_episodes:,} episódios; usando {episodes:,}")
     
     # Executa o treinamento
     trainer.train(
-        episodes=args.episodes,
+        episodes=episodes,
         eval_interval=args.eval_interval,
-        save_interval=args.save_interval
+        save_interval=args.save_interval,
+        actors=args.actors,
+        profile=args.profile
     )
 
 
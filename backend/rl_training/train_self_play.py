@@ -1,7 +1,13 @@
 #!/usr/bin/env python3
 """
 Script de treinamento self-play para o RLBot (DQN).
-O bot treina jogando contra uma cópia de si mesmo (target network).
+
+- train_self_play: o bot treina jogando contra uma cópia de si mesmo,
+  atualizada a cada TARGET_UPDATE_FREQ jogos (um episódio por vez).
+- LeagueTrainer (--league): liga com um pool de cópias congeladas do bot e
+  das âncoras Facil_Bot/Medio_Bot, matchmaking PFSP e ratings Elo
+  (rl_training/league.py); os jogos rodam no ambiente vetorizado, em
+  processos atores (--workers) ou no próprio processo.
 """
 
 import sys
@@ -10,13 +16,22 @@ import json
 import random
 import copy
 import argparse
+import queue
+from collections import deque
+import numpy as np
 import torch
+import torch.multiprocessing as mp
 
 # Adiciona o backend ao path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app.utils import STATS, evaluate
 from bots.rl_bot import RLBot, QNetwork
+from rl_training.checkpoint import CheckpointManager, atomic_save
+from rl_training.profiling import PhaseTimer, ProfileWindow
+from rl_training.actors import SharedWeights, run_actor
+from rl_training.league import League, ANCHORS
+from rl_training.vec_env import VecTrainingEnv, FrozenPolicy
 
 # --- Configurações de Treinamento ---
 INITIAL_EPSILON = 1.0 # Epsilon inicial para exploração
@@ -24,8 +39,16 @@ FINAL_EPSILON = 0.01 # Epsilon final para exploração
 EPSILON_DECAY = 0.9995 # Fator de decaimento do epsilon por rodada
 TARGET_UPDATE_FREQ = 100 # Atualiza a rede target a cada 100 jogos
 SAVE_INTERVAL = 500 # Salva o modelo a cada 500 jogos
+REPORT_INTERVAL = 500 # Relatório de vazão/tempo por fase a cada 500 jogos
 MAX_ROUNDS = 50 # Limite de rodadas por jogo
 
+# --- Liga ---
+# Recompensas por rodada iguais às do self-play simples (+1/-1), sem bônus final
+LEAGUE_REWARDS = {'win': 1.0, 'loss': -1.0, 'draw': 0.0, 'final_win': 0.0, 'final_loss': 0.0}
+SNAPSHOT_INTERVAL = 2000 # Congela uma cópia do agente na liga a cada 2000 jogos
+LEAGUE_REPORT_INTERVAL = 5000 # Relatório da liga a cada 5000 jogos
+LEAGUE_SAVE_INTERVAL = 20000 # Checkpoint da liga a cada 20000 jogos
+
 def load_cards():
     """Carrega e normaliza os dados das cartas."""
     try:
@@ -56,8 +79,8 @@ def play_round(bot1, bot2, cards, current_player, stats_list):
         card2 = bot2.choose_card(bot1.deck, stat)
         if card2 is None: return None, None, None, None, None
         
-        # Estado inicial do Bot 1
-        state1 = bot1.get_state_vector(bot1.deck, stat)
+        # Mão inicial do Bot 1
+        hand1 = bot1.deck
         # Ação do Bot 1 (índice da carta escolhida)
         action1 = bot1.deck.index(card1)
         
@@ -69,8 +92,8 @@ def play_round(bot1, bot2, cards, current_player, stats_list):
         card1 = bot1.choose_card(bot2.deck, stat)
         if card1 is None: return None, None, None, None, None
         
-        # Estado inicial do Bot 2
-        state2 = bot2.get_state_vector(bot2.deck, stat)
+        # Mão inicial do Bot 2
+        hand2 = bot2.deck
         # Ação do Bot 2 (índice da carta escolhida)
         action2 = bot2.deck.index(card2)
 
@@ -85,40 +108,101 @@ def play_round(bot1, bot2, cards, current_player, stats_list):
     bot1.deck = [c for c in bot1.deck if c['id'] != card1['id']]
     bot2.deck = [c for c in bot2.deck if c['id'] != card2['id']]
     
-    # 5. Estado final (próximo estado)
-    next_state1 = bot1.get_state_vector(bot1.deck, stat)
-    next_state2 = bot2.get_state_vector(bot2.deck, stat)
-    
-    # 6. Transições
+    # 5. Transições (mãos antes/depois; os estados são montados pelo bot)
     if current_player == 1:
-        transition = (state1, action1, reward1, next_state1, False)
+        transition = (hand1, stat, action1, reward1, bot1.deck, False)
         next_player = 1 if result == 1 else 2
     else:
-        transition = (state2, action2, reward2, next_state2, False)
+        transition = (hand2, stat, action2, reward2, bot2.deck, False)
         next_player = 2 if result == -1 else 1
         
     return transition, card1, card2, next_player, result
 
-def train_self_play(episodes, model_path):
+def training_state(local_bot, target_bot, episode, win_history):
+    """Estado completo do self-play (copiado), para checkpoints retomáveis."""
+    return {
+        'version': 1,
+        'bot': local_bot.training_state(),
+        'opponent': {
+            'qnetwork_local': copy.deepcopy(target_bot.qnetwork_local.state_dict()),
+            'qnetwork_target': copy.deepcopy(target_bot.qnetwork_target.state_dict()),
+        },
+        'episode': episode,
+        'win_history': list(win_history),
+        'rng': {
+            'random': random.getstate(),
+            'numpy': np.random.get_state(),
+            'torch': torch.get_rng_state(),
+        },
+    }
+
+def save_checkpoint(checkpoints, model_path, local_bot, target_bot, episode, win_history):
+    """Agenda a gravação (atômica, em segundo plano) do modelo e do checkpoint completo."""
+    local_bot.memory.flush()
+    checkpoints.writer.submit(atomic_save, local_bot.policy_snapshot(), model_path)
+    path = checkpoints.save(training_state(local_bot, target_bot, episode, win_history), episode)
+    print(f"   ✓ Checkpoint: {path}")
+
+def train_self_play(episodes, model_path, prioritized=False, per_alpha=0.6, per_beta=0.4,
+                    per_anneal_steps=100000, replay_size=20000, compact_replay=False, replay_dir=None,
+                    resume=None, checkpoint_dir='data/checkpoints', keep_checkpoints=3, profile=None):
     """Loop principal de treinamento self-play."""
     
     cards = load_cards()
     
     # Bot local (aprende)
-    local_bot = RLBot(deck=[], stats_list=STATS, qfile=model_path, epsilon=INITIAL_EPSILON)
+    local_bot = RLBot(deck=[], stats_list=STATS, qfile=model_path, epsilon=INITIAL_EPSILON,
+                      prioritized=prioritized, per_alpha=per_alpha, per_beta=per_beta,
+                      per_anneal_steps=per_anneal_steps, replay_capacity=replay_size,
+                      compact_replay=compact_replay, replay_dir=replay_dir)
+    local_bot.index_cards(cards)
     # Bot target (oponente estável)
     target_bot = RLBot(deck=[], stats_list=STATS, qfile=model_path, epsilon=0.0) # Epsilon 0 para explotação pura
     
-    # Copia pesos da rede local para a target
-    target_bot.qnetwork_target.load_state_dict(local_bot.qnetwork_local.state_dict())
+    # Copia pesos da rede local para o oponente (que joga com a própria rede local)
+    target_bot.qnetwork_local.load_state_dict(local_bot.qnetwork_local.state_dict())
+    
+    # Cronômetros por fase
+    timer = PhaseTimer()
+    timer.instrument(local_bot, 'learn', counter='updates')
+    timer.instrument(local_bot, '_q_values', 'rede (forward)')
+    timer.instrument(local_bot, '_move_states', 'estado')
+    timer.instrument(local_bot, '_fill_state', 'estado')
+    timer.instrument(target_bot, '_q_values', 'oponente')
+    timer.instrument(target_bot, '_move_states', 'oponente')
+    phase = timer.phase
+    
+    # Checkpoints completos (retomáveis)
+    checkpoints = CheckpointManager(checkpoint_dir, prefix='self_play', keep=keep_checkpoints)
+    start_episode = 0
+    win_history = []
+    # Episódio do último checkpoint gravado (ou do checkpoint retomado)
+    last_saved_episode = None
+    
+    if resume:
+        path, state = checkpoints.load(resume)
+        local_bot.load_training_state(state['bot'])
+        target_bot.qnetwork_local.load_state_dict(state['opponent']['qnetwork_local'])
+        target_bot.qnetwork_target.load_state_dict(state['opponent']['qnetwork_target'])
+        start_episode = last_saved_episode = state['episode']
+        win_history = state['win_history']
+        random.setstate(state['rng']['random'])
+        np.random.set_state(state['rng']['numpy'])
+        torch.set_rng_state(state['rng']['torch'])
+        print(f"♻️  Retomando de {path} (episódio {start_episode})")
     
     print(f"🚀 Iniciando treinamento self-play por {episodes} episódios...")
     print(f"   Modelo: {model_path}")
     print(f"   Epsilon inicial: {local_bot.epsilon:.4f}, Epsilon final: {FINAL_EPSILON:.4f}, Decay: {EPSILON_DECAY}")
+    if prioritized:
+        print(f"   Replay prioritizado: alpha={per_alpha}, beta={per_beta} -> 1.0 em {per_anneal_steps} amostragens")
     
-    win_history = []
+    profile_window = ProfileWindow(start_episode, profile, output_dir='../logs') if profile else None
     
-    for episode in range(1, episodes + 1):
+    for episode in range(start_episode + 1, episodes + 1):
+        if profile_window is not None:
+            profile_window.update(episode - 1)
+        
         # Reinicia o jogo
         shuffled = random.sample(cards, len(cards))
         deck1 = shuffled[:5]
@@ -135,19 +219,21 @@ def train_self_play(episodes, model_path):
             # O bot que escolhe o atributo é sempre o "local_bot" ou "target_bot"
             # O outro bot apenas escolhe a melhor carta para o atributo
             
-            if current_player == 1:
-                # Local Bot joga como Player 1 (escolhe atributo)
-                transition, card1, card2, next_player, result = play_round(local_bot, target_bot, cards, 1, STATS)
-            else:
-                # Target Bot joga como Player 2 (escolhe atributo)
-                transition, card1, card2, next_player, result = play_round(local_bot, target_bot, cards, 2, STATS)
+            with phase('jogo'):
+                if current_player == 1:
+                    # Local Bot joga como Player 1 (escolhe atributo)
+                    transition, card1, card2, next_player, result = play_round(local_bot, target_bot, cards, 1, STATS)
+                else:
+                    # Target Bot joga como Player 2 (escolhe atributo)
+                    transition, card1, card2, next_player, result = play_round(local_bot, target_bot, cards, 2, STATS)
             
             if transition is None:
                 break
             
             # Armazena transição no replay buffer do Local Bot
-            state, action, reward, next_state, done = transition
-            local_bot.step(state, action, reward, next_state, done)
+            with phase('replay'):
+                local_bot.remember(*transition)
+            timer.count('passos')
             
             # Aprende (se o buffer estiver cheio e for o momento)
             local_bot.learn()
@@ -174,6 +260,7 @@ def train_self_play(episodes, model_path):
             winner = 0 # Empate
             
         win_history.append(winner)
+        timer.count('episodios')
         
         # Epsilon decay
         if local_bot.epsilon > FINAL_EPSILON:
@@ -181,31 +268,361 @@ def train_self_play(episodes, model_path):
         
         # Atualiza Target Network
         if episode % TARGET_UPDATE_FREQ == 0:
-            target_bot.qnetwork_target.load_state_dict(local_bot.qnetwork_local.state_dict())
+            target_bot.qnetwork_local.load_state_dict(local_bot.qnetwork_local.state_dict())
             
         # Salva modelo
         if episode % SAVE_INTERVAL == 0:
-            local_bot.save_q(model_path)
+            with phase('checkpoint'):
+                save_checkpoint(checkpoints, model_path, local_bot, target_bot, episode, win_history)
+            last_saved_episode = episode
             
         # Log de progresso
         if episode % 100 == 0:
             win_rate_100 = win_history[-100:].count(1) / 100.0
             print(f"Episódio {episode}/{episodes} | Win Rate (últimos 100): {win_rate_100:.2f} | Epsilon: {local_bot.epsilon:.4f}")
+        
+        # Vazão e tempo por fase
+        if episode % REPORT_INTERVAL == 0:
+            for line in timer.format():
+                print(f"   {line}")
+            timer.reset()
+    
+    if profile_window is not None:
+        profile_window.finish()
             
-    # Salva o modelo final
-    local_bot.save_q(model_path)
+    # Salva o modelo final, se o salvamento periódico (ou o checkpoint retomado) não o cobriu
+    final_episode = max(episodes, start_episode)
+    if final_episode != last_saved_episode:
+        save_checkpoint(checkpoints, model_path, local_bot, target_bot, final_episode, win_history)
+    checkpoints.close()
     print("\n✅ Treinamento self-play concluído!")
     
     return win_history
 
+class LeagueTrainer:
+    """Self-play em liga: o agente treina contra cópias congeladas de si mesmo (PFSP + Elo)."""
+
+    def __init__(self, cards, model_path, pool_size=20, pfsp_power=2.0, snapshot_interval=SNAPSHOT_INTERVAL,
+                 envs=64, update_every=4, prioritized=False, per_alpha=0.6, per_beta=0.4,
+                 per_anneal_steps=100000, replay_size=20000, compact_replay=False, replay_dir=None,
+                 checkpoint_dir='data/checkpoints', keep_checkpoints=3, seed=None):
+        """
+        Args:
+            cards: Baralho completo
+            model_path: Caminho do modelo (carregado se existir, salvo no fim)
+            pool_size: Máximo de cópias congeladas na liga
+            pfsp_power: Expoente do PFSP (0 = oponentes uniformes)
+            snapshot_interval: Jogos entre cópias do agente para a liga
+            envs: Jogos simultâneos por lote (ambiente vetorizado)
+            update_every: Transições entre updates da rede
+            seed: Semente do matchmaking e dos jogos
+        """
+        self.cards = cards
+        self.model_path = model_path
+        self.snapshot_interval = snapshot_interval
+        self.envs = envs
+
+        self.bot = RLBot(deck=[], stats_list=STATS, qfile=model_path, epsilon=INITIAL_EPSILON,
+                         prioritized=prioritized, per_alpha=per_alpha, per_beta=per_beta,
+                         per_anneal_steps=per_anneal_steps, replay_capacity=replay_size,
+                         compact_replay=compact_replay, replay_dir=replay_dir)
+        self.bot.update_every = update_every
+        self.bot.index_cards(cards)
+
+        self.league = League(max_size=pool_size, pfsp_power=pfsp_power)
+        self.rng = np.random.default_rng(seed)
+        self.seed = seed
+        self.start_episode = 0
+        self.last_saved_episode = None
+        self.outcomes = deque(maxlen=1000)
+
+        self.checkpoints = CheckpointManager(checkpoint_dir, prefix='league', keep=keep_checkpoints)
+
+        self.timer = PhaseTimer()
+        self.timer.instrument(self.bot, 'learn', counter='updates')
+
+    def epsilon(self, episode, episodes):
+        """Epsilon linear de INITIAL_EPSILON a FINAL_EPSILON ao longo do cronograma."""
+        return max(FINAL_EPSILON, INITIAL_EPSILON - (INITIAL_EPSILON - FINAL_EPSILON) * episode / episodes)
+
+    def training_state(self, episode):
+        """Estado completo da liga (copiado), para checkpoints retomáveis."""
+        return {
+            'version': 1,
+            'bot': self.bot.training_state(),
+            'league': self.league.state_dict(),
+            'episode': episode,
+            'outcomes': list(self.outcomes),
+            'rng': {
+                'numpy': self.rng.bit_generator.state,
+                'torch': torch.get_rng_state(),
+            },
+        }
+
+    def resume(self, path='latest'):
+        """Restaura bot, liga e sorteios de um checkpoint completo."""
+        path, state = self.checkpoints.load(path)
+        self.bot.load_training_state(state['bot'])
+        self.league.load_state_dict(state['league'])
+        self.start_episode = state['episode']
+        self.outcomes.extend(state['outcomes'])
+        self.rng.bit_generator.state = state['rng']['numpy']
+        torch.set_rng_state(state['rng']['torch'])
+        print(f"♻️  Retomando a liga de {path} (episódio {self.start_episode})")
+
+    def save_checkpoint(self, episode):
+        """Agenda a gravação (atômica, em segundo plano) do modelo e do checkpoint completo."""
+        self.bot.memory.flush()
+        self.checkpoints.writer.submit(atomic_save, self.bot.policy_snapshot(), self.model_path)
+        path = self.checkpoints.save(self.training_state(episode), episode)
+        self.last_saved_episode = episode
+        print(f"   ✓ Checkpoint: {path}")
+
+    def frozen_policy(self, tables, snapshot):
+        """FrozenPolicy com os pesos de um membro da liga."""
+        network = QNetwork.from_state_dict(snapshot)
+        return FrozenPolicy(tables, self.bot, network)
+
+    def finish_batch(self, previous, episode, episodes, opponents, outcomes, save_interval):
+        """
+        Registra um lote de episódios: ratings, cópias para a liga, relatórios
+        e checkpoints.
+
+        Não congela cópia no último episódio, que nenhum jogo usaria.
+
+        Returns:
+            Tupla (lista (nome, pesos) dos membros novos da liga, nomes dos
+            membros que saíram)
+        """
+        self.league.record(opponents, outcomes)
+        self.outcomes.extend(int(outcome) for outcome in outcomes)
+        self.timer.count('episodios', len(opponents))
+
+        added, removed = [], []
+        if episode // self.snapshot_interval > previous // self.snapshot_interval and episode < episodes:
+            name, removed = self.league.add(self.bot.policy_snapshot(), episode)
+            added.append((name, self.league.members[name]['snapshot']))
+            print(f"   + {name} entrou na liga" + (f" ({', '.join(removed)} saiu)" if removed else ""))
+
+        if episode // LEAGUE_REPORT_INTERVAL > previous // LEAGUE_REPORT_INTERVAL or episode == episodes:
+            wins = sum(1 for outcome in self.outcomes if outcome > 0)
+            print(f"Episódio {episode}/{episodes} | Win Rate (últimos {len(self.outcomes)}): "
+                  f"{wins / max(len(self.outcomes), 1):.2f} | Epsilon: {self.bot.epsilon:.4f}")
+            for line in self.league.table() + self.timer.format():
+                print(f"   {line}")
+            self.timer.reset()
+
+        if episode // save_interval > previous // save_interval:
+            with self.timer.phase('checkpoint'):
+                self.save_checkpoint(episode)
+        return added, removed
+
+    def train(self, episodes, workers=0, save_interval=LEAGUE_SAVE_INTERVAL, sync_every=50, profile=None):
+        """
+        Treina até `episodes` jogos.
+
+        Args:
+            episodes: Total de jogos do cronograma
+            workers: Processos atores (0 = joga e aprende neste processo)
+            save_interval: Jogos entre checkpoints
+            sync_every: Updates da rede entre publicações dos pesos para os atores
+            profile: Episódios com cProfile ligado (opcional)
+        """
+        print(f"🏆 Iniciando liga de self-play por {episodes} episódios...")
+        print(f"   Modelo: {self.model_path}")
+        print(f"   Liga: até {self.league.max_size} cópias congeladas (uma a cada {self.snapshot_interval} jogos), "
+              f"PFSP power={self.league.pfsp_power}, âncoras: {', '.join(ANCHORS)}")
+        print(f"   Processos atores: {workers or 'nenhum (jogos neste processo)'} | Jogos por lote: {self.envs}")
+
+        self.profile_window = ProfileWindow(self.start_episode, profile, output_dir='../logs') if profile else None
+        if workers > 0:
+            self.train_distributed(episodes, workers, save_interval, sync_every)
+        else:
+            self.train_local(episodes, save_interval)
+        if self.profile_window is not None:
+            self.profile_window.finish()
+
+        # Salvamento final, se o periódico ainda não cobriu o último episódio
+        final_episode = max(episodes, self.start_episode)
+        if final_episode != self.last_saved_episode:
+            self.save_checkpoint(final_episode)
+        self.checkpoints.close()
+        print("\n✅ Liga de self-play concluída!")
+
+    def train_local(self, episodes, save_interval):
+        """Lotes de jogos da liga no ambiente vetorizado deste processo."""
+        rewards = {name: LEAGUE_REWARDS for name in ANCHORS}
+        env = VecTrainingEnv(self.bot, self.cards, rewards, n_envs=self.envs, seed=self.seed)
+        for name, snapshot in self.league.snapshots():
+            env.add_opponent(name, self.frozen_policy(env.tables, snapshot), LEAGUE_REWARDS)
+
+        episode = self.start_episode
+        while episode < episodes:
+            if self.profile_window is not None:
+                self.profile_window.update(episode)
+
+            count = min(self.envs, episodes - episode)
+            opponents = self.league.sample(count, self.rng)
+            self.bot.epsilon = self.epsilon(episode, episodes)
+            with self.timer.phase('jogo'):
+                _, outcomes, _ = env.run_episodes(opponents)
+
+            previous, episode = episode, episode + count
+            added, removed = self.finish_batch(previous, episode, episodes, opponents, outcomes, save_interval)
+            for name, snapshot in added:
+                env.add_opponent(name, self.frozen_policy(env.tables, snapshot), LEAGUE_REWARDS)
+            for name in removed:
+                env.remove_opponent(name)
+
+    def train_distributed(self, episodes, workers, save_interval, sync_every):
+        """
+        Actor/learner: cada ator joga lotes da liga com os pesos publicados;
+        este processo sorteia os oponentes, guarda as transições e treina.
+        Cada ator tem a própria fila de ordens, que leva as cópias novas da
+        liga e os nomes dos membros que saíram uma única vez para cada ator.
+        """
+        ctx = mp.get_context('spawn')
+        weights = SharedWeights(ctx, self.bot.qnetwork_local)
+        jobs = [ctx.Queue() for _ in range(workers)]
+        results = ctx.Queue(maxsize=workers * 4)
+        seed = self.seed if self.seed is not None else random.randrange(2**31)
+        rewards = {name: LEAGUE_REWARDS for name in ANCHORS}
+
+        processes = [
+            ctx.Process(
+                target=run_actor,
+                args=(i, self.cards, rewards, weights, jobs[i], results, self.envs, 5, seed + i, LEAGUE_REWARDS),
+                daemon=True
+            )
+            for i in range(workers)
+        ]
+        for process in processes:
+            process.start()
+
+        # Membros da liga a enviar: cada ator recebe os que ainda não viu
+        # (e os nomes dos que saíram, depois dos lotes que ainda os sortearam)
+        members = self.league.snapshots()
+        evicted = []
+        sent = [0] * workers
+        sent_evicted = [0] * workers
+        pending = [deque() for _ in range(workers)]
+        issued = episode = self.start_episode
+        updates = stored = 0
+
+        try:
+            while episode < episodes:
+                # Até dois lotes por ator em andamento
+                for i in range(workers):
+                    while len(pending[i]) < 2 and issued < episodes:
+                        count = min(self.envs, episodes - issued)
+                        opponents = self.league.sample(count, self.rng)
+                        jobs[i].put((opponents, self.epsilon(issued, episodes), members[sent[i]:],
+                                     evicted[sent_evicted[i]:]))
+                        sent[i] = len(members)
+                        sent_evicted[i] = len(evicted)
+                        pending[i].append(opponents)
+                        issued += count
+
+                # Descarta o que todos os atores já receberam
+                for log, positions in ((members, sent), (evicted, sent_evicted)):
+                    done = min(positions)
+                    if done:
+                        del log[:done]
+                        positions[:] = [position - done for position in positions]
+
+                # Recebe um lote quando os updates estão em dia (como em DQNTrainer.train_distributed)
+                can_learn = len(self.bot.memory) >= self.bot.batch_size
+                batch = None
+                if not can_learn or updates >= stored // self.bot.update_every:
+                    try:
+                        with self.timer.phase('fila'):
+                            batch = results.get(timeout=60) if not can_learn else results.get_nowait()
+                    except queue.Empty:
+                        if not can_learn:
+                            raise RuntimeError("Nenhum ator enviou jogos em 60s")
+
+                if batch is not None:
+                    actor_id, transitions, _, outcomes = batch
+                    opponents = pending[actor_id].popleft()
+                    with self.timer.phase('replay'):
+                        self.bot.store_batch(*transitions)
+                    stored += len(transitions[2])
+                    self.bot.epsilon = self.epsilon(episode, episodes)
+
+                    previous, episode = episode, episode + len(opponents)
+                    if self.profile_window is not None:
+                        self.profile_window.update(episode)
+                    added, removed = self.finish_batch(previous, episode, episodes, opponents, outcomes,
+                                                       save_interval)
+                    members += added
+                    evicted += removed
+
+                if len(self.bot.memory) >= self.bot.batch_size:
+                    self.bot.learn()
+                    updates += 1
+                    if updates % sync_every == 0:
+                        weights.publish(self.bot.qnetwork_local)
+        finally:
+            for job_queue in jobs:
+                job_queue.put(None)
+            for process in processes:
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.terminate()
+
+        print(f"   Updates da rede no learner: {updates:,}")
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Treinamento Self-Play do RLBot (DQN)")
     parser.add_argument('--episodes', type=int, default=1000, help='Número de episódios de treinamento')
     parser.add_argument('--model', type=str, default='data/dqn_self_play.pth', help='Caminho para salvar o modelo')
+    parser.add_argument('--prioritized', action='store_true', help='Usa prioritized experience replay')
+    parser.add_argument('--per-alpha', type=float, default=0.6, help='Expoente das prioridades (PER)')
+    parser.add_argument('--per-beta', type=float, default=0.4, help='Beta inicial do importance sampling (PER)')
+    parser.add_argument('--per-anneal-steps', type=int, default=100000, help='Amostragens até beta chegar a 1.0 (PER)')
+    parser.add_argument('--replay-size', type=int, default=20000, help='Capacidade do replay buffer')
+    parser.add_argument('--compact-replay', action='store_true', help='Guarda o replay por ids de carta')
+    parser.add_argument('--replay-dir', type=str, default=None, help='Diretório do replay em disco (memmap)')
+    parser.add_argument('--resume', type=str, nargs='?', const='latest', default=None,
+                        help='Retoma de um checkpoint completo (sem caminho: o mais recente)')
+    parser.add_argument('--checkpoint-dir', type=str, default='data/checkpoints', help='Diretório dos checkpoints')
+    parser.add_argument('--keep-checkpoints', type=int, default=3, help='Checkpoints completos mantidos')
+    parser.add_argument('--profile', type=int, nargs='?', const=500, default=None,
+                        help='Captura um cProfile dos primeiros N episódios (padrão: 500)')
+    parser.add_argument('--league', action='store_true',
+                        help='Liga de self-play: pool de cópias congeladas, matchmaking PFSP e Elo')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Processos atores da liga (0 = joga e aprende no mesmo processo)')
+    parser.add_argument('--envs', type=int, default=64, help='Jogos simultâneos por lote da liga')
+    parser.add_argument('--pool-size', type=int, default=20, help='Máximo de cópias congeladas na liga')
+    parser.add_argument('--snapshot-interval', type=int, default=SNAPSHOT_INTERVAL,
+                        help='Jogos entre cópias do agente para a liga')
+    parser.add_argument('--pfsp-power', type=float, default=2.0,
+                        help='Prioriza oponentes que vencem o agente (0 = sorteio uniforme)')
+    parser.add_argument('--update-every', type=int, default=4, help='Transições entre updates da rede (liga)')
+    parser.add_argument('--seed', type=int, default=None, help='Semente da liga')
     
     args = parser.parse_args()
     
     # Ajusta o caminho do modelo para ser relativo ao diretório backend
     model_path = os.path.join(os.path.dirname(__file__), '..', args.model)
+    checkpoint_dir = os.path.join(os.path.dirname(__file__), '..', args.checkpoint_dir)
     
-    train_self_play(args.episodes, model_path)
+    if args.league:
+        trainer = LeagueTrainer(load_cards(), model_path, pool_size=args.pool_size, pfsp_power=args.pfsp_power,
+                                snapshot_interval=args.snapshot_interval, envs=args.envs,
+                                update_every=args.update_every, prioritized=args.prioritized,
+                                per_alpha=args.per_alpha, per_beta=args.per_beta,
+                                per_anneal_steps=args.per_anneal_steps, replay_size=args.replay_size,
+                                compact_replay=args.compact_replay, replay_dir=args.replay_dir,
+                                checkpoint_dir=checkpoint_dir, keep_checkpoints=args.keep_checkpoints,
+                                seed=args.seed)
+        if args.resume:
+            trainer.resume(args.resume)
+        trainer.train(args.episodes, workers=args.workers, profile=args.profile)
+    else:
+        train_self_play(args.episodes, model_path, prioritized=args.prioritized, per_alpha=args.per_alpha,
+                        per_beta=args.per_beta, per_anneal_steps=args.per_anneal_steps,
+                        replay_size=args.replay_size, compact_replay=args.compact_replay,
+                        replay_dir=args.replay_dir, resume=args.resume, checkpoint_dir=checkpoint_dir,
+                        keep_checkpoints=args.keep_checkpoints, profile=args.profile)
@@ -0,0 +1,297 @@
+"""
+Ajuste Automático dos Pesos do WeightedBot
+==========================================
+
+Busca pesos para o WeightedBot com o método de entropia cruzada (CEM):
+a cada geração sorteia uma população de candidatos de uma gaussiana,
+avalia cada um em milhares de partidas simuladas e reajusta a gaussiana
+sobre a elite.
+
+A aptidão é a pontuação média (vitória = 1, empate = 0.5) contra um
+conjunto fixo de oponentes, simulada em lote pelo rl_training/vec_games.py
+e dividida entre processos. Todos os candidatos de uma geração jogam as
+mesmas distribuições de cartas, então as diferenças de aptidão vêm dos
+pesos e não da sorte.
+
+A busca é feita em um espaço normalizado (peso x escala média do atributo),
+porque os atributos têm ordens de grandeza muito diferentes (HP na casa das
+centenas, 1/peso na casa de 0.001). O arquivo de saída traz os pesos já no
+formato de WeightedBot.stat_weights.
+
+O GameManager carrega data/weighted_weights.json no bot fácil quando o
+arquivo existe (senão usa os pesos padrão); o treinamento e a avaliação o
+usam no Facil_Bot com --facil-weights. Os pesos só mudam o ataque
+(choose_move): na defesa o WeightedBot escolhe a carta pelo próprio atributo
+pedido, que escalar um atributo não reordena.
+
+Uso:
+    python tune_weighted.py [--generations N] [--population N] [--games N]
+"""
+
+import json
+import sys
+import os
+import argparse
+import time
+from datetime import datetime
+from multiprocessing import Pool
+import numpy as np
+
+# Adiciona o caminho do backend ao sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils import STATS
+from app.deck_loader import load_deck_from_json
+from bots.weighted_bot import DEFAULT_STAT_WEIGHTS
+from rl_training.vec_games import (
+    CardTables, WeightedPolicy, FlatMonteCarloPolicy, RandomPolicy, play_games
+)
+
+OPPONENTS = ['weighted', 'random', 'flat_mc']
+
+# Tabelas do baralho em cada processo do pool
+_tables = None
+
+
+def _init_worker(cards_path):
+    global _tables
+    _tables = CardTables(load_deck_from_json(cards_path, shuffle_deck=False))
+
+
+def _evaluate_chunk(args):
+    """
+    Avalia um bloco de candidatos (executado em processo do pool).
+
+    Args:
+        args: Tupla (pesos (P, S), semente, jogos por oponente, tamanho da mão)
+
+    Returns:
+        Array (P,) com a pontuação média de cada candidato
+    """
+    weights, seed, games, hand_size = args
+    return evaluate_weights(_tables, weights, seed, games, hand_size)
+
+
+def evaluate_weights(tables, weights, seed, games, hand_size=5):
+    """
+    Pontuação média de cada candidato contra o conjunto de oponentes.
+
+    Args:
+        tables: CardTables do baralho
+        weights: Pesos (P, S) no formato de WeightedBot, na ordem de STATS
+        seed: Semente das distribuições de cartas (igual para todos os candidatos)
+        games: Jogos por candidato contra cada oponente
+        hand_size: Cartas por mão
+
+    Returns:
+        Array (P,) com a pontuação média (vitória = 1, empate = 0.5)
+    """
+    weights = np.atleast_2d(weights)
+    population = len(weights)
+    rng = np.random.default_rng(seed)
+
+    # Mesmas mãos para todos os candidatos; cada mão é jogada começando
+    # pelos dois lados
+    hands1, hands2 = tables.deal(rng, games, hand_size)
+    first = np.arange(games) % 2 == 0
+
+    hands1 = np.tile(hands1, (population, 1))
+    hands2 = np.tile(hands2, (population, 1))
+    first = np.tile(first, population)
+    candidate = np.repeat(np.arange(population), games)
+
+    policy = WeightedPolicy(tables, weights, candidate)
+    opponents = {
+        'weighted': WeightedPolicy(tables, [DEFAULT_STAT_WEIGHTS[stat] for stat in tables.stats_list]),
+        'random': RandomPolicy(tables, np.random.default_rng(seed + 1)),
+        'flat_mc': FlatMonteCarloPolicy(tables),
+    }
+
+    fitness = np.zeros(population)
+    for name in OPPONENTS:
+        result = play_games(tables, hands1, hands2, policy, opponents[name], first)
+        points = (result + 1) / 2
+        fitness += points.reshape(population, games).mean(axis=1)
+
+    return fitness / len(OPPONENTS)
+
+
+class WeightTuner:
+    """Busca por entropia cruzada sobre os pesos do WeightedBot."""
+
+    def __init__(self, cards_path, population=64, elite_frac=0.2, games=1000,
+                 hand_size=5, workers=1, seed=None):
+        """
+        Inicializa o ajuste.
+
+        Args:
+            cards_path: Caminho do baralho (JSON)
+            population: Candidatos por geração
+            elite_frac: Fração da população usada para reajustar a gaussiana
+            games: Jogos por candidato contra cada oponente
+            hand_size: Cartas por mão nas partidas simuladas
+            workers: Processos usados na avaliação
+            seed: Semente da busca (opcional)
+        """
+        self.cards_path = cards_path
+        self.population = population
+        self.n_elite = max(2, int(population * elite_frac))
+        self.games = games
+        self.hand_size = hand_size
+        self.workers = workers
+        self.rng = np.random.default_rng(seed)
+
+        self.tables = CardTables(load_deck_from_json(cards_path, shuffle_deck=False))
+        # Escala média de cada atributo (na forma usada pelo WeightedBot)
+        self.scale = np.abs(self.tables.features).mean(axis=0)
+
+        self.games_played = 0
+        self._pool = Pool(workers, initializer=_init_worker, initargs=(cards_path,)) if workers > 1 else None
+
+    def close(self):
+        """Encerra o pool de processos."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def to_weights(self, normalized):
+        """Converte pesos do espaço normalizado para o formato do WeightedBot."""
+        return np.asarray(normalized) / self.scale
+
+    def evaluate(self, weights, seed, games=None):
+        """
+        Avalia candidatos (pesos do WeightedBot) em paralelo.
+
+        Returns:
+            Array com a pontuação média de cada candidato
+        """
+        games = games or self.games
+        weights = np.atleast_2d(weights)
+        self.games_played += len(weights) * games * len(OPPONENTS)
+
+        if self._pool is None:
+            return evaluate_weights(self.tables, weights, seed, games, self.hand_size)
+
+        chunks = np.array_split(weights, min(self.workers, len(weights)))
+        jobs = [(chunk, seed, games, self.hand_size) for chunk in chunks]
+        return np.concatenate(self._pool.map(_evaluate_chunk, jobs))
+
+    def run(self, generations=30, init_std=1.0, min_std=0.02, log=print):
+        """
+        Executa a busca.
+
+        Args:
+            generations: Número de gerações
+            init_std: Desvio padrão inicial, relativo ao tamanho médio dos pesos
+            min_std: Piso do desvio padrão, na mesma escala (evita convergência prematura)
+            log: Função de log
+
+        Returns:
+            Dicionário com os melhores pesos e as métricas da busca
+        """
+        default = np.array([DEFAULT_STAT_WEIGHTS[stat] for stat in STATS])
+        mean = default * self.scale
+        # Só a proporção entre os pesos importa; o desvio acompanha a escala deles
+        magnitude = np.abs(mean).mean()
+        std = np.full(len(STATS), init_std * magnitude)
+        min_std = min_std * magnitude
+
+        best_normalized, best_fitness = mean.copy(), -np.inf
+        start = time.time()
+
+        for generation in range(1, generations + 1):
+            samples = mean + std * self.rng.standard_normal((self.population, len(STATS)))
+            # A média atual participa da geração como referência
+            samples[0] = mean
+
+            seed = int(self.rng.integers(2**31))
+            fitness = self.evaluate(self.to_weights(samples), seed)
+
+            elite = samples[np.argsort(fitness)[::-1][:self.n_elite]]
+            mean = elite.mean(axis=0)
+            std = np.maximum(elite.std(axis=0), min_std)
+
+            top = int(fitness.argmax())
+            if fitness[top] > best_fitness:
+                best_normalized, best_fitness = samples[top].copy(), fitness[top]
+
+            log(f"[Geração {generation:3d}/{generations}] "
+                f"Melhor: {fitness[top]:.4f} | Média: {fitness.mean():.4f} | "
+                f"Std: {std.mean() / magnitude:.3f} | Jogos: {self.games_played:,} | "
+                f"{time.time() - start:.0f}s")
+
+        # Confirma em partidas novas: melhor da busca, média final e pesos padrão
+        final_games = self.games * 10
+        seed = int(self.rng.integers(2**31))
+        candidates = np.stack([best_normalized, mean, default * self.scale])
+        final = self.evaluate(self.to_weights(candidates), seed, games=final_games)
+
+        # Os pesos padrão também concorrem: a busca nunca grava algo pior que eles
+        chosen = int(final.argmax())
+        weights = self.to_weights(candidates[chosen])
+
+        return {
+            'weights': {stat: float(w) for stat, w in zip(STATS, weights)},
+            'fitness': float(final[chosen]),
+            'chosen': ('best', 'mean', 'default')[chosen],
+            'default_fitness': float(final[2]),
+            'opponents': OPPONENTS,
+            'hand_size': self.hand_size,
+            'generations': generations,
+            'population': self.population,
+            'games_played': self.games_played,
+            'elapsed_seconds': time.time() - start,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+        }
+
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description='Ajuste dos pesos do WeightedBot (CEM)')
+    parser.add_argument('--generations', type=int, default=30, help='Número de gerações')
+    parser.add_argument('--population', type=int, default=64, help='Candidatos por geração')
+    parser.add_argument('--elite-frac', type=float, default=0.2, help='Fração de elite')
+    parser.add_argument('--games', type=int, default=1000, help='Jogos por candidato contra cada oponente')
+    parser.add_argument('--hand-size', type=int, default=5, help='Cartas por mão')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processos em paralelo')
+    parser.add_argument('--seed', type=int, default=None, help='Semente da busca')
+    parser.add_argument('--output', type=str, default='data/weighted_weights.json', help='Arquivo de saída')
+
+    args = parser.parse_args()
+
+    tuner = WeightTuner(
+        'data/carros.json',
+        population=args.population,
+        elite_frac=args.elite_frac,
+        games=args.games,
+        hand_size=args.hand_size,
+        workers=args.workers,
+        seed=args.seed
+    )
+    print(f"[Setup] {len(tuner.tables.cards)} cartas | População: {args.population} | "
+          f"Jogos por candidato: {args.games * len(OPPONENTS):,} | Processos: {args.workers}\n")
+
+    try:
+        result = tuner.run(generations=args.generations)
+    finally:
+        tuner.close()
+
+    parent = os.path.dirname(args.output)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+
+    print(f"\n[Resultado] Pontuação: {result['fitness']:.4f} "
+          f"(pesos padrão: {result['default_fitness']:.4f})")
+    if result['chosen'] == 'default':
+        print("[Resultado] Nenhum candidato superou os pesos padrão; mantidos os padrões")
+    for stat, weight in result['weights'].items():
+        print(f"  {stat:>10}: {weight:.6g}")
+    print(f"\n✓ Pesos salvos em {args.output} "
+          f"({result['games_played']:,} jogos em {result['elapsed_seconds']:.0f}s)")
+
+
+if __name__ == "__main__":
+    main()
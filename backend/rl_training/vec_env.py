@@ -0,0 +1,311 @@
+"""
+Ambiente de treinamento vetorizado para o DQN
+=============================================
+
+Joga B episódios de treinamento ao mesmo tempo como arrays NumPy: as mãos
+são arrays de índices de carta, os resultados vêm da tabela pré-calculada
+do rl_training/vec_games.py e o RLBot decide as B jogadas de cada rodada
+com um único forward (todos os jogos x todos os atributos).
+
+Os oponentes usam as políticas em lote do vec_games:
+- Facil_Bot: WeightedPolicy com os pesos do WeightedBot (padrão ou facil_weights)
+- Medio_Bot: EndgamePolicy, o mesmo solucionador de finais que o MCTSBot do
+  treinamento escalar e da avaliação usa em mãos de até MEDIO_ENDGAME_CARDS
+  cartas. Em mãos maiores a busca em árvore não é vetorizável e as rodadas
+  iniciais usam FlatMonteCarloPolicy (aviso no log)
+- Outros oponentes (add_opponent), como as políticas congeladas da liga de
+  self-play (FrozenPolicy)
+
+As regras, a política epsilon-greedy do RLBot e as recompensas seguem
+DQNTrainer.train_episode.
+"""
+
+import sys
+import os
+import numpy as np
+import torch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bots.rl_bot import ACTION_SIZE, STATE_INPUT_SIZE
+from bots.weighted_bot import DEFAULT_STAT_WEIGHTS
+from rl_training.vec_games import CardTables, WeightedPolicy, EndgamePolicy
+from rl_training.evaluation import MEDIO_ENDGAME_CARDS
+
+
+class VecTrainingEnv:
+    """Episódios de treinamento do RLBot em lote."""
+
+    def __init__(self, bot, cards, rewards, n_envs=256, hand_size=5, seed=None, store=None,
+                 facil_weights=None):
+        """
+        Inicializa o ambiente.
+
+        Args:
+            bot: RLBot treinado (decide as jogadas e recebe as transições)
+            cards: Baralho completo
+            rewards: Dicionário oponente -> {'win', 'loss', 'draw', 'final_win', 'final_loss'}
+            n_envs: Número de jogos simultâneos
+            hand_size: Cartas por mão
+            seed: Semente dos sorteios (opcional)
+            store: Destino das transições, com a assinatura de RLBot.remember_batch
+                (padrão: bot.remember_batch; atores enviam as transições ao learner)
+            facil_weights: Pesos do Facil_Bot (load_stat_weights; None usa os padrões)
+        """
+        self.bot = bot
+        self.facil_weights = facil_weights or DEFAULT_STAT_WEIGHTS
+        self.store = store or bot.remember_batch
+        self.tables = CardTables(cards, bot.stats_list)
+        self.n_envs = n_envs
+        self.hand_size = min(hand_size, ACTION_SIZE)
+        self.rng = np.random.default_rng(seed)
+
+        bot.index_cards(cards)
+
+        self.opponent_names = list(rewards)
+        self.policies = [self._make_policy(name) for name in self.opponent_names]
+        self.rewards = {
+            key: np.array([rewards[name][key] for name in self.opponent_names], dtype=np.float32)
+            for key in ('win', 'loss', 'draw', 'final_win', 'final_loss')
+        }
+
+        n_stats = self.tables.n_stats
+        self._states = np.zeros((n_envs * n_stats, STATE_INPUT_SIZE), dtype=np.float32)
+        self._state_tensor = torch.from_numpy(self._states)
+        self._stat_codes = np.tile(np.arange(n_stats), n_envs)
+
+    def add_opponent(self, name, policy, rewards):
+        """
+        Registra um oponente extra (política com a interface de vec_games).
+
+        Args:
+            name: Nome usado em run_episodes
+            policy: Política vetorizada (attack/defend)
+            rewards: Recompensas do oponente, como em __init__
+        """
+        if name in self.opponent_names:
+            raise ValueError(f"Oponente já registrado: {name}")
+        self.opponent_names.append(name)
+        self.policies.append(policy)
+        for key, values in self.rewards.items():
+            self.rewards[key] = np.append(values, np.float32(rewards[key]))
+
+    def remove_opponent(self, name):
+        """
+        Descarta um oponente registrado (ex: membro que saiu da liga).
+
+        Args:
+            name: Nome usado em run_episodes
+        """
+        if name not in self.opponent_names:
+            raise ValueError(f"Oponente não registrado: {name}")
+        index = self.opponent_names.index(name)
+        del self.opponent_names[index]
+        del self.policies[index]
+        for key, values in self.rewards.items():
+            self.rewards[key] = np.delete(values, index)
+
+    def _make_policy(self, name):
+        if name == 'Facil_Bot':
+            weights = [self.facil_weights.get(stat, 1.0) for stat in self.tables.stats_list]
+            return WeightedPolicy(self.tables, weights)
+        elif name == 'Medio_Bot':
+            if self.hand_size > MEDIO_ENDGAME_CARDS:
+                print(f"[VecTrainingEnv] Medio_Bot: mãos de {self.hand_size} cartas usam "
+                      f"FlatMonteCarloPolicy até restarem {MEDIO_ENDGAME_CARDS} "
+                      f"(o MCTSBot escalar busca em árvore nessas rodadas)")
+            return EndgamePolicy(self.tables, MEDIO_ENDGAME_CARDS)
+        raise ValueError(f"Oponente desconhecido: {name}")
+
+    def run_episodes(self, opponents):
+        """
+        Joga um episódio por oponente da lista e entrega as transições ao bot.
+
+        Args:
+            opponents: Lista com o nome do oponente de cada episódio (até n_envs)
+
+        Returns:
+            Tupla (recompensa de cada episódio, resultado de cada episódio
+            (1 vitória, 0 empate, -1 derrota), retorno de store (loss média dos
+            updates ou None))
+        """
+        batch = len(opponents)
+        if batch > self.n_envs:
+            raise ValueError(f"No máximo {self.n_envs} episódios por chamada")
+
+        bot = self.bot
+        tables = self.tables
+        rng = self.rng
+        size = self.hand_size
+        n_stats = tables.n_stats
+        rows = np.arange(batch)
+
+        opponent = np.array([self.opponent_names.index(name) for name in opponents])
+        rl_hand, opp_hand = tables.deal(rng, batch, size)
+        opp_alive = np.ones((batch, size), dtype=bool)
+        rl_attacks = rng.random(batch) < 0.5
+
+        episode_reward = np.zeros(batch, dtype=np.float32)
+        score = np.zeros(batch, dtype=np.int64)
+        hands, stats, actions, rewards, next_hands = [], [], [], [], []
+
+        for played in range(size):
+            valid = size - played
+            # mão do RLBot compactada à esquerda, como a lista bot.deck
+            hand_ids = tables.ids[rl_hand]
+            q = self._q_values(hand_ids, batch)[:, :, :valid]
+
+            # RLBot atacante: atributo (epsilon-greedy sobre o maior Q de cada atributo)
+            greedy_stat = q.max(axis=2).argmax(axis=1)
+            explore = rng.random(batch) < bot.epsilon
+            rl_stat = np.where(explore, rng.integers(n_stats, size=batch), greedy_stat)
+
+            # Oponente atacante
+            rl_alive = np.ones((batch, valid), dtype=bool)
+            opp_pos_att, opp_stat = self._opponent_attack(opponent, opp_hand, opp_alive, rl_hand, rl_alive)
+            stat = np.where(rl_attacks, rl_stat, opp_stat)
+
+            # Carta do RLBot para o atributo da rodada (epsilon-greedy)
+            greedy_pos = q[rows, stat].argmax(axis=1)
+            explore = rng.random(batch) < bot.epsilon
+            rl_pos = np.where(explore, rng.integers(valid, size=batch), greedy_pos)
+
+            opp_pos_def = self._opponent_defend(opponent, opp_hand, opp_alive, stat, rl_hand, rl_alive)
+            opp_pos = np.where(rl_attacks, opp_pos_def, opp_pos_att)
+
+            rl_card = rl_hand[rows, rl_pos]
+            opp_card = opp_hand[rows, opp_pos]
+            result = tables.outcome[rl_card, opp_card, stat]
+
+            reward = np.where(result == 1, self.rewards['win'][opponent],
+                              np.where(result == -1, self.rewards['loss'][opponent],
+                                       self.rewards['draw'][opponent]))
+            episode_reward += reward
+            score += result
+
+            # Remove as cartas jogadas (mantém a ordem da mão do RLBot)
+            keep = np.arange(valid)[None, :] != rl_pos[:, None]
+            rl_hand = rl_hand[keep].reshape(batch, valid - 1)
+            opp_alive[rows, opp_pos] = False
+            rl_attacks = np.where(result == 0, rl_attacks, result > 0)
+
+            hands.append(hand_ids)
+            stats.append(stat)
+            actions.append(rl_pos)
+            rewards.append(reward)
+            next_hands.append(tables.ids[rl_hand])
+
+        # Bônus/penalidade final na última transição
+        rewards[-1] = rewards[-1] + np.where(
+            episode_reward > 0, self.rewards['final_win'][opponent],
+            np.where(episode_reward < 0, self.rewards['final_loss'][opponent], 0.0)
+        )
+
+        loss = self._store(hands, stats, actions, rewards, next_hands)
+        return episode_reward, np.sign(score), loss
+
+    def _q_values(self, hand_ids, batch):
+        """Q-values (B, S, ACTION_SIZE) de todas as mãos para todos os atributos."""
+        n_stats = self.tables.n_stats
+        count = batch * n_stats
+
+        padded = np.full((count, ACTION_SIZE), -1, dtype=np.int64)
+        padded[:, :hand_ids.shape[1]] = np.repeat(hand_ids, n_stats, axis=0)
+        self.bot._states_from_ids(padded, self._stat_codes[:count], self._states[:count])
+
+        return self.bot._q_values(self._state_tensor[:count]).reshape(batch, n_stats, ACTION_SIZE)
+
+    def _opponent_attack(self, opponent, hands, alive, rl_hand, rl_alive):
+        pos = np.zeros(len(hands), dtype=np.int64)
+        stat = np.zeros(len(hands), dtype=np.int64)
+        for index, policy in enumerate(self.policies):
+            games = np.nonzero(opponent == index)[0]
+            if len(games):
+                pos[games], stat[games] = policy.attack(
+                    hands[games], alive[games], rl_hand[games], rl_alive[games]
+                )
+        return pos, stat
+
+    def _opponent_defend(self, opponent, hands, alive, stat, rl_hand, rl_alive):
+        pos = np.zeros(len(hands), dtype=np.int64)
+        for index, policy in enumerate(self.policies):
+            games = np.nonzero(opponent == index)[0]
+            if len(games):
+                pos[games] = policy.defend(
+                    hands[games], alive[games], stat[games], rl_hand[games], rl_alive[games]
+                )
+        return pos
+
+    def _store(self, hands, stats, actions, rewards, next_hands):
+        """Entrega as transições ao bot na ordem em que os episódios escalares o fariam."""
+        size = len(actions)
+        width = hands[0].shape[1]
+
+        def stack(arrays):
+            # (rodada, jogo, ...) -> (jogo, rodada, ...) -> transições
+            return np.stack(arrays, axis=1).reshape(-1, *arrays[0].shape[1:])
+
+        def stack_hands(arrays):
+            padded = np.full((len(arrays[0]), size, width), -1, dtype=np.int64)
+            for played, array in enumerate(arrays):
+                padded[:, played, :array.shape[1]] = array
+            return padded.reshape(-1, width)
+
+        dones = np.zeros((len(actions[0]), size), dtype=np.uint8)
+        dones[:, -1] = 1
+
+        return self.store(
+            stack_hands(hands), stack(stats), stack(actions),
+            stack(rewards).astype(np.float32), stack_hands(next_hands), dones.reshape(-1)
+        )
+
+
+class FrozenPolicy:
+    """
+    Política gulosa (epsilon = 0) de uma rede congelada, na interface de
+    vec_games. Reproduz RLBot.choose_move/choose_card: a mão é compactada à
+    esquerda na ordem original e o maior Q escolhe atributo e carta.
+    """
+
+    def __init__(self, tables, encoder, network):
+        """
+        Args:
+            tables: CardTables do baralho
+            encoder: RLBot com o baralho indexado (só monta os estados)
+            network: QNetwork congelada
+        """
+        self.tables = tables
+        self.encoder = encoder
+        self.network = network
+
+    def _q_values(self, hands, alive):
+        """Q-values (B, S, H) da mão compactada, -inf fora das cartas vivas, e a ordem de compactação."""
+        batch, size = hands.shape
+        n_stats = self.tables.n_stats
+
+        # posições vivas primeiro, na ordem original
+        order = np.argsort(~alive, axis=1, kind='stable')
+        compact_alive = np.take_along_axis(alive, order, axis=1)
+        ids = np.where(compact_alive, self.tables.ids[np.take_along_axis(hands, order, axis=1)], -1)
+
+        padded = np.full((batch * n_stats, ACTION_SIZE), -1, dtype=np.int64)
+        padded[:, :size] = np.repeat(ids, n_stats, axis=0)
+        states = np.zeros((batch * n_stats, STATE_INPUT_SIZE), dtype=np.float32)
+        self.encoder._states_from_ids(padded, np.tile(np.arange(n_stats), batch), states)
+
+        with torch.inference_mode():
+            q = self.network(torch.from_numpy(states)).numpy().reshape(batch, n_stats, ACTION_SIZE)
+        q = np.where(compact_alive[:, None, :], q[:, :, :size], -np.inf)
+        return q, order
+
+    def attack(self, hands, alive, opp_hands, opp_alive):
+        q, order = self._q_values(hands, alive)
+        rows = np.arange(len(hands))
+        stat = q.max(axis=2).argmax(axis=1)
+        pos = q[rows, stat].argmax(axis=1)
+        return order[rows, pos], stat
+
+    def defend(self, hands, alive, stat, opp_hands, opp_alive):
+        q, order = self._q_values(hands, alive)
+        rows = np.arange(len(hands))
+        return order[rows, q[rows, stat].argmax(axis=1)]
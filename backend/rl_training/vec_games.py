@@ -0,0 +1,302 @@
+"""
+Simulador de jogos vetorizado (NumPy)
+=====================================
+
+Joga milhares de partidas de Super Trunfo ao mesmo tempo. As mãos são
+arrays de índices de carta (B, H) com máscaras de cartas vivas e o
+resultado de cada confronto vem de uma tabela pré-calculada
+(carta x carta x atributo).
+
+As políticas reproduzem em lote as decisões dos bots:
+- WeightedPolicy: WeightedBot (com pesos por jogo, para busca de pesos)
+- FlatMonteCarloPolicy: valor esperado exato do antigo MCTSBot de uma rodada
+- EndgamePolicy: solucionador de finais (bots/endgame.py), como o MCTSBot
+  com endgame_cards, jogo a jogo
+- RandomPolicy: jogadas uniformes
+"""
+
+import sys
+import os
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils import STATS, LOWER_IS_BETTER, stat_key
+from bots.endgame import EndgameSolver, get_shared_solver
+
+
+class CardTables:
+    """Tabelas pré-calculadas de um baralho."""
+
+    def __init__(self, cards, stats_list=None):
+        """
+        Args:
+            cards: Baralho completo
+            stats_list: Atributos jogáveis (usa STATS se None)
+        """
+        self.cards = cards
+        self.stats_list = list(stats_list) if stats_list is not None else list(STATS)
+        n, s = len(cards), len(self.stats_list)
+
+        self.ids = np.array([card['id'] for card in cards])
+        raw = np.array([[float(card.get(stat, 0)) for stat in self.stats_list] for card in cards])
+        lower = np.array([stat in LOWER_IS_BETTER for stat in self.stats_list])
+
+        # Valor normalizado (1/valor onde menor é melhor), 0 para valores ausentes
+        with np.errstate(divide='ignore'):
+            inverse = np.where(raw != 0, 1.0 / raw, 0.0)
+        self.features = np.where(lower, inverse, raw)
+        self.present = raw != 0
+
+        # Valor usado pelo WeightedBot para defender (1/valor ou valor)
+        with np.errstate(divide='ignore'):
+            self.defend_values = np.where(lower, np.where(raw != 0, 1.0 / raw, np.inf), raw)
+
+        # Resultado de cada confronto: outcome[a, b, s] = evaluate(a, b, s)
+        keys = np.array([[stat_key(card, stat) for stat in self.stats_list] for card in cards])
+        self.outcome = (
+            (keys[:, None, :] > keys[None, :, :]).astype(np.int8)
+            - (keys[:, None, :] < keys[None, :, :]).astype(np.int8)
+        )
+        self.n_cards = n
+        self.n_stats = s
+
+    def deal(self, rng, batch, hand_size):
+        """
+        Sorteia `batch` pares de mãos disjuntas.
+
+        Returns:
+            Tupla (mãos do jogador 1 (B, H), mãos do jogador 2 (B, H))
+        """
+        order = np.argsort(rng.random((batch, self.n_cards)), axis=1)
+        return order[:, :hand_size], order[:, hand_size:2 * hand_size]
+
+
+def masked_argmax(values, alive):
+    """
+    Argmax por linha considerando apenas posições vivas.
+
+    Em caso de empate retorna a primeira posição, como max() em Python.
+    Linhas sem nenhuma posição viva retornam 0.
+    """
+    masked = np.where(alive, values, -np.inf)
+    best = masked.argmax(axis=1)
+
+    # Linhas em que todos os vivos valem -inf: primeira posição viva
+    stuck = ~np.take_along_axis(alive, best[:, None], axis=1)[:, 0]
+    if stuck.any():
+        best[stuck] = alive[stuck].argmax(axis=1)
+    return best
+
+
+class RandomPolicy:
+    """Escolhas uniformes entre as cartas vivas e os atributos."""
+
+    def __init__(self, tables, rng):
+        self.tables = tables
+        self.rng = rng
+
+    def attack(self, hands, alive, opp_hands, opp_alive):
+        pos = masked_argmax(self.rng.random(hands.shape), alive)
+        stat = self.rng.integers(self.tables.n_stats, size=len(hands))
+        return pos, stat
+
+    def defend(self, hands, alive, stat, opp_hands, opp_alive):
+        return masked_argmax(self.rng.random(hands.shape), alive)
+
+
+class WeightedPolicy:
+    """
+    WeightedBot em lote.
+
+    Aceita uma matriz de pesos (P, S) e um vetor que indica qual linha de
+    pesos cada jogo usa, para avaliar muitos candidatos de uma vez.
+    """
+
+    def __init__(self, tables, weights, weight_index=None):
+        """
+        Args:
+            tables: CardTables do baralho
+            weights: Pesos (S,) ou (P, S) na ordem de tables.stats_list
+            weight_index: Linha de pesos de cada jogo (B,) (opcional)
+        """
+        self.tables = tables
+        weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+        self.weight_index = weight_index
+
+        # Score geral de cada carta por candidato: (P, n)
+        self.scores = weights @ tables.features.T
+
+        # Melhor atributo de cada carta por candidato: (P, n)
+        stat_scores = tables.features[None, :, :] * weights[:, None, :]
+        stat_scores = np.where(tables.present[None, :, :], stat_scores, -np.inf)
+        self.best_stats = stat_scores.argmax(axis=2)
+
+    def _rows(self, batch):
+        if self.weight_index is None:
+            return np.zeros(batch, dtype=np.intp)
+        return self.weight_index
+
+    def attack(self, hands, alive, opp_hands, opp_alive):
+        rows = self._rows(len(hands))[:, None]
+        pos = masked_argmax(self.scores[rows, hands], alive)
+        card = hands[np.arange(len(hands)), pos]
+        return pos, self.best_stats[rows[:, 0], card]
+
+    def defend(self, hands, alive, stat, opp_hands, opp_alive):
+        values = self.tables.defend_values[hands, stat[:, None]]
+        return masked_argmax(values, alive)
+
+
+class FlatMonteCarloPolicy:
+    """
+    Valor esperado exato da antiga busca de uma rodada do MCTSBot: cada
+    jogada é avaliada contra uma carta uniforme da mão do oponente.
+    """
+
+    def __init__(self, tables):
+        self.tables = tables
+
+    def _expected(self, hands, opp_hands, opp_alive):
+        # (B, H, H_opp, S) -> média sobre as cartas vivas do oponente: (B, H, S)
+        outcome = self.tables.outcome[hands[:, :, None], opp_hands[:, None, :], :]
+        weights = opp_alive[:, None, :, None]
+        count = np.maximum(opp_alive.sum(axis=1), 1)[:, None, None]
+        return (outcome * weights).sum(axis=2) / count
+
+    def attack(self, hands, alive, opp_hands, opp_alive):
+        expected = self._expected(hands, opp_hands, opp_alive)
+        batch, size, n_stats = expected.shape
+        flat_alive = np.repeat(alive, n_stats, axis=1)
+        best = masked_argmax(expected.reshape(batch, size * n_stats), flat_alive)
+        return best // n_stats, best % n_stats
+
+    def defend(self, hands, alive, stat, opp_hands, opp_alive):
+        expected = self._expected(hands, opp_hands, opp_alive)
+        values = expected[np.arange(len(hands)), :, stat]
+        return masked_argmax(values, alive)
+
+
+class EndgamePolicy:
+    """
+    Decisões do solucionador de finais com as duas mãos conhecidas, iguais às
+    do MCTSBot com endgame_cards (bots/endgame.py).
+
+    O solucionador não é vetorizável: cada jogo é resolvido em Python, com a
+    memória de estados compartilhada entre jogos. Jogos em que alguma mão tem
+    mais de max_cards cartas vivas usam a política `fallback`.
+    """
+
+    def __init__(self, tables, max_cards=5, fallback=None):
+        """
+        Args:
+            tables: CardTables do baralho
+            max_cards: Maior mão decidida pelo solucionador
+            fallback: Política das mãos maiores (padrão: FlatMonteCarloPolicy)
+        """
+        self.tables = tables
+        self.max_cards = max_cards
+        self.fallback = fallback or FlatMonteCarloPolicy(tables)
+
+        solver = get_shared_solver()
+        if solver.stats_list != tables.stats_list:
+            solver = EndgameSolver(tables.stats_list)
+        solver.index(tables.cards)
+        self.solver = solver
+
+        # Bit de cada carta nas máscaras do solucionador (ids abaixo de 64)
+        self._bits = np.left_shift(np.uint64(1), tables.ids.astype(np.uint64))
+
+    def _masks(self, hands, alive):
+        """Bitmask dos ids das cartas vivas de cada jogo."""
+        masks = np.where(alive, self._bits[hands], np.uint64(0)).sum(axis=1, dtype=np.uint64)
+        return [int(mask) for mask in masks]
+
+    def _solvable(self, alive, opp_alive):
+        return (alive.sum(axis=1) <= self.max_cards) & (opp_alive.sum(axis=1) <= self.max_cards)
+
+    def attack(self, hands, alive, opp_hands, opp_alive):
+        solvable = self._solvable(alive, opp_alive)
+        if solvable.all():
+            pos = np.zeros(len(hands), dtype=np.int64)
+            stat = np.zeros(len(hands), dtype=np.int64)
+        else:
+            pos, stat = self.fallback.attack(hands, alive, opp_hands, opp_alive)
+
+        games = np.nonzero(solvable)[0]
+        bot_masks = self._masks(hands[games], alive[games])
+        opp_masks = self._masks(opp_hands[games], opp_alive[games])
+        stats_list = self.tables.stats_list
+        for game, bot_mask, opp_mask in zip(games, bot_masks, opp_masks):
+            (card_id, stat_name), _ = self.solver.best_move(bot_mask, [opp_mask])
+            pos[game] = self._position(hands[game], alive[game], card_id)
+            stat[game] = stats_list.index(stat_name)
+        return pos, stat
+
+    def defend(self, hands, alive, stat, opp_hands, opp_alive):
+        solvable = self._solvable(alive, opp_alive)
+        if solvable.all():
+            pos = np.zeros(len(hands), dtype=np.int64)
+        else:
+            pos = self.fallback.defend(hands, alive, stat, opp_hands, opp_alive)
+
+        games = np.nonzero(solvable)[0]
+        bot_masks = self._masks(hands[games], alive[games])
+        opp_masks = self._masks(opp_hands[games], opp_alive[games])
+        stats_list = self.tables.stats_list
+        for game, bot_mask, opp_mask in zip(games, bot_masks, opp_masks):
+            card_id, _ = self.solver.best_reply(bot_mask, [opp_mask], stats_list[stat[game]])
+            pos[game] = self._position(hands[game], alive[game], card_id)
+        return pos
+
+    def _position(self, hand, alive, card_id):
+        """Posição viva da carta com o id dado."""
+        return int(np.nonzero((self.tables.ids[hand] == card_id) & alive)[0][0])
+
+
+def play_games(tables, hands1, hands2, policy1, policy2, first_player):
+    """
+    Joga B partidas em paralelo até uma das mãos acabar.
+
+    O vencedor de cada rodada escolhe o atributo da próxima; em caso de
+    empate o atacante se mantém.
+
+    Args:
+        tables: CardTables do baralho
+        hands1, hands2: Mãos iniciais (B, H1) e (B, H2)
+        policy1, policy2: Políticas vetorizadas dos jogadores
+        first_player: Array booleano (B,), True se o jogador 1 começa atacando
+
+    Returns:
+        Array (B,) com 1 (jogador 1 vence), -1 (jogador 2 vence) ou 0 (empate)
+    """
+    batch = len(hands1)
+    rows = np.arange(batch)
+    alive1 = np.ones(hands1.shape, dtype=bool)
+    alive2 = np.ones(hands2.shape, dtype=bool)
+    p1_attacks = np.asarray(first_player, dtype=bool).copy()
+    score = np.zeros(batch, dtype=np.int64)
+
+    for _ in range(min(hands1.shape[1], hands2.shape[1])):
+        # Cada jogador decide como atacante e como defensor; o papel real
+        # de cada jogo seleciona qual decisão vale
+        att1_pos, att1_stat = policy1.attack(hands1, alive1, hands2, alive2)
+        att2_pos, att2_stat = policy2.attack(hands2, alive2, hands1, alive1)
+        stat = np.where(p1_attacks, att1_stat, att2_stat)
+
+        def1_pos = policy1.defend(hands1, alive1, stat, hands2, alive2)
+        def2_pos = policy2.defend(hands2, alive2, stat, hands1, alive1)
+
+        pos1 = np.where(p1_attacks, att1_pos, def1_pos)
+        pos2 = np.where(p1_attacks, def2_pos, att2_pos)
+
+        card1 = hands1[rows, pos1]
+        card2 = hands2[rows, pos2]
+        result = tables.outcome[card1, card2, stat]
+
+        score += result
+        alive1[rows, pos1] = False
+        alive2[rows, pos2] = False
+        p1_attacks = np.where(result == 0, p1_attacks, result > 0)
+
+    return np.sign(score)